@@ -3,8 +3,8 @@
 block_cipher = None
 
 a = Analysis(
-    ['src/main.py'],
-    pathex=[],
+    ['src/nanamin/main.py'],
+    pathex=['src'],
     binaries=[],
     datas=[
         ('venv/lib/python3.13/site-packages/PyQt6/Qt6/plugins/platforms', 'PyQt6/Qt6/plugins/platforms'),
@@ -0,0 +1,515 @@
+import argparse
+import io
+import itertools
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import zipfile
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Any
+
+import PIL
+from PIL import Image, ImageDraw
+
+# Headless entry point: nothing imported here may pull in PyQt6
+from nanamin.utils.batch import BatchCompressor
+from nanamin.utils.compressor import CBZCompressor
+from nanamin.utils.executors import DEFAULT_BACKEND, EXECUTOR_BACKENDS
+from nanamin.utils.formats import available_formats
+
+if sys.platform != "win32":  # Not available on Windows; peak RSS is then not reported
+    import resource
+
+# Constants
+CORPUS_VERSION = 1  # Bump when page generation changes, to invalidate old corpora
+DEFAULT_SEED = 7
+DEFAULT_PAGES = 6
+DEFAULT_QUALITIES = (85,)
+DEFAULT_TOLERANCE = 0.15  # Allowed relative slowdown or size growth before flagging
+SCREENTONE_SPACING = 6  # Pixels between halftone dots
+MB = 1024 * 1024
+CLEAR_REFS_PATH = "/proc/self/clear_refs"
+CLEAR_PEAK_RSS = "5"  # Resets the process's VmHWM (Linux 4.0+)
+STATUS_PATH = "/proc/self/status"
+
+# Compressor entry point exercised for each output format
+FORMAT_PATHS = {"jpeg": "process_cbz", "webp": "compress_file"}
+
+# Results are matched against a baseline on these fields
+CASE_FIELDS = ("archive", "format", "quality", "workers", "backend")
+# Backend speedups compare cases that differ only in the backend
+SPEEDUP_FIELDS = ("archive", "format", "quality", "workers")
+
+
+def _random_color(rng: random.Random) -> tuple[int, int, int]:
+    return rng.randrange(256), rng.randrange(256), rng.randrange(256)
+
+
+def _draw_ink(draw: ImageDraw.ImageDraw, rng: random.Random, size: tuple[int, int]) -> None:
+    """Draw panel borders, line art and speech bubbles in black and white."""
+    width, height = size
+    rows = rng.randint(2, 4)
+    for row in range(rows):
+        top = row * height // rows + 12
+        bottom = (row + 1) * height // rows - 12
+        draw.rectangle((12, top, width - 12, bottom), outline=0, width=6)
+        for _ in range(rng.randint(8, 20)):
+            points = [
+                (rng.randrange(width), rng.randint(top, bottom)) for _ in range(rng.randint(2, 5))
+            ]
+            draw.line(points, fill=0, width=rng.randint(1, 4))
+        x = rng.randrange(width // 2)
+        y = rng.randint(top, max(top, bottom - 120))
+        draw.ellipse((x, y, x + rng.randint(120, 260), y + 100), fill=255, outline=0, width=3)
+
+
+def _screentone_page(rng: random.Random, size: tuple[int, int]) -> Image.Image:
+    """Grayscale manga page: halftone dot fills under black line art."""
+    width, height = size
+    tile = Image.new("L", (SCREENTONE_SPACING * 8, SCREENTONE_SPACING * 8), 255)
+    tile_draw = ImageDraw.Draw(tile)
+    for y in range(0, tile.height, SCREENTONE_SPACING):
+        for x in range(0, tile.width, SCREENTONE_SPACING):
+            tile_draw.ellipse((x + 1, y + 1, x + 3, y + 3), fill=0)
+    tone = Image.new("L", size, 255)
+    for y in range(0, height, tile.height):
+        for x in range(0, width, tile.width):
+            tone.paste(tile, (x, y))
+
+    page = Image.new("L", size, 255)
+    for _ in range(rng.randint(3, 6)):
+        x, y = rng.randrange(width), rng.randrange(height)
+        right = min(width, x + rng.randint(200, 600))
+        bottom = min(height, y + rng.randint(200, 600))
+        box = (x, y, right, bottom)
+        page.paste(tone.crop(box), box[:2])
+    _draw_ink(ImageDraw.Draw(page), rng, size)
+    return page
+
+
+def _color_page(rng: random.Random, size: tuple[int, int]) -> Image.Image:
+    """Color page: smooth gradients with flat colored shapes and line art."""
+    gradient = Image.linear_gradient("L").resize(size)
+    channels = [gradient.rotate(rng.choice((0, 90, 180, 270))).resize(size) for _ in range(3)]
+    page = Image.merge("RGB", channels)
+    draw = ImageDraw.Draw(page)
+    width, height = size
+    for _ in range(rng.randint(10, 25)):
+        x, y = rng.randrange(width), rng.randrange(height)
+        radius = rng.randint(20, min(size) // 4)
+        draw.ellipse((x - radius, y - radius, x + radius, y + radius), fill=_random_color(rng))
+    _draw_ink(draw, rng, size)
+    return page
+
+
+def _rgba_page(rng: random.Random, size: tuple[int, int]) -> Image.Image:
+    """Transparent PNG page, as exported by some digital releases."""
+    page = Image.new("RGBA", size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(page)
+    width, height = size
+    for _ in range(rng.randint(10, 25)):
+        x, y = rng.randrange(width), rng.randrange(height)
+        box = (x, y, x + rng.randint(40, width // 2), y + rng.randint(40, height // 3))
+        draw.rectangle(box, fill=(*_random_color(rng), rng.randint(64, 255)))
+    return page
+
+
+def _encode(page: Image.Image, pil_format: str) -> bytes:
+    output = io.BytesIO()
+    if pil_format == "JPEG":
+        page.save(output, format="JPEG", quality=95)
+    else:
+        page.save(output, format="PNG", compress_level=1)
+    return output.getvalue()
+
+
+PageFactory = Callable[[random.Random, tuple[int, int]], Image.Image]
+
+# name: (page factory, page size, source format)
+CORPUS_KINDS: dict[str, tuple[PageFactory, tuple[int, int], str]] = {
+    "screentone": (_screentone_page, (1200, 1800), "PNG"),
+    "color": (_color_page, (1200, 1800), "JPEG"),
+    "rgba": (_rgba_page, (1200, 1800), "PNG"),
+    "double": (_color_page, (4000, 2800), "JPEG"),
+}
+
+
+def generate_corpus(
+    directory: str, pages: int = DEFAULT_PAGES, seed: int = DEFAULT_SEED
+) -> list[str]:
+    """Generate the synthetic benchmark archives.
+
+    Pages are drawn from a seeded random generator, so the same arguments
+    always produce the same archives. Archives already generated with the
+    same arguments are reused.
+
+    Args:
+        directory: Directory for the archives
+        pages: Pages per archive
+        seed: Random seed
+
+    Returns:
+        Paths of the generated archives, one per corpus kind
+    """
+    corpus_dir = os.path.join(directory, f"v{CORPUS_VERSION}-{pages}p-s{seed}")
+    os.makedirs(corpus_dir, exist_ok=True)
+    paths = []
+    for kind, (make_page, size, pil_format) in CORPUS_KINDS.items():
+        path = os.path.join(corpus_dir, f"{kind}.cbz")
+        paths.append(path)
+        if os.path.exists(path):
+            continue
+        rng = random.Random(f"{seed}-{kind}")
+        extension = ".jpg" if pil_format == "JPEG" else ".png"
+        temp_path = path + ".part"
+        with zipfile.ZipFile(temp_path, "w", zipfile.ZIP_STORED) as zf:
+            for number in range(pages):
+                zf.writestr(f"{number:03d}{extension}", _encode(make_page(rng, size), pil_format))
+        os.replace(temp_path, path)
+    return paths
+
+
+def _rusage_peak_mb(who: int) -> float:
+    """Get a getrusage peak resident set size in MB."""
+    peak = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / MB if sys.platform == "darwin" else peak / 1024
+
+
+def _start_peak_rss() -> float | None:
+    """Start measuring the peak RSS of the case about to run in this process.
+
+    A spawned process inherits the ru_maxrss of the process that started
+    it, so the launcher's peak would hide the case's own. On Linux the
+    high-water mark is reset through /proc/self/clear_refs and read back
+    from VmHWM; elsewhere the inherited peak is kept as a baseline.
+
+    Returns:
+        The inherited peak in MB, or None if it was reset (or on Windows)
+    """
+    if sys.platform == "win32":
+        return None
+    try:
+        with open(CLEAR_REFS_PATH, "w") as f:
+            f.write(CLEAR_PEAK_RSS)
+    except OSError:
+        return _rusage_peak_mb(resource.RUSAGE_SELF)
+    return None
+
+
+def _peak_rss_mb(baseline: float | None) -> float | None:
+    """Get the peak RSS of the case in this process and its worker processes.
+
+    Args:
+        baseline: Result of _start_peak_rss
+
+    Returns:
+        Peak RSS in MB, or None when it cannot be told apart from the
+        launcher's: on Windows, or when the case never rose above the
+        inherited baseline
+    """
+    if sys.platform == "win32":
+        return None
+    # Workers spawned after the reset only inherit the case's own peak
+    children = _rusage_peak_mb(resource.RUSAGE_CHILDREN)
+    if baseline is None:
+        with open(STATUS_PATH, encoding="ascii") as f:
+            own = next(int(line.split()[1]) for line in f if line.startswith("VmHWM:")) / 1024
+        return max(own, children)
+    peak = max(_rusage_peak_mb(resource.RUSAGE_SELF), children)
+    return peak if peak > baseline else None
+
+
+def run_case(
+    input_path: str, output_path: str, output_format: str, quality: int, workers: int, backend: str
+) -> dict[str, Any]:
+    """Compress one archive with one setting combination and measure it.
+
+    Meant to run in a fresh process, so that no earlier case adds to the
+    peak RSS; the peak inherited from the launching process is excluded
+    (see _start_peak_rss).
+
+    Args:
+        input_path: Corpus archive
+        output_path: Where to write the compressed archive
+        output_format: Registered output format name
+        quality: Compression quality (1-100)
+        workers: Number of encode workers
+        backend: Executor backend
+
+    Returns:
+        Measurements of the run
+    """
+    compressor = CBZCompressor(quality, backend=backend, max_workers=workers)
+    path = FORMAT_PATHS.get(output_format, "batch")
+    with zipfile.ZipFile(input_path) as zf:
+        pages = len(zf.infolist())
+
+    rss_baseline = _start_peak_rss()
+    start_time = time.perf_counter()
+    if path == "process_cbz":
+        compressor.process_cbz(input_path, output_path)
+    elif path == "compress_file":
+        for _ in compressor.compress_file(input_path, output_path):
+            pass
+    else:
+        BatchCompressor(compressor, output_format).process_batch([(input_path, output_path)])
+    seconds = time.perf_counter() - start_time
+
+    original = os.path.getsize(input_path)
+    compressed = os.path.getsize(output_path)
+    peak_rss = _peak_rss_mb(rss_baseline)
+    return {
+        "archive": os.path.splitext(os.path.basename(input_path))[0],
+        "path": path,
+        "format": output_format,
+        "quality": quality,
+        "workers": workers,
+        "backend": backend,
+        "pages": pages,
+        "seconds": round(seconds, 4),
+        "pages_per_second": round(pages / seconds, 3),
+        "mb_per_second": round(original / MB / seconds, 3),
+        "peak_rss_mb": round(peak_rss, 1) if peak_rss is not None else None,
+        "original_bytes": original,
+        "compressed_bytes": compressed,
+        "ratio": round(compressed / original, 4),
+    }
+
+
+def add_backend_speedups(results: list[dict[str, Any]], backends: list[str]) -> None:
+    """Add each case's speedup over the same case on the reference backend.
+
+    The reference is the thread backend if it was measured, otherwise the
+    first backend measured. Cases without a reference run get no speedup.
+
+    Args:
+        results: Case measurements from run_case, updated in place
+        backends: Backends measured, in command-line order
+    """
+    reference_backend = "thread" if "thread" in backends else backends[0]
+    reference = {
+        tuple(case[field] for field in SPEEDUP_FIELDS): case["seconds"]
+        for case in results
+        if case["backend"] == reference_backend
+    }
+    for case in results:
+        seconds = reference.get(tuple(case[field] for field in SPEEDUP_FIELDS))
+        if seconds is not None and case["seconds"] > 0:
+            case["speedup"] = round(seconds / case["seconds"], 3)
+
+
+def run_benchmarks(args: argparse.Namespace) -> dict[str, Any]:
+    """Run every benchmark case over the corpus.
+
+    Each case runs ``repeat`` times in a fresh spawned process; the fastest
+    run is kept. Each case also reports its speedup over the reference
+    backend (see add_backend_speedups).
+
+    Args:
+        args: Parsed command-line arguments
+
+    Returns:
+        Machine-readable benchmark results
+    """
+    corpus = generate_corpus(args.corpus_dir, args.pages, args.seed)
+    cases = itertools.product(corpus, args.formats, args.qualities, args.workers, args.backends)
+    results = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_path = os.path.join(temp_dir, "output.cbz")
+        for input_path, output_format, quality, workers, backend in cases:
+            runs = []
+            for _ in range(args.repeat):
+                with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as pool:
+                    future = pool.submit(
+                        run_case, input_path, output_path, output_format, quality, workers, backend
+                    )
+                    runs.append(future.result())
+            results.append(min(runs, key=lambda run: run["seconds"]))
+    add_backend_speedups(results, args.backends)
+
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "pillow": PIL.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "corpus": [
+            {"archive": os.path.basename(path), "bytes": os.path.getsize(path)} for path in corpus
+        ],
+        "results": results,
+    }
+
+
+def compare_results(
+    current: dict[str, Any], baseline: dict[str, Any], tolerance: float = DEFAULT_TOLERANCE
+) -> list[dict[str, Any]]:
+    """Find cases that got slower or produced larger output than the baseline.
+
+    Cases are matched on archive, format, quality, workers and backend;
+    cases missing from either side are ignored.
+
+    Args:
+        current: Results from run_benchmarks
+        baseline: Earlier results to compare against
+        tolerance: Allowed relative slowdown or size growth
+
+    Returns:
+        One entry per regressed metric of a case
+    """
+    reference = {tuple(case[field] for field in CASE_FIELDS): case for case in baseline["results"]}
+    regressions = []
+    for case in current["results"]:
+        key = tuple(case[field] for field in CASE_FIELDS)
+        old = reference.get(key)
+        if old is None:
+            continue
+        min_speed = old["pages_per_second"] / (1 + tolerance)
+        max_ratio = old["ratio"] * (1 + tolerance)
+        checks = (
+            ("pages_per_second", min_speed, case["pages_per_second"] < min_speed),
+            ("ratio", max_ratio, case["ratio"] > max_ratio),
+        )
+        for metric, limit, regressed in checks:
+            if regressed:
+                regressions.append(
+                    {
+                        **dict(zip(CASE_FIELDS, key, strict=True)),
+                        "metric": metric,
+                        "baseline": old[metric],
+                        "current": case[metric],
+                        "limit": round(limit, 4),
+                    }
+                )
+    return regressions
+
+
+def _int_list(value: str) -> list[int]:
+    return [int(item) for item in value.split(",")]
+
+
+def _str_list(value: str) -> list[str]:
+    return [item.strip() for item in value.split(",")]
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command-line arguments.
+
+    Args:
+        argv: Arguments to parse (defaults to sys.argv)
+
+    Returns:
+        Parsed arguments
+    """
+    parser = argparse.ArgumentParser(
+        prog="nanamin-benchmark",
+        description="Measure encode speed, memory and size over a synthetic CBZ corpus.",
+    )
+    parser.add_argument(
+        "--corpus-dir",
+        default=os.path.join(tempfile.gettempdir(), "nanamin-corpus"),
+        help="Directory for the generated corpus (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--pages", type=int, default=DEFAULT_PAGES, help="Pages per archive (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--seed", type=int, default=DEFAULT_SEED, help="Corpus random seed (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--formats",
+        type=_str_list,
+        default=["jpeg", "webp"],
+        help="Comma-separated output formats (default: jpeg,webp)",
+    )
+    parser.add_argument(
+        "--qualities",
+        type=_int_list,
+        default=list(DEFAULT_QUALITIES),
+        help="Comma-separated qualities (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=_int_list,
+        default=[1, os.cpu_count() or 1],
+        help="Comma-separated worker counts (default: 1 and the CPU count)",
+    )
+    parser.add_argument(
+        "--backends",
+        type=_str_list,
+        default=[DEFAULT_BACKEND],
+        help=f"Comma-separated executor backends (default: {DEFAULT_BACKEND})",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=1, help="Runs per case; the fastest is kept (default: 1)"
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        default="-",
+        help="Write the JSON results to this file (default: stdout)",
+    )
+    parser.add_argument(
+        "--compare",
+        metavar="BASELINE",
+        default=None,
+        help="Compare against earlier results and exit with 1 on regressions",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="Allowed relative slowdown or size growth when comparing (default: %(default)s)",
+    )
+    args = parser.parse_args(argv)
+    formats = available_formats()
+    for output_format in args.formats:
+        if output_format not in formats:
+            parser.error(f"Unsupported format: {output_format} (available: {', '.join(formats)})")
+    for backend in args.backends:
+        if backend not in EXECUTOR_BACKENDS:
+            parser.error(
+                f"Unknown backend: {backend} (expected one of {', '.join(EXECUTOR_BACKENDS)})"
+            )
+    args.workers = sorted(set(args.workers))
+    if args.pages < 1 or args.repeat < 1 or min(args.workers) < 1:
+        parser.error("--pages, --repeat and --workers must be at least 1")
+    if not all(1 <= quality <= 100 for quality in args.qualities):
+        parser.error("--qualities must be between 1 and 100")
+    return args
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Run the benchmark suite.
+
+    Args:
+        argv: Command-line arguments (defaults to sys.argv)
+
+    Returns:
+        Process exit code: 1 if a comparison found regressions, 0 otherwise
+    """
+    args = parse_args(argv)
+    results = run_benchmarks(args)
+    if args.compare is not None:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        results["regressions"] = compare_results(results, baseline, args.tolerance)
+
+    text = json.dumps(results, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    return 1 if results.get("regressions") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
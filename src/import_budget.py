@@ -0,0 +1,164 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Any
+
+# Constants
+DEFAULT_RUNS = 5  # Fresh interpreters per entry point; the median is reported
+TOP_IMPORTS = 10  # Heaviest imports listed per entry point
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+PACKAGE = "nanamin"
+
+# Entry point -> (import-time budget in ms, modules it must not import at startup).
+# Budgets are generous for a developer machine; CI or slow managed desktops
+# can scale them with --scale.
+ENTRY_POINTS: dict[str, tuple[float, tuple[str, ...]]] = {
+    "cli": (150.0, ("PyQt6", "PIL.Image")),
+    "service": (200.0, ("PyQt6", "PIL.Image")),
+    "main": (400.0, ("PIL.Image", "nanamin.utils.compressor", "nanamin.help_dialog")),
+}
+
+
+def measure_imports(module: str) -> dict[str, tuple[int, int]]:
+    """Import a module in a fresh interpreter under ``-X importtime``.
+
+    Args:
+        module: Dotted module name, importable from the source directory
+
+    Returns:
+        Imported module name -> (self µs, cumulative µs)
+
+    Raises:
+        RuntimeError: If the module cannot be imported
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SRC_DIR,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+    )
+    if result.returncode != 0:
+        error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else ""
+        raise RuntimeError(f"Cannot import {module}: {error}")
+    timings: dict[str, tuple[int, int]] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        own, cumulative, name = line[len("import time:") :].split("|", 2)
+        if not own.strip().isdigit():
+            continue  # Header line
+        timings[name.strip()] = (int(own), int(cumulative))
+    return timings
+
+
+def check_entry_point(
+    module: str, budget_ms: float, forbidden: tuple[str, ...], runs: int
+) -> dict[str, Any]:
+    """Measure one entry point against its budget.
+
+    Args:
+        module: Entry point module within the package
+        budget_ms: Allowed import time in milliseconds
+        forbidden: Modules that must not be imported at startup
+        runs: Number of fresh interpreters to measure
+
+    Returns:
+        Machine-readable result; ``violations`` lists what went over
+    """
+    qualified = f"{PACKAGE}.{module}"
+    try:
+        samples = [measure_imports(qualified) for _ in range(runs)]
+    except RuntimeError as e:
+        return {"module": module, "status": "unavailable", "error": str(e)}
+    import_ms = statistics.median(sample[qualified][1] for sample in samples) / 1000
+    last = samples[-1]
+    heaviest = sorted(last.items(), key=lambda item: item[1][1], reverse=True)
+    violations = [
+        f"imports {name}"
+        for name in forbidden
+        if any(imported == name or imported.startswith(name + ".") for imported in last)
+    ]
+    if import_ms > budget_ms:
+        violations.append(f"import time {import_ms:.1f} ms over budget {budget_ms:.1f} ms")
+    return {
+        "module": module,
+        "status": "failed" if violations else "ok",
+        "import_ms": round(import_ms, 2),
+        "budget_ms": budget_ms,
+        "modules": len(last),
+        "heaviest": [
+            {"module": name, "cumulative_ms": round(cumulative / 1000, 2)}
+            for name, (_, cumulative) in heaviest[1 : TOP_IMPORTS + 1]
+        ],
+        "violations": violations,
+    }
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command-line arguments.
+
+    Args:
+        argv: Arguments to parse (defaults to sys.argv)
+
+    Returns:
+        Parsed arguments
+    """
+    parser = argparse.ArgumentParser(
+        description="Check the startup import time of the Nanamin entry points."
+    )
+    parser.add_argument(
+        "modules",
+        nargs="*",
+        help=f"Entry points to check: {', '.join(ENTRY_POINTS)} (default: all)",
+    )
+    parser.add_argument(
+        "--runs",
+        type=int,
+        default=DEFAULT_RUNS,
+        help=f"Fresh interpreters per entry point (default: {DEFAULT_RUNS})",
+    )
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=1.0,
+        help="Multiply every budget, e.g. 2 on slow machines (default: 1)",
+    )
+    args = parser.parse_args(argv)
+    unknown = [module for module in args.modules if module not in ENTRY_POINTS]
+    if unknown:
+        parser.error(f"unknown entry point: {', '.join(unknown)}")
+    args.modules = args.modules or list(ENTRY_POINTS)
+    if args.runs < 1:
+        parser.error("--runs must be at least 1")
+    if args.scale <= 0:
+        parser.error("--scale must be positive")
+    return args
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Run the import-time check.
+
+    Args:
+        argv: Command-line arguments (defaults to sys.argv)
+
+    Returns:
+        Process exit code: 1 if an entry point is over budget or imports a
+        forbidden module, 0 otherwise (unimportable entry points, such as
+        the GUI without PyQt6, are reported but do not fail the check)
+    """
+    args = parse_args(argv)
+    results = [
+        check_entry_point(module, budget * args.scale, forbidden, args.runs)
+        for module, (budget, forbidden) in ENTRY_POINTS.items()
+        if module in args.modules
+    ]
+    print(json.dumps({"python": sys.version.split()[0], "entry_points": results}, indent=2))
+    return 1 if any(result.get("violations") for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
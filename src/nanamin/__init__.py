@@ -0,0 +1 @@
+# This file makes the nanamin directory a Python package
@@ -0,0 +1,537 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from typing import Any
+
+# Headless entry point: nothing imported here may pull in PyQt6
+from nanamin.utils.analyzer import (
+    DEFAULT_MIN_SAVINGS,
+    DEFAULT_SAMPLE_PAGES,
+    ArchiveAnalyzer,
+    ArchiveEstimate,
+)
+from nanamin.utils.archive import BAD_PAGE_POLICIES, STORAGE_POLICIES, ArchiveJob
+from nanamin.utils.batch import BatchCompressor
+from nanamin.utils.cache import DEFAULT_CACHE_DIR, DEFAULT_CACHE_SIZE, PageCache
+from nanamin.utils.compressor import MAX_QUALITY, MIN_QUALITY, CBZCompressor
+from nanamin.utils.executors import DEFAULT_BACKEND, EXECUTOR_BACKENDS
+from nanamin.utils.formats import FORMAT_ENGINES, get_format
+from nanamin.utils.metrics import PipelineMetrics
+from nanamin.utils.quality import DEFAULT_MIN_QUALITY, QualityTarget
+from nanamin.utils.validation import validate_archive
+
+# Constants
+DEFAULT_QUALITY: int = 85
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command-line arguments.
+
+    Args:
+        argv: Arguments to parse (defaults to sys.argv)
+
+    Returns:
+        Parsed arguments
+    """
+    parser = argparse.ArgumentParser(
+        prog="nanamin", description="Optimize CBZ manga and comic archives."
+    )
+    parser.add_argument(
+        "inputs", nargs="+", help="CBZ files, glob patterns or directories to compress"
+    )
+    parser.add_argument(
+        "-o", "--output-dir", required=True, help="Directory for the compressed files"
+    )
+    parser.add_argument(
+        "-q",
+        "--quality",
+        type=int,
+        default=DEFAULT_QUALITY,
+        help=f"Compression quality 1-100 (default: {DEFAULT_QUALITY})",
+    )
+    parser.add_argument(
+        "-f",
+        "--format",
+        choices=list(FORMAT_ENGINES),
+        default="jpeg",
+        help="Output page format (default: jpeg)",
+    )
+    parser.add_argument(
+        "-e",
+        "--effort",
+        type=int,
+        default=None,
+        help="Encoder effort; higher is slower and smaller (default: per format)",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=None,
+        help="Total number of encode workers (default: CPU count - 1)",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of archives read and written concurrently (default: 1)",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=EXECUTOR_BACKENDS,
+        default=DEFAULT_BACKEND,
+        help=f"Encode executor backend (default: {DEFAULT_BACKEND})",
+    )
+    adaptive = parser.add_mutually_exclusive_group()
+    adaptive.add_argument(
+        "--target-kb-per-mp",
+        type=int,
+        default=None,
+        help="Search quality per page to fit this many KB per megapixel",
+    )
+    adaptive.add_argument(
+        "--min-psnr",
+        type=float,
+        default=None,
+        help="Search the lowest quality per page whose luma PSNR reaches this (dB)",
+    )
+    parser.add_argument(
+        "--min-quality",
+        type=int,
+        default=DEFAULT_MIN_QUALITY,
+        help=f"Lowest quality the adaptive search may pick (default: {DEFAULT_MIN_QUALITY})",
+    )
+    parser.add_argument(
+        "--no-grayscale",
+        dest="detect_grayscale",
+        action="store_false",
+        help="Always encode pages as RGB instead of detecting grayscale pages",
+    )
+    parser.add_argument(
+        "--max-dimension",
+        type=int,
+        default=None,
+        help="Downscale pages whose longest side exceeds this many pixels",
+    )
+    parser.add_argument(
+        "--target-dpi",
+        type=int,
+        default=None,
+        help="Downscale scans whose recorded resolution exceeds this DPI",
+    )
+    parser.add_argument(
+        "--storage",
+        choices=STORAGE_POLICIES,
+        default="auto",
+        help="Zip storage per entry: auto stores images and deflates metadata (default: auto)",
+    )
+    parser.add_argument(
+        "-r", "--recursive", action="store_true", help="Search input directories recursively"
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Reuse encoded pages from the page cache for identical source pages",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=DEFAULT_CACHE_DIR,
+        help=f"Page cache directory (default: {DEFAULT_CACHE_DIR})",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=DEFAULT_CACHE_SIZE // (1024 * 1024),
+        help="Maximum page cache size in MB (default: %(default)s)",
+    )
+    parser.add_argument(
+        "-i",
+        "--incremental",
+        action="store_true",
+        help="Skip archives whose output is up to date and reuse unchanged pages",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Journal encoded pages so an interrupted run continues where it stopped; "
+        "implies --incremental",
+    )
+    parser.add_argument(
+        "--deep-validate",
+        action="store_true",
+        help="Check the CRC and image data of every member before compressing",
+    )
+    parser.add_argument(
+        "--bad-pages",
+        choices=BAD_PAGE_POLICIES,
+        default="fail",
+        help="What to do with pages that cannot be read or encoded: fail the archive, "
+        "skip them, or quarantine them next to the output (default: fail)",
+    )
+    parser.add_argument(
+        "--analyze",
+        action="store_true",
+        help="Only predict savings and encode time per archive and print the ranked "
+        "work list; nothing is written",
+    )
+    parser.add_argument(
+        "--min-savings",
+        type=float,
+        default=None,
+        help="Analyze first, skip archives predicted to save less than this percentage "
+        "and compress the rest most worthwhile first",
+    )
+    parser.add_argument(
+        "--sample-pages",
+        type=int,
+        default=DEFAULT_SAMPLE_PAGES,
+        help=f"Pages trial-encoded per archive when analyzing (default: {DEFAULT_SAMPLE_PAGES})",
+    )
+    parser.add_argument(
+        "--metrics",
+        action="store_true",
+        help="Add per-stage timings, page sizes and pool utilization to the summary",
+    )
+    parser.add_argument(
+        "--trace",
+        default=None,
+        help="Write a per-page Chrome trace (chrome://tracing, Perfetto) to this file",
+    )
+    parser.add_argument(
+        "--summary",
+        default="-",
+        help="Write the JSON summary to this file (default: stdout)",
+    )
+    args = parser.parse_args(argv)
+    if not MIN_QUALITY <= args.quality <= MAX_QUALITY:
+        parser.error(f"--quality must be between {MIN_QUALITY} and {MAX_QUALITY}")
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if args.max_dimension is not None and args.max_dimension < 1:
+        parser.error("--max-dimension must be at least 1")
+    if args.target_dpi is not None and args.target_dpi < 1:
+        parser.error("--target-dpi must be at least 1")
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.sample_pages < 1:
+        parser.error("--sample-pages must be at least 1")
+    if args.target_kb_per_mp is not None and args.target_kb_per_mp < 1:
+        parser.error("--target-kb-per-mp must be at least 1")
+    if args.min_psnr is not None and args.min_psnr <= 0:
+        parser.error("--min-psnr must be positive")
+    # Checked after parsing, so --help does not load every Pillow plugin
+    try:
+        get_format(args.format)
+    except ValueError as e:
+        parser.error(str(e))
+    return args
+
+
+def collect_jobs(
+    inputs: list[str], output_dir: str, recursive: bool = False
+) -> list[tuple[str, str]]:
+    """Expand inputs into (input path, output path) pairs.
+
+    Files found in a directory keep their path relative to that directory
+    under the output directory; everything else is written by file name, so
+    two inputs may map to the same output (run() skips all but the first).
+
+    Args:
+        inputs: CBZ files, glob patterns or directories
+        output_dir: Directory for the compressed files
+        recursive: Whether to search directories recursively
+
+    Returns:
+        Sorted, de-duplicated list of jobs
+    """
+    jobs: dict[str, str] = {}
+    for item in inputs:
+        if os.path.isdir(item):
+            pattern = os.path.join(item, "**", "*") if recursive else os.path.join(item, "*")
+            for path in glob.glob(pattern, recursive=recursive):
+                if path.lower().endswith(".cbz") and os.path.isfile(path):
+                    rel_path = os.path.relpath(path, item)
+                    jobs.setdefault(os.path.abspath(path), os.path.join(output_dir, rel_path))
+            continue
+        matches = glob.glob(item, recursive=True) or [item]
+        for path in matches:
+            jobs.setdefault(os.path.abspath(path), os.path.join(output_dir, os.path.basename(path)))
+    return sorted(jobs.items())
+
+
+def run(args: argparse.Namespace) -> dict[str, Any]:
+    """Compress every input archive and build the summary.
+
+    Args:
+        args: Parsed command-line arguments
+
+    Returns:
+        Machine-readable summary of the run
+    """
+    start_time = time.time()
+    probe = CBZCompressor(args.quality)
+    results: dict[str, dict[str, Any]] = {}
+    pending: list[tuple[str, str]] = []
+    outputs: dict[str, str] = {}  # Normalized output path -> input written there
+
+    for input_path, output_path in collect_jobs(args.inputs, args.output_dir, args.recursive):
+        entry: dict[str, Any] = {"input": input_path, "output": output_path}
+        results[input_path] = entry
+        is_valid, error = probe.validate_cbz(input_path)
+        output_key = os.path.normcase(os.path.abspath(output_path))
+        if not is_valid:
+            entry.update(status="invalid", error=error)
+        elif os.path.abspath(output_path) == input_path:
+            entry.update(status="skipped", error="Output would overwrite the input file")
+        elif output_key in outputs:
+            # Same file name from different directories
+            entry.update(
+                status="skipped",
+                error=f"Output would overwrite the output of {outputs[output_key]}",
+            )
+        else:
+            outputs[output_key] = input_path
+            entry["original_bytes"] = os.path.getsize(input_path)
+            pending.append((input_path, output_path))
+
+    total_workers = args.workers or probe.max_workers
+    quality_target = None
+    if args.target_kb_per_mp is not None or args.min_psnr is not None:
+        quality_target = QualityTarget(
+            bytes_per_megapixel=(
+                args.target_kb_per_mp * 1024 if args.target_kb_per_mp is not None else None
+            ),
+            min_psnr=args.min_psnr,
+            min_quality=args.min_quality,
+        )
+
+    if args.deep_validate:
+        validator = CBZCompressor(args.quality, backend=args.backend, max_workers=total_workers)
+        with validator.open_executor() as executor:
+            for input_path, _ in pending:
+                report = validate_archive(input_path, executor, validator.max_in_flight)
+                entry = results[input_path]
+                entry["bad_pages"] = [failure._asdict() for failure in report.failures]
+                if report.error:
+                    entry.update(status="invalid", error=report.error)
+                elif report.failures and args.bad_pages == "fail":
+                    entry.update(
+                        status="invalid", error=f"{len(report.failures)} corrupt member(s)"
+                    )
+        pending = [job for job in pending if "status" not in results[job[0]]]
+
+    if args.analyze or args.min_savings is not None:
+        analyzer = ArchiveAnalyzer(
+            CBZCompressor(
+                args.quality,
+                backend=args.backend,
+                max_workers=total_workers,
+                quality_target=quality_target,
+                detect_grayscale=args.detect_grayscale,
+                effort=args.effort,
+                max_dimension=args.max_dimension,
+                target_dpi=args.target_dpi,
+                bad_pages=args.bad_pages,
+            ),
+            args.format,
+            args.sample_pages,
+            args.min_savings if args.min_savings is not None else DEFAULT_MIN_SAVINGS,
+        )
+        ranked = analyzer.analyze(pending)
+        if args.analyze:
+            return analysis_summary(args, analyzer, results, ranked, start_time)
+        pending = [estimate.job for estimate in ranked if estimate.selected]
+        for estimate in ranked:
+            entry = results[estimate.input_path]
+            entry["estimated_savings"] = estimate.savings
+            if not estimate.selected:
+                entry.update(status="filtered", error=estimate.reason)
+
+    # Each job runs its own batch pipeline over an equal share of the workers
+    jobs = min(args.jobs, len(pending)) or 1
+    workers_per_job = max(1, total_workers // jobs)
+    cache = PageCache(args.cache_dir, args.cache_size * 1024 * 1024) if args.cache else None
+    metrics = PipelineMetrics(total_workers) if args.metrics or args.trace else None
+
+    def run_batch(batch: list[tuple[str, str]]) -> None:
+        for _, output_path in batch:
+            os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        compressor = CBZCompressor(
+            args.quality,
+            backend=args.backend,
+            max_workers=workers_per_job,
+            cache=cache,
+            incremental=args.incremental,
+            storage=args.storage,
+            quality_target=quality_target,
+            detect_grayscale=args.detect_grayscale,
+            effort=args.effort,
+            metrics_callback=metrics.record if metrics else None,
+            max_dimension=args.max_dimension,
+            target_dpi=args.target_dpi,
+            resume=args.resume,
+            bad_pages=args.bad_pages,
+        )
+        batch_start = time.time()
+
+        def archive_done(index: int, job: ArchiveJob) -> None:
+            nonlocal batch_start
+            entry = results[batch[index][0]]
+            compressed = os.path.getsize(job.output_path)
+            entry.update(
+                status="ok",
+                unchanged=job.up_to_date,
+                reused_pages=job.reused,
+                resumed_pages=job.resumed,
+                bad_pages=[failure._asdict() for failure in job.failures],
+                compressed_bytes=compressed,
+                savings=compressor.calculate_savings(entry["original_bytes"], compressed),
+                seconds=round(time.time() - batch_start, 3),
+            )
+            batch_start = time.time()
+
+        def archive_failed(index: int, error: Exception) -> None:
+            results[batch[index][0]].update(status="failed", error=str(error))
+
+        try:
+            BatchCompressor(compressor, args.format).process_batch(
+                batch, archive_callback=archive_done, error_callback=archive_failed
+            )
+        except Exception as e:
+            # Only a broken worker pool stops the rest of the batch
+            for input_path, _ in batch:
+                if "status" not in results[input_path]:
+                    results[input_path].update(status="failed", error=str(e))
+
+    batches = [pending[i::jobs] for i in range(jobs)]
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        list(executor.map(run_batch, batches))
+
+    if metrics is not None and args.trace:
+        metrics.write_trace(args.trace)
+
+    statuses = [entry["status"] for entry in results.values()]
+    original = sum(e.get("original_bytes", 0) for e in results.values() if e["status"] == "ok")
+    compressed = sum(e.get("compressed_bytes", 0) for e in results.values() if e["status"] == "ok")
+    summary: dict[str, Any] = {
+        "settings": {
+            "quality": args.quality,
+            "format": args.format,
+            "effort": args.effort,
+            "workers": total_workers,
+            "jobs": jobs,
+            "backend": args.backend,
+            "cache": args.cache,
+            "incremental": args.incremental,
+            "resume": args.resume,
+            "bad_pages": args.bad_pages,
+            "storage": args.storage,
+            "target_kb_per_mp": args.target_kb_per_mp,
+            "min_psnr": args.min_psnr,
+            "detect_grayscale": args.detect_grayscale,
+            "max_dimension": args.max_dimension,
+            "target_dpi": args.target_dpi,
+            "min_savings": args.min_savings,
+        },
+        "archives": list(results.values()),
+        "totals": {
+            "archives": len(results),
+            "ok": statuses.count("ok"),
+            "failed": statuses.count("failed"),
+            "invalid": statuses.count("invalid"),
+            "skipped": statuses.count("skipped"),
+            "filtered": statuses.count("filtered"),
+            "original_bytes": original,
+            "compressed_bytes": compressed,
+            "savings": probe.calculate_savings(original, compressed),
+            "seconds": round(time.time() - start_time, 3),
+            "cache_hits": cache.hits if cache else 0,
+            "cache_misses": cache.misses if cache else 0,
+        },
+    }
+    if metrics is not None:
+        summary["metrics"] = metrics.summary()
+    return summary
+
+
+def analysis_summary(
+    args: argparse.Namespace,
+    analyzer: ArchiveAnalyzer,
+    results: dict[str, dict[str, Any]],
+    ranked: list[ArchiveEstimate],
+    start_time: float,
+) -> dict[str, Any]:
+    """Build the summary of an --analyze run.
+
+    Args:
+        args: Parsed command-line arguments
+        analyzer: Analyzer that produced the estimates
+        results: Entries of every input archive
+        ranked: Ranked estimates of the analyzed archives
+        start_time: Epoch time the run started
+
+    Returns:
+        Machine-readable work list and totals
+    """
+    compressor = analyzer.compressor
+    selected = [estimate for estimate in ranked if estimate.selected]
+    analyzed = {estimate.input_path for estimate in ranked}
+    original = sum(estimate.original_bytes for estimate in selected)
+    estimated = sum(estimate.estimated_bytes for estimate in selected)
+    encode_seconds = sum(estimate.encode_seconds for estimate in selected)
+    return {
+        "settings": {
+            "quality": args.quality,
+            "format": args.format,
+            "effort": args.effort,
+            "workers": compressor.max_workers,
+            "sample_pages": analyzer.sample_pages,
+            "min_savings": analyzer.min_savings,
+        },
+        "work_list": [asdict(estimate) for estimate in ranked],
+        "rejected": [entry for path, entry in results.items() if path not in analyzed],
+        "totals": {
+            "archives": len(results),
+            "selected": len(selected),
+            "original_bytes": original,
+            "estimated_bytes": estimated,
+            "savings": compressor.calculate_savings(original, estimated),
+            "encode_seconds": round(encode_seconds, 3),
+            "estimated_wall_seconds": round(encode_seconds / compressor.max_workers, 3),
+            "seconds": round(time.time() - start_time, 3),
+        },
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Run the nanamin command.
+
+    Args:
+        argv: Command-line arguments (defaults to sys.argv)
+
+    Returns:
+        Process exit code: 0 if every archive was compressed or filtered
+        out by --min-savings (or analyzed, with --analyze), 1 otherwise
+    """
+    args = parse_args(argv)
+    summary = run(args)
+    text = json.dumps(summary, indent=2)
+    if args.summary == "-":
+        print(text)
+    else:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    totals = summary["totals"]
+    if args.analyze:
+        return 0
+    return 0 if totals["ok"] + totals["filtered"] == totals["archives"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
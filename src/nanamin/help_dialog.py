@@ -0,0 +1,107 @@
+from PyQt6.QtWidgets import QDialog, QTabWidget, QTextBrowser, QVBoxLayout, QWidget
+
+from nanamin.widgets import ModernButton
+
+
+class HelpDialog(QDialog):
+    def __init__(self, parent: QWidget | None = None) -> None:
+        super().__init__(parent)
+        self.setWindowTitle("Help - Manga & Comic Optimizer")
+        self.setMinimumSize(600, 400)
+        self.setStyleSheet(
+            """
+            QDialog {
+                background-color: #2E3440;
+            }
+            QTabWidget::pane {
+                border: 1px solid #4C566A;
+                background-color: #2E3440;
+            }
+            QTabBar::tab {
+                background-color: #3B4252;
+                color: #ECEFF4;
+                padding: 8px 16px;
+                border: 1px solid #4C566A;
+                border-bottom: none;
+                border-top-left-radius: 4px;
+                border-top-right-radius: 4px;
+            }
+            QTabBar::tab:selected {
+                background-color: #5E81AC;
+            }
+            QTextBrowser {
+                background-color: #2E3440;
+                color: #ECEFF4;
+                border: none;
+                padding: 10px;
+            }
+        """
+        )
+
+        layout = QVBoxLayout(self)
+
+        # Create tab widget
+        self.tab_widget = QTabWidget()
+
+        # Getting Started tab
+        getting_started = QTextBrowser()
+        getting_started.setOpenExternalLinks(True)
+        getting_started.setHtml(
+            """
+            <div style="display: flex; flex-direction: column; justify-content: center; height: 100%;">
+                <div style="text-align: left;">
+                    Click "Select CBZ Files" to choose your manga/comic files<br><br>
+                    Select an output directory for the compressed files<br><br>
+                    Adjust the quality setting if needed (85 is recommended)<br><br>
+                    Click "Compress" to start the process
+                </div>
+            </div>
+            """
+        )
+
+        # Quality Settings tab
+        quality_settings = QTextBrowser()
+        quality_settings.setOpenExternalLinks(True)
+        quality_settings.setHtml(
+            """
+            <div style="display: flex; flex-direction: column; justify-content: center; height: 100%;">
+                <div style="text-align: left;">
+                    <b>100</b>: Maximum quality, largest file size<br><br>
+                    <b>85</b>: Good balance (recommended)<br><br>
+                    <b>70</b>: Smaller file size, slight quality loss<br><br>
+                    <b>50</b>: Significant compression, noticeable quality loss
+                </div>
+            </div>
+            """
+        )
+
+        # About tab
+        about = QTextBrowser()
+        about.setOpenExternalLinks(True)
+        about.setHtml(
+            """
+            <div style="display: flex; flex-direction: column; justify-content: center; height: 100%;">
+                <div style="text-align: left; margin-bottom: 20px;">
+                    <span style="font-size: 24px; color: #88C0D0;">Nanamin 1.0.0</span>
+                </div>
+                <div style="text-align: left; margin-bottom: 20px;">
+                    <a href="https://github.com/crisperience" style="color: #88C0D0; text-decoration: none; font-size: 16px;">📦 GitHub</a>
+                </div>
+                <div style="text-align: left;">
+                    <a href="mailto:martin@crisp.hr" style="color: #88C0D0; text-decoration: none; font-size: 16px;">✉️ martin@crisp.hr</a>
+                </div>
+            </div>
+            """
+        )
+
+        # Add tabs
+        self.tab_widget.addTab(getting_started, "Getting Started")
+        self.tab_widget.addTab(quality_settings, "Quality Settings")
+        self.tab_widget.addTab(about, "About")
+
+        layout.addWidget(self.tab_widget)
+
+        # Add close button
+        close_button = ModernButton("Close")
+        close_button.clicked.connect(self.accept)
+        layout.addWidget(close_button)
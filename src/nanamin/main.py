@@ -1,38 +1,31 @@
+import multiprocessing
 import os
 import sys
 import time
 from pathlib import Path
 
-from PyQt6.QtCore import Qt, QThread, pyqtSignal
-from PyQt6.QtGui import (
-    QColor,
-    QKeySequence,
-    QPaintEvent,
-    QPalette,
-    QResizeEvent,
-    QShortcut,
-)
+from PyQt6.QtCore import Qt, QThread, QTimer, pyqtSignal
+from PyQt6.QtGui import QColor, QKeySequence, QPalette, QShortcut
 from PyQt6.QtWidgets import (
     QApplication,
-    QDialog,
+    QComboBox,
     QFileDialog,
-    QGroupBox,
     QHBoxLayout,
     QLabel,
     QMainWindow,
     QMessageBox,
-    QProgressBar,
-    QPushButton,
     QSlider,
     QSpinBox,
-    QTabWidget,
-    QTextBrowser,
-    QToolButton,
     QVBoxLayout,
     QWidget,
 )
 
-from utils.compressor import CBZCompressor
+# Fast start: Pillow, the compressor and the help dialog are imported on
+# first use, so the window is up before any of them load
+from nanamin.utils.cancellation import CancellationToken, CompressionCancelledError
+from nanamin.utils.formats import available_formats
+from nanamin.utils.progress import ProgressAggregator, ProgressSnapshot
+from nanamin.widgets import ModernButton, ModernGroupBox, ModernInfoIcon, ModernProgressBar
 
 # Constants
 SECONDS_IN_MINUTE: int = 60
@@ -40,254 +33,79 @@ SECONDS_IN_HOUR: int = 3600
 DEFAULT_QUALITY: int = 85
 
 
-class ModernProgressBar(QProgressBar):
-    def __init__(self, parent: QWidget | None = None) -> None:
-        super().__init__(parent)
-        self.setTextVisible(True)
-        self.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.setMinimumHeight(25)
-        self.setStyleSheet(
-            """
-            QProgressBar {
-                border: 2px solid #4C566A;
-                border-radius: 5px;
-                text-align: center;
-                background-color: #2E3440;
-                color: #ECEFF4;
-            }
-            QProgressBar::chunk {
-                background-color: #88C0D0;
-                border-radius: 3px;
-            }
-        """
-        )
+def output_path_for(input_file: str, output_dir: str) -> str:
+    """Get the path a compressed archive is written to.
 
+    Args:
+        input_file: Input CBZ file
+        output_dir: Selected output directory
 
-class ModernButton(QPushButton):
-    def __init__(self, text: str, parent: QWidget | None = None) -> None:
-        super().__init__(text, parent)
-        self.setStyleSheet(
-            """
-            QPushButton {
-                background-color: #5E81AC;
-                color: #ECEFF4;
-                border: none;
-                border-radius: 5px;
-                padding: 8px 16px;
-                font-weight: bold;
-            }
-            QPushButton:hover {
-                background-color: #81A1C1;
-            }
-            QPushButton:pressed {
-                background-color: #4C566A;
-            }
-            QPushButton:disabled {
-                background-color: #3B4252;
-                color: #4C566A;
-            }
-        """
-        )
-        self.setMinimumHeight(35)
-
-
-class ModernGroupBox(QGroupBox):
-    def __init__(self, title: str, parent: QWidget | None = None) -> None:
-        super().__init__(title, parent)
-        self.setStyleSheet(
-            """
-            QGroupBox {
-                font-weight: bold;
-                border: 2px solid #4C566A;
-                border-radius: 5px;
-                margin-top: 10px;
-                padding-top: 10px;
-                color: #ECEFF4;
-            }
-            QGroupBox::title {
-                subcontrol-origin: margin;
-                left: 10px;
-                padding: 0 5px;
-                color: #88C0D0;
-            }
-        """
-        )
-
-
-class ModernInfoIcon(QToolButton):
-    def __init__(self, parent: QWidget | None = None) -> None:
-        super().__init__(parent)
-        self.setFixedSize(24, 24)
-        self.setStyleSheet(
-            """
-            QToolButton {
-                border: none;
-                padding: 4px;
-                background: transparent;
-                color: #88C0D0;
-                font-size: 16px;
-                font-weight: bold;
-            }
-            QToolButton:hover {
-                background-color: #4C566A;
-                border-radius: 4px;
-            }
-        """
-        )
-        self.setToolTip("Click for help and keyboard shortcuts")
-        self.setText("?")
-
-    def paintEvent(self, event: QPaintEvent | None) -> None:
-        """Handle paint event for the help icon."""
-        super().paintEvent(event)
-
-    def resizeEvent(self, event: QResizeEvent | None) -> None:
-        """Handle window resize to keep help button in top-right corner."""
-        super().resizeEvent(event)
-        # Find the help button and update its position with padding
-        for child in self.findChildren(ModernInfoIcon):
-            child.move(self.width() - 40, 15)
+    Returns:
+        Output path, named like the input file
+    """
+    return os.path.join(output_dir, os.path.basename(input_file))
 
 
 class CompressionWorker(QThread):
-    progress = pyqtSignal(
-        int, int, int, str, float
-    )  # total, current, file_num, filename, speed
+    progress = pyqtSignal(object)  # ProgressSnapshot, at most DEFAULT_FRAME_RATE per second
     finished = pyqtSignal()
+    cancelled = pyqtSignal()
     error = pyqtSignal(str)
 
     def __init__(
         self,
-        input_file: str,
-        output_file: str,
+        input_files: list[str],
+        output_dir: str,
         quality: int,
+        output_format: str = "jpeg",
         parent: QWidget | None = None,
     ) -> None:
         super().__init__(parent)
-        self.input_file = input_file
-        self.output_file = output_file
+        self.input_files = input_files
+        self.output_dir = output_dir
         self.quality = quality
-        self.compressor = CBZCompressor(quality)
+        self.output_format = output_format
+        self.cancel_token = CancellationToken()
 
-    def run(self) -> None:
-        """Process the CBZ file in a separate thread."""
-        try:
+    def stop(self) -> None:
+        """Cancel the batch; pages already encoding finish first."""
+        self.cancel_token.cancel()
+
+    def pause(self) -> None:
+        """Pause the batch once the pages already encoding are done."""
+        self.cancel_token.pause()
 
-            def progress_callback(total: int, current: int, filename: str) -> None:
-                self.progress.emit(total, current, current, filename, 0.0)
+    def resume(self) -> None:
+        """Resume a paused batch."""
+        self.cancel_token.resume()
 
-            self.compressor.process_cbz(
-                self.input_file, self.output_file, progress_callback
-            )
+    def run(self) -> None:
+        """Process the CBZ files in a separate thread."""
+        try:
+            # Loads Pillow on first use, off the UI thread
+            from nanamin.utils.batch import BatchCompressor
+            from nanamin.utils.compressor import CBZCompressor
+
+            # Pages finish far faster than the UI can usefully redraw; only
+            # one snapshot per frame crosses to the UI thread
+            aggregator = ProgressAggregator(self.progress.emit)
+            jobs = [
+                (input_file, output_path_for(input_file, self.output_dir))
+                for input_file in self.input_files
+            ]
+            try:
+                BatchCompressor(CBZCompressor(self.quality), self.output_format).process_batch(
+                    jobs, aggregator.update, cancel_token=self.cancel_token
+                )
+            finally:
+                aggregator.flush()
             self.finished.emit()
+        except CompressionCancelledError:
+            self.cancelled.emit()
         except Exception as error:
             self.error.emit(str(error))
 
 
-class HelpDialog(QDialog):
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.setWindowTitle("Help - Manga & Comic Optimizer")
-        self.setMinimumSize(600, 400)
-        self.setStyleSheet(
-            """
-            QDialog {
-                background-color: #2E3440;
-            }
-            QTabWidget::pane {
-                border: 1px solid #4C566A;
-                background-color: #2E3440;
-            }
-            QTabBar::tab {
-                background-color: #3B4252;
-                color: #ECEFF4;
-                padding: 8px 16px;
-                border: 1px solid #4C566A;
-                border-bottom: none;
-                border-top-left-radius: 4px;
-                border-top-right-radius: 4px;
-            }
-            QTabBar::tab:selected {
-                background-color: #5E81AC;
-            }
-            QTextBrowser {
-                background-color: #2E3440;
-                color: #ECEFF4;
-                border: none;
-                padding: 10px;
-            }
-        """
-        )
-
-        layout = QVBoxLayout(self)
-
-        # Create tab widget
-        self.tab_widget = QTabWidget()
-
-        # Getting Started tab
-        getting_started = QTextBrowser()
-        getting_started.setOpenExternalLinks(True)
-        getting_started.setHtml(
-            """
-            <div style="display: flex; flex-direction: column; justify-content: center; height: 100%;">
-                <div style="text-align: left;">
-                    Click "Select CBZ Files" to choose your manga/comic files<br><br>
-                    Select an output directory for the compressed files<br><br>
-                    Adjust the quality setting if needed (85 is recommended)<br><br>
-                    Click "Compress" to start the process
-                </div>
-            </div>
-            """
-        )
-
-        # Quality Settings tab
-        quality_settings = QTextBrowser()
-        quality_settings.setOpenExternalLinks(True)
-        quality_settings.setHtml(
-            """
-            <div style="display: flex; flex-direction: column; justify-content: center; height: 100%;">
-                <div style="text-align: left;">
-                    <b>100</b>: Maximum quality, largest file size<br><br>
-                    <b>85</b>: Good balance (recommended)<br><br>
-                    <b>70</b>: Smaller file size, slight quality loss<br><br>
-                    <b>50</b>: Significant compression, noticeable quality loss
-                </div>
-            </div>
-            """
-        )
-
-        # About tab
-        about = QTextBrowser()
-        about.setOpenExternalLinks(True)
-        about.setHtml(
-            """
-            <div style="display: flex; flex-direction: column; justify-content: center; height: 100%;">
-                <div style="text-align: left; margin-bottom: 20px;">
-                    <span style="font-size: 24px; color: #88C0D0;">Nanamin 1.0.0</span>
-                </div>
-                <div style="text-align: left; margin-bottom: 20px;">
-                    <a href="https://github.com/crisperience" style="color: #88C0D0; text-decoration: none; font-size: 16px;">📦 GitHub</a>
-                </div>
-                <div style="text-align: left;">
-                    <a href="mailto:martin@crisp.hr" style="color: #88C0D0; text-decoration: none; font-size: 16px;">✉️ martin@crisp.hr</a>
-                </div>
-            </div>
-            """
-        )
-
-        # Add tabs
-        self.tab_widget.addTab(getting_started, "Getting Started")
-        self.tab_widget.addTab(quality_settings, "Quality Settings")
-        self.tab_widget.addTab(about, "About")
-
-        layout.addWidget(self.tab_widget)
-
-        # Add close button
-        close_button = ModernButton("Close")
-        close_button.clicked.connect(self.accept)
-        layout.addWidget(close_button)
-
-
 class MainWindow(QMainWindow):
     def __init__(self) -> None:
         super().__init__()
@@ -407,9 +225,28 @@ class MainWindow(QMainWindow):
         quality_layout.addWidget(self.quality_value)
         settings_layout.addLayout(quality_layout)
 
+        # Output format selection
+        format_layout = QHBoxLayout()
+        format_label = QLabel("Format:")
+        format_label.setStyleSheet("padding-left: 8px;")
+        self.format_combo = QComboBox()
+        # Probing the other formats loads Pillow, so it waits until the window is up
+        self.format_combo.addItem("JPEG", "jpeg")
+        QTimer.singleShot(0, self._add_available_formats)
+        format_layout.addWidget(format_label)
+        format_layout.addWidget(self.format_combo)
+        format_layout.addStretch()
+        settings_layout.addLayout(format_layout)
+
         settings_group.setLayout(settings_layout)
         self.main_layout.addWidget(settings_group)
 
+    def _add_available_formats(self) -> None:
+        """Add the output formats the installed Pillow can encode."""
+        for name in available_formats():
+            if self.format_combo.findData(name) < 0:
+                self.format_combo.addItem(name.upper(), name)
+
     def _setup_progress_group(self) -> None:
         """Set up the progress information group."""
         progress_group = ModernGroupBox("Progress")
@@ -459,6 +296,13 @@ class MainWindow(QMainWindow):
         self.abort_button.setToolTip("Abort current compression")
         button_layout.addWidget(self.abort_button)
 
+        # Pause button
+        self.pause_button = ModernButton("Pause")
+        self.pause_button.clicked.connect(self.toggle_pause)
+        self.pause_button.setEnabled(False)
+        self.pause_button.setToolTip("Pause or resume current compression")
+        button_layout.addWidget(self.pause_button)
+
         # Compress button
         self.compress_button = ModernButton("Compress")
         self.compress_button.clicked.connect(self.start_compression)
@@ -477,24 +321,16 @@ class MainWindow(QMainWindow):
     def setup_shortcuts(self) -> None:
         """Set up keyboard shortcuts for the application."""
         # File operations
-        QShortcut(QKeySequence("Ctrl+O"), self).activated.connect(
-            self.select_input_files
-        )
-        QShortcut(QKeySequence("Ctrl+S"), self).activated.connect(
-            self.select_output_directory
-        )
-        QShortcut(QKeySequence("Ctrl+R"), self).activated.connect(
-            self.start_compression
-        )
-        QShortcut(QKeySequence("Ctrl+."), self).activated.connect(
-            self.abort_compression
-        )
-        QShortcut(QKeySequence("Ctrl+N"), self).activated.connect(
-            self.reset_for_new_batch
-        )
+        QShortcut(QKeySequence("Ctrl+O"), self).activated.connect(self.select_input_files)
+        QShortcut(QKeySequence("Ctrl+S"), self).activated.connect(self.select_output_directory)
+        QShortcut(QKeySequence("Ctrl+R"), self).activated.connect(self.start_compression)
+        QShortcut(QKeySequence("Ctrl+."), self).activated.connect(self.abort_compression)
+        QShortcut(QKeySequence("Ctrl+N"), self).activated.connect(self.reset_for_new_batch)
 
     def show_help_section(self, tab_index: int) -> None:
         """Show the help dialog with a specific tab selected."""
+        from nanamin.help_dialog import HelpDialog
+
         dialog = HelpDialog(self)
         dialog.tab_widget.setCurrentIndex(tab_index)
         dialog.exec()
@@ -527,9 +363,7 @@ class MainWindow(QMainWindow):
 
     def select_output_directory(self) -> None:
         """Select output directory."""
-        directory = QFileDialog.getExistingDirectory(
-            self, "Select Output Directory", ""
-        )
+        directory = QFileDialog.getExistingDirectory(self, "Select Output Directory", "")
         if directory:
             self.output_dir = directory
             self.output_label.setText(directory)
@@ -542,6 +376,14 @@ class MainWindow(QMainWindow):
         if not self.output_dir:
             self.status_label.setText("Please select output directory")
             return
+        if any(
+            os.path.realpath(output_path_for(input_file, self.output_dir))
+            == os.path.realpath(input_file)
+            for input_file in self.input_files
+        ):
+            # Writing there would replace the originals with the compressed files
+            self.status_label.setText("Please select an output directory without the input files")
+            return
 
         # Disable compression settings
         self.quality_slider.setEnabled(False)
@@ -549,6 +391,8 @@ class MainWindow(QMainWindow):
 
         self.compress_button.setEnabled(False)
         self.abort_button.setEnabled(True)
+        self.pause_button.setEnabled(True)
+        self.pause_button.setText("Pause")
         self.status_label.setText("Compressing...")
         self.progress_bar.setValue(0)
         self.file_progress_label.setText("File: 0/0")
@@ -559,10 +403,14 @@ class MainWindow(QMainWindow):
 
         self.start_time = time.time()
         self.worker = CompressionWorker(
-            self.input_files[0], self.output_dir, self.quality_value.value()
+            self.input_files,
+            self.output_dir,
+            self.quality_value.value(),
+            self.format_combo.currentData(),
         )
         self.worker.progress.connect(self.update_progress)
         self.worker.finished.connect(self.compression_finished)
+        self.worker.cancelled.connect(self.compression_cancelled)
         self.worker.error.connect(self.compression_error)
         self.worker.start()
 
@@ -572,33 +420,39 @@ class MainWindow(QMainWindow):
             self.worker.stop()
             self.status_label.setText("Aborting...")
             self.abort_button.setEnabled(False)
+            self.pause_button.setEnabled(False)
 
-    def update_progress(
-        self,
-        total_images: int,
-        processed_images: int,
-        current_file_num: int,
-        current_file: str,
-        speed: float,
-    ) -> None:
-        """Update progress information."""
+    def toggle_pause(self) -> None:
+        """Pause or resume the compression process."""
+        if not self.worker or not self.worker.isRunning():
+            return
+        if self.worker.cancel_token.paused:
+            self.worker.resume()
+            self.pause_button.setText("Pause")
+            self.status_label.setText("Compressing...")
+        else:
+            self.worker.pause()
+            self.pause_button.setText("Resume")
+            self.status_label.setText("Paused")
+
+    def update_progress(self, snapshot: ProgressSnapshot) -> None:
+        """Update progress information from a coalesced snapshot."""
         total_files = len(self.input_files)
-        self.progress_bar.setValue(int((processed_images / total_images) * 100))
-        self.file_progress_label.setText(f"File: {current_file_num}/{total_files}")
-        self.image_progress_label.setText(f"Images: {processed_images}/{total_images}")
-        self.current_file_label.setText(f"Current: {current_file}")
-        self.speed_label.setText(f"Speed: {speed:.1f} images/sec")
-
-        # Calculate and display ETA
-        if speed > 0:
-            remaining_images = total_images - processed_images
-            eta_seconds = remaining_images / speed
+        self.progress_bar.setValue(int(snapshot.fraction * 100))
+        self.file_progress_label.setText(f"File: {snapshot.archive_index + 1}/{total_files}")
+        self.image_progress_label.setText(f"Images: {snapshot.batch_done}/{snapshot.batch_total}")
+        self.current_file_label.setText(f"Current: {snapshot.filename}")
+        self.speed_label.setText(f"Speed: {snapshot.pages_per_second:.1f} images/sec")
+
+        # Display the smoothed ETA across the whole batch
+        eta_seconds = snapshot.eta_seconds
+        if eta_seconds is not None:
             if eta_seconds < SECONDS_IN_MINUTE:
                 eta_text = f"{eta_seconds:.0f} seconds"
             elif eta_seconds < SECONDS_IN_HOUR:
-                eta_text = f"{eta_seconds/SECONDS_IN_MINUTE:.1f} minutes"
+                eta_text = f"{eta_seconds / SECONDS_IN_MINUTE:.1f} minutes"
             else:
-                eta_text = f"{eta_seconds/SECONDS_IN_HOUR:.1f} hours"
+                eta_text = f"{eta_seconds / SECONDS_IN_HOUR:.1f} hours"
             self.eta_label.setText(f"ETA: {eta_text}")
 
     def reset_for_new_batch(self) -> None:
@@ -626,6 +480,7 @@ class MainWindow(QMainWindow):
 
         self.compress_button.setEnabled(False)
         self.abort_button.setEnabled(False)
+        self.pause_button.setEnabled(False)
         self.new_batch_button.setEnabled(True)
         self.status_label.setText("Compression completed")
         self.progress_bar.setValue(100)
@@ -640,6 +495,19 @@ class MainWindow(QMainWindow):
         )
         QMessageBox.information(self, "Compression Results", message)
 
+    def compression_cancelled(self) -> None:
+        """Handle an aborted compression."""
+        # Re-enable compression settings
+        self.quality_slider.setEnabled(True)
+        self.quality_value.setEnabled(True)
+
+        self.compress_button.setEnabled(False)
+        self.abort_button.setEnabled(False)
+        self.pause_button.setEnabled(False)
+        self.new_batch_button.setEnabled(True)
+        self.status_label.setText("Compression aborted")
+        self.progress_bar.setValue(0)
+
     def compression_error(self, error: str) -> None:
         """Handle compression errors."""
         # Re-enable compression settings
@@ -648,6 +516,7 @@ class MainWindow(QMainWindow):
 
         self.compress_button.setEnabled(False)
         self.abort_button.setEnabled(False)
+        self.pause_button.setEnabled(False)
         self.new_batch_button.setEnabled(True)
         self.status_label.setText(f"Error: {error}")
         self.progress_bar.setValue(0)
@@ -655,6 +524,9 @@ class MainWindow(QMainWindow):
 
 
 def main() -> None:
+    # Process pool workers are spawned from the frozen app bundle
+    multiprocessing.freeze_support()
+
     # Initialize necessary directories
     home = str(Path.home())
     app_data = os.path.join(home, ".nanamin")
@@ -0,0 +1,640 @@
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import os
+import signal
+import sys
+import time
+import uuid
+from collections.abc import Container
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Any
+from urllib.parse import urlsplit
+
+# Headless entry point: nothing imported here may pull in PyQt6
+from nanamin.utils.batch import BatchCompressor, BatchProgress
+from nanamin.utils.cancellation import CancellationToken, CompressionCancelledError
+from nanamin.utils.compressor import MAX_QUALITY, MIN_QUALITY, CBZCompressor
+from nanamin.utils.executors import DEFAULT_BACKEND, EXECUTOR_BACKENDS, create_executor
+from nanamin.utils.formats import get_format
+
+# Constants
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_QUALITY = 85
+DEFAULT_CONCURRENCY = 2  # Archives compressed at once on the shared pool
+DEFAULT_PRIORITY = 0  # Lower values run first
+MAX_REQUEST_BYTES = 1024 * 1024
+EVENT_QUEUE_SIZE = 1000  # Events buffered per subscriber before it is dropped
+FINISHED_STATUSES = ("done", "failed", "cancelled")
+# Host headers accepted besides the listening address; anything else may be a
+# DNS rebinding page talking to the service through the browser
+LOCAL_HOSTS = frozenset({"localhost", "127.0.0.1", "::1"})
+
+# Per-job settings a client may override, with their types
+JOB_SETTINGS: dict[str, type] = {
+    "quality": int,
+    "format": str,
+    "effort": int,
+    "storage": str,
+    "incremental": bool,
+    "resume": bool,
+    "bad_pages": str,
+    "detect_grayscale": bool,
+    "max_dimension": int,
+    "target_dpi": int,
+}
+
+HTTP_REASONS = {
+    200: "OK",
+    202: "Accepted",
+    400: "Bad Request",
+    403: "Forbidden",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    409: "Conflict",
+    413: "Payload Too Large",
+}
+
+
+class RequestError(Exception):
+    """A request the service rejects, with the HTTP status to answer."""
+
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class Job:
+    """One archive submitted to the service."""
+
+    id: str
+    input: str
+    output: str
+    priority: int = DEFAULT_PRIORITY
+    settings: dict[str, Any] = field(default_factory=dict)
+    status: str = "queued"  # queued, running, done, failed or cancelled
+    submitted: float = field(default_factory=time.time)
+    started: float | None = None
+    finished: float | None = None
+    pages_total: int = 0
+    pages_done: int = 0
+    compressed_bytes: int | None = None
+    error: str | None = None
+
+
+class CompressionService:
+    """Queue of compression jobs running on warm, shared worker pools.
+
+    Jobs wait in a priority queue (lower priority values first, then in
+    submission order) and at most ``concurrency`` archives are compressed at
+    once. All of them encode on one encode pool that lives as long as the
+    service, so no job pays for starting workers. Every state change and
+    written page is published as an event to all subscribers.
+    """
+
+    def __init__(
+        self,
+        quality: int = DEFAULT_QUALITY,
+        backend: str = DEFAULT_BACKEND,
+        max_workers: int | None = None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+    ) -> None:
+        """Initialize compression service.
+
+        Args:
+            quality: Default compression quality for jobs
+            backend: Executor backend of the shared encode pool
+            max_workers: Encode workers in the shared pool (defaults to one
+                less than the number of CPUs)
+            concurrency: Maximum number of archives compressed at once
+        """
+        self.defaults: dict[str, Any] = {"quality": quality, "format": "jpeg"}
+        self.backend = backend
+        self.max_workers = max_workers or CBZCompressor(quality).max_workers
+        self.concurrency = concurrency
+        self.jobs: dict[str, Job] = {}
+        self._queue: asyncio.PriorityQueue[tuple[int, int, str]] = asyncio.PriorityQueue()
+        self._order = itertools.count()
+        self._subscribers: set[asyncio.Queue[dict[str, Any]]] = set()
+        self._encode_pool: Executor | None = None
+        self._job_threads: ThreadPoolExecutor | None = None
+        self._runners: list[asyncio.Task[None]] = []
+        self._tokens: dict[str, CancellationToken] = {}  # Running job id -> token
+
+    async def start(self) -> None:
+        """Start the worker pools and job runners."""
+        self._encode_pool = create_executor(self.backend, self.max_workers)
+        # Archive reading and writing happens on these, one thread per running job
+        self._job_threads = ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix="nanamin-job"
+        )
+        self._runners = [asyncio.create_task(self._run_jobs()) for _ in range(self.concurrency)]
+
+    async def stop(self) -> None:
+        """Stop the runners and shut the worker pools down."""
+        for token in self._tokens.values():
+            token.cancel()
+        for runner in self._runners:
+            runner.cancel()
+        await asyncio.gather(*self._runners, return_exceptions=True)
+        if self._job_threads is not None:
+            self._job_threads.shutdown(wait=True, cancel_futures=True)
+        if self._encode_pool is not None:
+            self._encode_pool.shutdown(wait=True, cancel_futures=True)
+
+    async def submit(self, request: dict[str, Any]) -> Job:
+        """Validate a job request and queue it.
+
+        Args:
+            request: JSON object with "input", optional "output" (defaults
+                to the input name in an "optimized" directory beside it),
+                "priority" and any of JOB_SETTINGS
+
+        Returns:
+            The queued job
+
+        Raises:
+            RequestError: If the request is invalid (400), or its output is
+                the input or output of a queued or running job (409)
+        """
+        input_path = request.get("input")
+        if not isinstance(input_path, str) or not input_path:
+            raise RequestError(400, "Missing input path")
+        input_path = os.path.abspath(input_path)
+        output_path = request.get(
+            "output",
+            os.path.join(os.path.dirname(input_path), "optimized", os.path.basename(input_path)),
+        )
+        if not isinstance(output_path, str) or os.path.abspath(output_path) == input_path:
+            raise RequestError(400, "Output must be a path other than the input")
+        priority = request.get("priority", DEFAULT_PRIORITY)
+        if not isinstance(priority, int):
+            raise RequestError(400, "Priority must be an integer")
+
+        overrides = request.get("settings", {})
+        if not isinstance(overrides, dict):
+            raise RequestError(400, "Settings must be a JSON object")
+        settings = dict(self.defaults)
+        for name, value in overrides.items():
+            expected = JOB_SETTINGS.get(name)
+            # JSON booleans are ints in Python; only accept them where a bool is expected
+            if (
+                expected is None
+                or not isinstance(value, expected)
+                or (isinstance(value, bool) and expected is not bool)
+            ):
+                raise RequestError(400, f"Invalid setting: {name}")
+            settings[name] = value
+        # The compressor checks the policies and ranges the command line checks
+        encoder_options = {name: value for name, value in settings.items() if name != "format"}
+        try:
+            get_format(settings["format"])
+            compressor = CBZCompressor(**encoder_options)
+        except ValueError as e:
+            raise RequestError(400, str(e)) from e
+        # Opening the archive is blocking file I/O; keep it off the event loop
+        is_valid, error = await asyncio.get_running_loop().run_in_executor(
+            None, compressor.validate_cbz, input_path
+        )
+        if not is_valid:
+            raise RequestError(400, error)
+        # Checked after the last await, so no other submit can slip in between
+        self._check_paths(input_path, os.path.abspath(output_path))
+
+        job = Job(
+            id=uuid.uuid4().hex[:12],
+            input=input_path,
+            output=os.path.abspath(output_path),
+            priority=priority,
+            settings=settings,
+        )
+        self.jobs[job.id] = job
+        self._queue.put_nowait((priority, next(self._order), job.id))
+        self._publish("queued", job)
+        return job
+
+    def _check_paths(self, input_path: str, output_path: str) -> None:
+        """Refuse a job whose files overlap with those of an unfinished job.
+
+        Jobs writing the same output would share its partial file and page
+        journal, and a job reading another job's output would see it half
+        written.
+
+        Args:
+            input_path: Absolute input path of the new job
+            output_path: Absolute output path of the new job
+
+        Raises:
+            RequestError: If another queued or running job writes the new
+                job's input or output, or reads its output
+        """
+        new_input, new_output = _path_key(input_path), _path_key(output_path)
+        for job in self.jobs.values():
+            if job.status not in ("queued", "running"):
+                continue
+            if _path_key(job.output) in (new_input, new_output):
+                raise RequestError(409, f"Job {job.id} is writing {job.output}")
+            if _path_key(job.input) == new_output:
+                raise RequestError(409, f"Job {job.id} is reading {job.input}")
+
+    def cancel(self, job_id: str) -> Job:
+        """Cancel a queued or running job.
+
+        A running job stops reading pages at once and is marked cancelled
+        when its in-flight pages have drained and its partial output has
+        been removed.
+
+        Args:
+            job_id: Job to cancel
+
+        Returns:
+            The cancelled job, still running if it is draining
+
+        Raises:
+            RequestError: If the job is unknown or already finished
+        """
+        job = self.get(job_id)
+        token = self._tokens.get(job_id)
+        if token is not None:
+            token.cancel()
+            return job
+        if job.status != "queued":
+            raise RequestError(409, f"Job {job_id} is {job.status}")
+        job.status = "cancelled"
+        job.finished = time.time()
+        self._publish("cancelled", job)
+        return job
+
+    def get(self, job_id: str) -> Job:
+        """Look up a job.
+
+        Raises:
+            RequestError: If the job is unknown
+        """
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise RequestError(404, f"Unknown job: {job_id}")
+        return job
+
+    def subscribe(self) -> asyncio.Queue[dict[str, Any]]:
+        """Register for events; pair with unsubscribe()."""
+        events: asyncio.Queue[dict[str, Any]] = asyncio.Queue(EVENT_QUEUE_SIZE)
+        self._subscribers.add(events)
+        return events
+
+    def unsubscribe(self, events: asyncio.Queue[dict[str, Any]]) -> None:
+        """Stop delivering events to a subscriber queue."""
+        self._subscribers.discard(events)
+
+    def _publish(self, event: str, job: Job, **details: Any) -> None:
+        message = {
+            "event": event,
+            "job": job.id,
+            "status": job.status,
+            "time": time.time(),
+            **details,
+        }
+        for events in list(self._subscribers):
+            try:
+                events.put_nowait(message)
+            except asyncio.QueueFull:
+                # A subscriber that stopped reading must not stall the service
+                self._subscribers.discard(events)
+
+    async def _run_jobs(self) -> None:
+        """Take jobs from the queue and compress them, one at a time."""
+        loop = asyncio.get_running_loop()
+        while True:
+            _, _, job_id = await self._queue.get()
+            job = self.jobs[job_id]
+            if job.status != "queued":
+                continue
+            job.status = "running"
+            job.started = time.time()
+            self._publish("started", job)
+            token = self._tokens[job_id] = CancellationToken()
+            try:
+                await loop.run_in_executor(self._job_threads, self._compress, job, loop, token)
+            except CompressionCancelledError:
+                job.status = "cancelled"
+            except Exception as e:
+                job.status = "failed"
+                job.error = str(e)
+            else:
+                job.status = "done"
+                job.compressed_bytes = os.path.getsize(job.output)
+            finally:
+                del self._tokens[job_id]
+            job.finished = time.time()
+            self._publish(
+                job.status,
+                job,
+                compressed_bytes=job.compressed_bytes,
+                error=job.error,
+                seconds=round(job.finished - job.started, 3),
+            )
+
+    def _compress(
+        self, job: Job, loop: asyncio.AbstractEventLoop, cancel_token: CancellationToken
+    ) -> None:
+        """Compress one job on the shared encode pool (runs in a job thread)."""
+        settings = dict(job.settings)
+        output_format = settings.pop("format")
+        compressor = CBZCompressor(
+            settings.pop("quality"),
+            backend=self.backend,
+            max_workers=self.max_workers,
+            executor=self._encode_pool,
+            **settings,
+        )
+
+        def progress(update: BatchProgress) -> None:
+            def publish() -> None:
+                job.pages_total = update.archive_total
+                job.pages_done = update.archive_done
+                self._publish(
+                    "progress",
+                    job,
+                    pages_total=update.archive_total,
+                    pages_done=update.archive_done,
+                    filename=update.filename,
+                    speed=round(update.speed, 3),
+                )
+
+            loop.call_soon_threadsafe(publish)
+
+        BatchCompressor(compressor, output_format).process_batch(
+            [(job.input, job.output)], progress, cancel_token=cancel_token
+        )
+
+
+def _path_key(path: str) -> str:
+    """Normalize a path so that two spellings of one file compare equal."""
+    return os.path.normcase(os.path.realpath(path))
+
+
+async def _read_request(
+    reader: asyncio.StreamReader, allowed_hosts: Container[str] = LOCAL_HOSTS
+) -> tuple[str, str, dict[str, Any]]:
+    """Read one HTTP request.
+
+    Browsers may reach a localhost service from any web page, so requests
+    naming another host (DNS rebinding) or carrying an Origin header (sent
+    by browsers on cross-origin requests, never by curl or scripts) are
+    refused.
+
+    Args:
+        reader: Client connection
+        allowed_hosts: Host names the Host header may name
+
+    Returns:
+        (method, path, JSON body or an empty dict)
+
+    Raises:
+        RequestError: If the request is malformed or may come from a browser
+    """
+    request_line = (await reader.readline()).decode("latin-1").strip()
+    parts = request_line.split()
+    if len(parts) != 3:
+        raise RequestError(400, "Malformed request line")
+    method, target, _ = parts
+    headers: dict[str, str] = {}
+    while True:
+        line = (await reader.readline()).decode("latin-1").strip()
+        if not line:
+            break
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    if "origin" in headers:
+        raise RequestError(403, "Cross-origin requests are not allowed")
+    host = headers.get("host")
+    if host is not None and urlsplit(f"//{host}").hostname not in allowed_hosts:
+        raise RequestError(403, f"Host not allowed: {host}")
+    try:
+        length = int(headers.get("content-length", "0") or 0)
+    except ValueError:
+        raise RequestError(400, "Invalid Content-Length") from None
+    if length < 0:
+        raise RequestError(400, "Invalid Content-Length")
+    if length > MAX_REQUEST_BYTES:
+        raise RequestError(413, "Request body too large")
+    body: dict[str, Any] = {}
+    if length:
+        try:
+            body = json.loads(await reader.readexactly(length))
+        except ValueError as e:
+            raise RequestError(400, f"Invalid JSON body: {e!s}") from e
+        if not isinstance(body, dict):
+            raise RequestError(400, "Request body must be a JSON object")
+    return method.upper(), urlsplit(target).path.rstrip("/") or "/", body
+
+
+def _write_response(writer: asyncio.StreamWriter, status: int, payload: Any) -> None:
+    body = json.dumps(payload).encode("utf-8")
+    writer.write(
+        (
+            f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n"
+        ).encode("latin-1")
+        + body
+    )
+
+
+async def _stream_events(
+    service: CompressionService, writer: asyncio.StreamWriter, job_id: str | None
+) -> None:
+    """Stream events as newline-delimited JSON until the client disconnects.
+
+    Args:
+        service: Service to subscribe to
+        writer: Client connection
+        job_id: Only stream events of this job, and stop once it finishes
+    """
+    job = service.get(job_id) if job_id is not None else None
+    events = service.subscribe()
+    try:
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: application/x-ndjson\r\n"
+            b"Cache-Control: no-cache\r\n"
+            b"Connection: close\r\n\r\n"
+        )
+        if job is not None:
+            writer.write(json.dumps({"event": "snapshot", "job": asdict(job)}).encode() + b"\n")
+            if job.status in FINISHED_STATUSES:
+                return
+        await writer.drain()
+        while True:
+            event = await events.get()
+            if job_id is not None and event["job"] != job_id:
+                continue
+            writer.write(json.dumps(event).encode("utf-8") + b"\n")
+            await writer.drain()
+            if job_id is not None and event["status"] in FINISHED_STATUSES:
+                return
+    finally:
+        service.unsubscribe(events)
+
+
+async def handle_connection(
+    service: CompressionService,
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    allowed_hosts: Container[str] = LOCAL_HOSTS,
+) -> None:
+    """Serve one HTTP request.
+
+    Requests whose Host header names a host outside ``allowed_hosts``, and
+    all requests with an Origin header, are refused (see _read_request).
+
+    Routes:
+        POST /jobs: submit a job (see CompressionService.submit)
+        GET /jobs: list all jobs
+        GET /jobs/<id>: get one job
+        DELETE /jobs/<id>: cancel a queued or running job
+        GET /events: stream every event as newline-delimited JSON
+        GET /jobs/<id>/events: stream the events of one job until it ends
+    """
+    try:
+        method, path, body = await _read_request(reader, allowed_hosts)
+        parts = path.strip("/").split("/")
+        if parts == ["events"] and method == "GET":
+            await _stream_events(service, writer, None)
+        elif parts[0] == "jobs" and len(parts) == 3 and parts[2] == "events" and method == "GET":
+            await _stream_events(service, writer, parts[1])
+        elif parts == ["jobs"] and method == "POST":
+            _write_response(writer, 202, asdict(await service.submit(body)))
+        elif parts == ["jobs"] and method == "GET":
+            _write_response(writer, 200, [asdict(job) for job in service.jobs.values()])
+        elif parts[0] == "jobs" and len(parts) == 2 and method == "GET":
+            _write_response(writer, 200, asdict(service.get(parts[1])))
+        elif parts[0] == "jobs" and len(parts) == 2 and method == "DELETE":
+            _write_response(writer, 200, asdict(service.cancel(parts[1])))
+        elif parts[0] in ("jobs", "events"):
+            raise RequestError(405, f"{method} not allowed on {path}")
+        else:
+            raise RequestError(404, f"Not found: {path}")
+    except RequestError as e:
+        _write_response(writer, e.status, {"error": str(e)})
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        with contextlib.suppress(ConnectionError):
+            await writer.drain()
+        writer.close()
+
+
+async def serve(args: argparse.Namespace) -> None:
+    """Run the service until cancelled.
+
+    Args:
+        args: Parsed command-line arguments
+    """
+    service = CompressionService(args.quality, args.backend, args.workers, args.concurrency)
+    await service.start()
+    # Clients may also name the address the service was told to listen on
+    allowed_hosts = LOCAL_HOSTS | {args.host.lower()}
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        await handle_connection(service, reader, writer, allowed_hosts)
+
+    if args.socket:
+        server = await asyncio.start_unix_server(handle, path=args.socket)
+        address = args.socket
+    else:
+        server = await asyncio.start_server(handle, args.host, args.port)
+        address = f"http://{args.host}:{args.port}"
+    # Shut down cleanly on SIGTERM too, e.g. when stopped by a service manager
+    current = asyncio.current_task()
+    if current is not None:
+        with contextlib.suppress(NotImplementedError):
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, current.cancel)
+    print(f"Nanamin service listening on {address}", file=sys.stderr, flush=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command-line arguments.
+
+    Args:
+        argv: Arguments to parse (defaults to sys.argv)
+
+    Returns:
+        Parsed arguments
+    """
+    parser = argparse.ArgumentParser(
+        prog="nanamin-service",
+        description="Run Nanamin as a long-lived local compression service.",
+    )
+    parser.add_argument(
+        "--host", default=DEFAULT_HOST, help="Address to listen on (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--port", type=int, default=DEFAULT_PORT, help="Port to listen on (default: %(default)s)"
+    )
+    parser.add_argument("--socket", default=None, help="Listen on this Unix socket instead of TCP")
+    parser.add_argument(
+        "-q",
+        "--quality",
+        type=int,
+        default=DEFAULT_QUALITY,
+        help="Default quality for jobs that do not set one (default: %(default)s)",
+    )
+    parser.add_argument(
+        "-w", "--workers", type=int, default=None, help="Encode workers in the shared pool"
+    )
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help="Archives compressed at once (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=EXECUTOR_BACKENDS,
+        default=DEFAULT_BACKEND,
+        help=f"Encode executor backend (default: {DEFAULT_BACKEND})",
+    )
+    args = parser.parse_args(argv)
+    if not MIN_QUALITY <= args.quality <= MAX_QUALITY:
+        parser.error(f"--quality must be between {MIN_QUALITY} and {MAX_QUALITY}")
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.socket and not hasattr(asyncio, "start_unix_server"):
+        parser.error("Unix sockets are not supported on this platform")
+    return args
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Run the nanamin-service command.
+
+    Args:
+        argv: Command-line arguments (defaults to sys.argv)
+
+    Returns:
+        Process exit code
+    """
+    args = parse_args(argv)
+    with contextlib.suppress(KeyboardInterrupt, asyncio.CancelledError):
+        asyncio.run(serve(args))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,871 @@
+import io
+import json
+import mmap
+import os
+import shutil
+import struct
+import time
+import zipfile
+import zlib
+from collections import deque
+from collections.abc import Callable, Generator, Hashable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import IO, Any, BinaryIO, NamedTuple, cast
+
+from nanamin.utils.pipeline import Encoded, PageData
+from nanamin.utils.spool import SPOOL_SUFFIX, PageSpool
+
+# Constants
+# Source pages that are re-encoded; every other member (including images
+# already in a modern format) is copied as-is
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+MANIFEST_NAME = "nanamin.json"
+MANIFEST_VERSION = 1
+PARTIAL_SUFFIX = ".part"
+QUARANTINE_SUFFIX = ".quarantine"
+# What to do with a page that cannot be read or encoded
+BAD_PAGE_POLICIES = ("fail", "skip", "quarantine")
+LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+LOCAL_HEADER_SIZE = 30
+DATA_DESCRIPTOR_FLAG = 0x08
+ENCRYPTED_FLAG = 0x01
+ZIP64_EXTRA_ID = 0x0001  # Rewritten by zipfile from the record's own sizes
+STORAGE_POLICIES = ("auto", "stored", "deflated", "measured")
+# Formats whose payload is already entropy-coded and gains nothing from deflate
+COMPRESSED_EXTENSIONS = (*IMAGE_EXTENSIONS, ".webp", ".avif", ".jxl", ".gif")
+MEASURE_SAMPLE_SIZE = 64 * 1024
+MEASURE_MIN_SAVING = 0.02  # Keep deflate only if it saves at least 2%
+WRITER_THREADS = min(4, os.cpu_count() or 1)  # Threads computing CRC32 and deflate
+RECORDS_PER_THREAD = 4  # Records prepared ahead of the archive per writer thread
+
+
+class MemberFailure(NamedTuple):
+    """A member of an archive that failed to read, validate or encode."""
+
+    member: str
+    error: str
+
+
+def choose_compression(filename: str, data: bytes, policy: str = "auto") -> int:
+    """Pick the zip compression method for one entry.
+
+    Args:
+        filename: Entry name inside the archive
+        data: Entry payload
+        policy: One of STORAGE_POLICIES. "auto" stores image payloads and
+            deflates everything else; "measured" deflates a sample of the
+            payload and keeps deflate only if it actually shrinks it.
+
+    Returns:
+        zipfile.ZIP_STORED or zipfile.ZIP_DEFLATED
+
+    Raises:
+        ValueError: If the policy is unknown
+    """
+    if policy == "stored":
+        return zipfile.ZIP_STORED
+    if policy == "deflated":
+        return zipfile.ZIP_DEFLATED
+    if policy == "measured":
+        sample = data[:MEASURE_SAMPLE_SIZE]
+        if not sample:
+            return zipfile.ZIP_STORED
+        saving = 1 - len(zlib.compress(sample, 1)) / len(sample)
+        return zipfile.ZIP_DEFLATED if saving >= MEASURE_MIN_SAVING else zipfile.ZIP_STORED
+    if policy != "auto":
+        raise ValueError(
+            f"Unknown storage policy: {policy} (expected one of {', '.join(STORAGE_POLICIES)})"
+        )
+    if filename.lower().endswith(COMPRESSED_EXTENSIONS):
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def member_fingerprint(info: zipfile.ZipInfo) -> str:
+    """Fingerprint a zip member from its central directory entry.
+
+    The CRC and size are stored in the zip headers, so change detection
+    never has to read or hash the page data itself.
+
+    Args:
+        info: Zip member info
+
+    Returns:
+        Fingerprint string
+    """
+    return f"{info.CRC:08x}-{info.file_size}"
+
+
+def _data_offset(header: bytes, info: zipfile.ZipInfo) -> int:
+    """Get the offset of a member's payload from its local file header.
+
+    Args:
+        header: The LOCAL_HEADER_SIZE bytes at the member's header offset
+        info: Member info
+
+    Returns:
+        Offset of the (compressed) payload in the archive
+
+    Raises:
+        zipfile.BadZipFile: If the local header is corrupt
+    """
+    if len(header) != LOCAL_HEADER_SIZE or header[:4] != LOCAL_HEADER_SIGNATURE:
+        raise zipfile.BadZipFile(f"Bad local file header for {info.filename}")
+    name_length, extra_length = struct.unpack("<HH", header[26:30])
+    return info.header_offset + LOCAL_HEADER_SIZE + int(name_length) + int(extra_length)
+
+
+class BufferReader(io.RawIOBase):
+    """Seekable read-only stream over a buffer, without copying it up front.
+
+    io.BytesIO copies any buffer that is not a bytes object; this hands
+    Pillow a memoryview slice of a mapped archive as a file instead, so
+    only the chunks the decoder actually reads are copied.
+    """
+
+    def __init__(self, buffer: PageData) -> None:
+        """Initialize buffer reader.
+
+        Args:
+            buffer: Data to read
+        """
+        super().__init__()
+        self._view = memoryview(buffer)
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        if offset < 0:
+            raise ValueError(f"Negative seek position {offset}")
+        self._position = offset
+        return offset
+
+    def read(self, size: int | None = -1) -> bytes:
+        start = min(self._position, len(self._view))
+        end = len(self._view) if size is None or size < 0 else min(start + size, len(self._view))
+        self._position = max(self._position, end)
+        return bytes(self._view[start:end])
+
+    def readinto(self, buffer: Any) -> int:
+        data = self.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+    def close(self) -> None:
+        self._view.release()
+        super().close()
+
+
+def open_page(data: PageData) -> IO[bytes]:
+    """Open page data as a file for Pillow.
+
+    Args:
+        data: Page bytes, or a view into a mapped archive
+
+    Returns:
+        Readable, seekable stream over the data
+    """
+    if isinstance(data, bytes):
+        return io.BytesIO(data)
+    # BufferReader implements the read/seek/tell part of IO[bytes] decoders use
+    return cast(IO[bytes], BufferReader(data))
+
+
+class ArchiveReader:
+    """Read members of an archive through a read-only memory map.
+
+    STORED members come back as memoryview slices of the mapping, so their
+    bytes are never copied before the decoder reads them; DEFLATED members
+    are inflated straight from the mapping into one buffer of the final
+    size. Other members, or archives that cannot be mapped, fall back to
+    zipfile. Every member is CRC-checked, as zipfile would; for STORED
+    slices that is one pass over bytes the decoder reads next anyway.
+
+    The mapping stays alive while any slice handed out still exists, so
+    pages can outlive the reader.
+    """
+
+    def __init__(self, path: str, zf: zipfile.ZipFile) -> None:
+        """Map an archive.
+
+        Args:
+            path: Path of the archive
+            zf: The same archive opened with zipfile, used as a fallback
+        """
+        self.zf = zf
+        self._map: mmap.mmap | None = None
+        try:
+            with open(path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            self._map = None
+
+    def read(self, info: zipfile.ZipInfo) -> PageData:
+        """Read a member's uncompressed data, verifying its CRC like zipfile does.
+
+        Args:
+            info: Member info
+
+        Returns:
+            A memoryview for STORED members, otherwise bytes
+
+        Raises:
+            zipfile.BadZipFile: If the member is corrupt
+        """
+        supported = info.compress_type in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED)
+        if self._map is None or not supported or info.flag_bits & ENCRYPTED_FLAG:
+            return self.zf.read(info)
+        start = _data_offset(
+            self._map[info.header_offset : info.header_offset + LOCAL_HEADER_SIZE], info
+        )
+        end = start + info.compress_size
+        if end > len(self._map):
+            raise zipfile.BadZipFile(f"Truncated member {info.filename}")
+        payload = memoryview(self._map)[start:end]
+        if info.compress_type == zipfile.ZIP_STORED:
+            if zlib.crc32(payload) != info.CRC:
+                payload.release()
+                raise zipfile.BadZipFile(f"Bad CRC-32 for file {info.filename!r}")
+            return payload
+        try:
+            data = zlib.decompress(payload, -zlib.MAX_WBITS, max(info.file_size, 1))
+        except zlib.error as e:
+            raise zipfile.BadZipFile(f"Bad compressed data for {info.filename}: {e!s}") from e
+        finally:
+            payload.release()
+        if zlib.crc32(data) != info.CRC:
+            raise zipfile.BadZipFile(f"Bad CRC-32 for file {info.filename!r}")
+        return data
+
+    def close(self) -> None:
+        """Release the mapping once no page slices refer to it anymore."""
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                # Pages still in flight hold slices; the mapping goes with them
+                pass
+            self._map = None
+
+
+def _strip_zip64_extra(extra: bytes) -> bytes:
+    """Drop zip64 records from a zip extra field, keeping all others.
+
+    Args:
+        extra: Extra field of a zip member
+
+    Returns:
+        The extra field without zip64 records
+    """
+    kept = []
+    offset = 0
+    while offset + 4 <= len(extra):
+        header_id, size = struct.unpack_from("<HH", extra, offset)
+        end = offset + 4 + size
+        if header_id != ZIP64_EXTRA_ID:
+            kept.append(extra[offset:end])
+        offset = end
+    return b"".join(kept)
+
+
+def read_raw_member(source: BinaryIO, info: zipfile.ZipInfo) -> tuple[zipfile.ZipInfo, bytes]:
+    """Read a member's compressed record so it can be copied as-is.
+
+    The local file record is rebuilt from the central directory entry, so
+    CRC, sizes, compression method and extra fields (timestamps, Unicode
+    paths) carry over unchanged; zip64 records are written afresh.
+
+    Args:
+        source: Binary file object of the source archive
+        info: Source member info
+
+    Returns:
+        (info for the copy, compressed payload)
+
+    Raises:
+        zipfile.BadZipFile: If the member's local header is corrupt
+    """
+    source.seek(info.header_offset)
+    source.seek(_data_offset(source.read(LOCAL_HEADER_SIZE), info))
+    raw = source.read(info.compress_size)
+
+    zinfo = zipfile.ZipInfo(info.filename, info.date_time)
+    zinfo.compress_type = info.compress_type
+    zinfo.CRC = info.CRC
+    zinfo.compress_size = info.compress_size
+    zinfo.file_size = info.file_size
+    zinfo.create_system = info.create_system
+    zinfo.external_attr = info.external_attr
+    zinfo.comment = info.comment
+    zinfo.extra = _strip_zip64_extra(info.extra)
+    # Sizes go into the local header, so no trailing data descriptor is needed
+    zinfo.flag_bits = info.flag_bits & ~DATA_DESCRIPTOR_FLAG
+    return zinfo, raw
+
+
+def build_record(filename: str, data: bytes, policy: str = "auto") -> tuple[zipfile.ZipInfo, bytes]:
+    """Compute a member's CRC and compressed payload, ready to append.
+
+    This is the expensive part of ZipFile.writestr; it touches no archive
+    state, so it can run on any thread.
+
+    Args:
+        filename: Entry name inside the archive
+        data: Entry payload
+        policy: Storage policy, one of STORAGE_POLICIES
+
+    Returns:
+        (member info, compressed payload)
+
+    Raises:
+        ValueError: If the policy is unknown
+    """
+    zinfo = zipfile.ZipInfo(filename, time.localtime(time.time())[:6])
+    zinfo.compress_type = choose_compression(filename, data, policy)
+    zinfo.external_attr = 0o600 << 16  # Same permissions writestr uses
+    zinfo.file_size = len(data)
+    zinfo.CRC = zlib.crc32(data)
+    if zinfo.compress_type == zipfile.ZIP_DEFLATED:
+        compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -zlib.MAX_WBITS)
+        raw = compressor.compress(data) + compressor.flush()
+    else:
+        raw = bytes(data)
+    zinfo.compress_size = len(raw)
+    return zinfo, raw
+
+
+def write_raw_record(writer: zipfile.ZipFile, zinfo: zipfile.ZipInfo, raw: bytes) -> None:
+    """Append a member whose CRC, sizes and payload are already final.
+
+    Args:
+        writer: Output archive open for writing
+        zinfo: Member info with CRC, sizes and compression method set
+        raw: Compressed payload
+    """
+    # zipfile has no public raw-write API; mirror what ZipFile.open("w") does
+    if writer.fp is None:
+        raise ValueError("Attempt to write to a closed archive")
+    with writer._lock:  # type: ignore[attr-defined]
+        writer.fp.seek(writer.start_dir)
+        zinfo.header_offset = writer.fp.tell()
+        writer.fp.write(zinfo.FileHeader())
+        writer.fp.write(raw)
+        writer.start_dir = writer.fp.tell()
+        writer.filelist.append(zinfo)
+        writer.NameToInfo[zinfo.filename] = zinfo
+        writer._didModify = True  # type: ignore[attr-defined]
+
+
+def copy_raw_member(source: BinaryIO, info: zipfile.ZipInfo, writer: zipfile.ZipFile) -> None:
+    """Copy a member's compressed record into another archive as-is.
+
+    Args:
+        source: Binary file object of the source archive
+        info: Source member info
+        writer: Output archive open for writing
+
+    Raises:
+        zipfile.BadZipFile: If the member's local header is corrupt
+    """
+    write_raw_record(writer, *read_raw_member(source, info))
+
+
+class RecordWriter:
+    """Zip writer that prepares records on worker threads.
+
+    CRC32 and deflate run on a thread pool (zlib releases the GIL), while
+    the calling thread only appends finished records in the order they were
+    added and lets zipfile write the central directory on close. At most
+    ``max_pending`` records are prepared ahead of the archive.
+    """
+
+    def __init__(
+        self, path: str, max_workers: int = WRITER_THREADS, max_pending: int | None = None
+    ) -> None:
+        """Create the output archive.
+
+        Args:
+            path: Path of the archive to write
+            max_workers: Number of threads preparing records
+            max_pending: Maximum number of records prepared but not yet
+                appended (defaults to a few per thread)
+        """
+        self.zf = zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED)
+        self.max_pending = max_pending or max_workers * RECORDS_PER_THREAD
+        self._pool = ThreadPoolExecutor(max_workers=max_workers)
+        self._pending: deque[
+            tuple[Future[tuple[zipfile.ZipInfo, bytes]], Callable[[zipfile.ZipInfo], None] | None]
+        ] = deque()
+
+    def add(
+        self,
+        filename: str,
+        data: bytes,
+        policy: str = "auto",
+        on_written: Callable[[zipfile.ZipInfo], None] | None = None,
+    ) -> None:
+        """Queue a member; its record is prepared on a worker thread.
+
+        Args:
+            filename: Entry name inside the archive
+            data: Entry payload
+            policy: Storage policy, one of STORAGE_POLICIES
+            on_written: Optional callback invoked with the member info once
+                the record is in the archive
+        """
+        self._queue(self._pool.submit(build_record, filename, data, policy), on_written)
+
+    def add_raw(
+        self,
+        zinfo: zipfile.ZipInfo,
+        raw: bytes,
+        on_written: Callable[[zipfile.ZipInfo], None] | None = None,
+    ) -> None:
+        """Queue a member whose record is already final, in order with the others.
+
+        Args:
+            zinfo: Member info with CRC, sizes and compression method set
+            raw: Compressed payload
+            on_written: Optional callback invoked once the record is in the archive
+        """
+        future: Future[tuple[zipfile.ZipInfo, bytes]] = Future()
+        future.set_result((zinfo, raw))
+        self._queue(future, on_written)
+
+    def _queue(
+        self,
+        future: Future[tuple[zipfile.ZipInfo, bytes]],
+        on_written: Callable[[zipfile.ZipInfo], None] | None,
+    ) -> None:
+        self._pending.append((future, on_written))
+        self.flush(wait=len(self._pending) > self.max_pending)
+
+    def flush(self, wait: bool = False) -> None:
+        """Append the prepared records at the head of the queue.
+
+        Args:
+            wait: Also wait for the oldest record (and append every record
+                that is ready by then); True drains the queue when called
+                repeatedly, see close()
+        """
+        if wait and self._pending:
+            self._pending[0][0].result()
+        while self._pending and self._pending[0][0].done():
+            future, on_written = self._pending.popleft()
+            zinfo, raw = future.result()
+            write_raw_record(self.zf, zinfo, raw)
+            if on_written is not None:
+                on_written(zinfo)
+
+    def writestr(self, filename: str, data: bytes, policy: str = "auto") -> None:
+        """Append a member right away, after everything queued before it.
+
+        Args:
+            filename: Entry name inside the archive
+            data: Entry payload
+            policy: Storage policy, one of STORAGE_POLICIES
+        """
+        self.drain()
+        write_raw_record(self.zf, *build_record(filename, data, policy))
+
+    def drain(self) -> None:
+        """Append every queued record."""
+        while self._pending:
+            self.flush(wait=True)
+
+    def close(self) -> None:
+        """Append every queued record and write the central directory."""
+        try:
+            self.drain()
+        finally:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self.zf.close()
+
+    def abort(self) -> None:
+        """Stop preparing records and close the archive without draining."""
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        self._pending.clear()
+        self.zf.close()
+
+
+def read_manifest(zf: zipfile.ZipFile) -> dict[str, Any] | None:
+    """Read the Nanamin manifest from an archive.
+
+    Args:
+        zf: Open archive
+
+    Returns:
+        The manifest, or None if the archive has no valid manifest
+    """
+    try:
+        manifest = json.loads(zf.read(MANIFEST_NAME))
+    except (KeyError, ValueError):
+        return None
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+class ArchiveJob:
+    """One input archive being rewritten into one output archive.
+
+    Image pages go through the encoder. Every other member (metadata such
+    as ComicInfo.xml, directories, and images already in a modern format)
+    is copied as a raw compressed record, in its original position. Output
+    is written to a temporary ``.part`` file next to the target and
+    moved into place once complete, together with a manifest recording the
+    source page fingerprints, encoder settings and storage policy. With
+    ``incremental`` enabled, the manifest of a previous output is used to
+    skip an archive whose pages and settings are unchanged, and to copy
+    unchanged pages from the previous output instead of re-encoding them.
+    """
+
+    def __init__(
+        self,
+        input_path: str,
+        output_path: str,
+        settings: tuple[Hashable, ...],
+        rename: Callable[[str], str],
+        incremental: bool = False,
+        storage: str = "auto",
+        resume: bool = False,
+        bad_pages: str = "fail",
+    ) -> None:
+        """Scan the input archive and plan the job.
+
+        Args:
+            input_path: Path to input CBZ file
+            output_path: Path to output CBZ file
+            settings: Encoder settings recorded in the manifest
+            rename: Maps a source page name to its name in the output
+            incremental: Whether to reuse a previous output's pages
+            storage: Per-entry storage policy, one of STORAGE_POLICIES
+            resume: Whether to journal encoded pages and reuse the journal
+                of an interrupted run; implies incremental
+            bad_pages: What to do with pages that cannot be read or encoded,
+                one of BAD_PAGE_POLICIES: "fail" the job, "skip" them, or
+                "quarantine" them, i.e. skip them and save the original
+                member under quarantine_path for inspection
+        """
+        self.input_path = input_path
+        self.output_path = output_path
+        self.settings = json.loads(json.dumps(list(settings)))
+        self.rename = rename
+        self.incremental = incremental or resume
+        self.storage = storage
+        self.bad_pages = bad_pages
+        self.failures: list[MemberFailure] = []
+        self.up_to_date = False
+        self.reused = 0
+        self.resumed = 0
+        self._input_is_output = False
+        self._reuse: dict[str, str] = {}
+        self._manifest_pages: dict[str, dict[str, str]] = {}
+        self._writer: RecordWriter | None = None
+        self._source: BinaryIO | None = None
+        self._spool = PageSpool(output_path + SPOOL_SUFFIX, self.settings) if resume else None
+        self._from_spool: set[str] = set()
+
+        with zipfile.ZipFile(input_path, "r") as zf:
+            infos = [info for info in zf.infolist() if info.filename != MANIFEST_NAME]
+            # All output members in archive order, and the subset to encode
+            self.entries = [info.filename for info in infos]
+            self.pages = [
+                info.filename
+                for info in infos
+                if info.filename.lower().endswith(IMAGE_EXTENSIONS) and not info.is_dir()
+            ]
+            encoded = set(self.pages)
+            self._passthrough = {
+                info.filename: info for info in infos if info.filename not in encoded
+            }
+            self._infos = {info.filename: info for info in infos}
+            self._fingerprints = {info.filename: member_fingerprint(info) for info in infos}
+            self._output_names = self._plan_output_names()
+            if self.incremental:
+                self._plan_incremental(zf)
+
+    @property
+    def partial_path(self) -> str:
+        """Path of the temporary output written while the job runs."""
+        return self.output_path + PARTIAL_SUFFIX
+
+    @property
+    def quarantine_path(self) -> str:
+        """Directory receiving the original members of quarantined pages."""
+        return self.output_path + QUARANTINE_SUFFIX
+
+    @property
+    def skips_bad_pages(self) -> bool:
+        """Whether bad pages are left out instead of failing the job."""
+        return self.bad_pages != "fail"
+
+    def is_passthrough(self, filename: str) -> bool:
+        """Whether an entry is copied as-is instead of being encoded."""
+        return filename in self._passthrough
+
+    def _plan_output_names(self) -> dict[str, str]:
+        """Give every page a name in the output that no other member has.
+
+        Renaming can collide: with JPEG output, 01.png becomes 01.jpg even if
+        the archive also has an 01.jpg page. Members that keep their names
+        (passthrough members and pages already in the output format) win;
+        a renamed page that collides gets a numbered suffix (01_1.jpg).
+
+        Returns:
+            Source page name -> output page name
+        """
+        names = {filename: self.rename(filename) for filename in self.pages}
+        taken = set(self._passthrough)
+        taken.update(filename for filename, name in names.items() if name == filename)
+        for filename, name in names.items():
+            if name == filename:
+                continue
+            root, extension = os.path.splitext(name)
+            number = 0
+            while name in taken:
+                number += 1
+                name = f"{root}_{number}{extension}"
+            taken.add(name)
+            names[filename] = name
+        return names
+
+    def _plan_incremental(self, input_zip: zipfile.ZipFile) -> None:
+        """Decide which pages can be reused from earlier runs.
+
+        Args:
+            input_zip: Open input archive
+        """
+        # The input may itself be an output of these settings
+        manifest = read_manifest(input_zip)
+        if manifest is not None and self._manifest_matches(manifest):
+            encoded = {entry["output"]: entry["encoded"] for entry in manifest["pages"].values()}
+            members = {info.filename: member_fingerprint(info) for info in input_zip.infolist()}
+            if all(members.get(name) == fingerprint for name, fingerprint in encoded.items()):
+                self.up_to_date = True
+                self._input_is_output = True
+                return
+
+        if os.path.abspath(self.output_path) == os.path.abspath(self.input_path):
+            return
+        try:
+            with zipfile.ZipFile(self.output_path, "r") as previous:
+                manifest = read_manifest(previous)
+                if manifest is None or manifest.get("settings") != self.settings:
+                    return
+                available = set(previous.namelist())
+        except (OSError, zipfile.BadZipFile):
+            return
+
+        # Reused pages are written again under the current storage policy,
+        # so only the archive as a whole depends on the recorded one
+        same_storage = manifest.get("storage") == self.storage
+        unchanged = 0
+        for filename in self.entries:
+            entry = manifest["pages"].get(filename)
+            if entry is None or entry.get("source") != self._fingerprints[filename]:
+                continue
+            if filename in self._passthrough:
+                # Raw copies are cheap, so they always come from the input
+                unchanged += 1
+            elif entry.get("output") in available:
+                self._reuse[filename] = entry["output"]
+                unchanged += 1
+        self.up_to_date = (
+            same_storage
+            and set(manifest["pages"]) == set(self.entries)
+            and unchanged == len(self.entries)
+        )
+
+    def _manifest_matches(self, manifest: dict[str, Any]) -> bool:
+        """Whether a manifest was written with this job's settings and storage."""
+        return manifest.get("settings") == self.settings and manifest.get("storage") == self.storage
+
+    def iter_pages(
+        self, on_failed: Callable[[str, Exception], None] | None = None
+    ) -> Generator[tuple[str, PageData], None, None]:
+        """Read every output entry, in archive order.
+
+        Source pages are read through a memory map (see ArchiveReader), so
+        STORED pages are yielded as memoryviews. Pages reused from a previous
+        output or from the journal of an interrupted run are yielded as
+        ``Encoded`` bytes so the pipeline writes them without encoding.
+        Every source page is CRC-checked. Unless bad pages fail the job,
+        pages that cannot be read are reported to ``on_failed`` (by default
+        page_failed()) and left out. Passthrough members are yielded as empty ``Encoded``
+        placeholders that only hold their place in line; write() copies
+        their raw record.
+
+        Args:
+            on_failed: Called with the name and error of a page that cannot
+                be read; it must call page_failed() itself
+
+        Yields:
+            (entry name, page data) pairs
+        """
+        with zipfile.ZipFile(self.input_path, "r") as zf:
+            reader = ArchiveReader(self.input_path, zf)
+            previous = zipfile.ZipFile(self.output_path, "r") if self._reuse else None
+            try:
+                for filename in self.entries:
+                    if filename in self._passthrough:
+                        yield filename, Encoded()
+                    elif previous is not None and filename in self._reuse:
+                        yield filename, Encoded(previous.read(self._reuse[filename]))
+                    elif (journaled := self._journaled(filename)) is not None:
+                        self._from_spool.add(filename)
+                        yield filename, Encoded(journaled)
+                    else:
+                        try:
+                            data = reader.read(self._infos[filename])
+                        except zipfile.BadZipFile as e:
+                            if not self.skips_bad_pages:
+                                raise
+                            (on_failed or self.page_failed)(filename, e)
+                            continue
+                        yield filename, data
+            finally:
+                reader.close()
+                if previous is not None:
+                    previous.close()
+
+    def page_failed(self, filename: str, error: Exception) -> None:
+        """Leave out a page that could not be read or encoded.
+
+        The page is recorded in ``failures`` and, with the "quarantine"
+        policy, its original member is saved under quarantine_path.
+
+        Args:
+            filename: Source page name
+            error: What went wrong
+        """
+        self.failures.append(MemberFailure(filename, str(error)))
+        if self.bad_pages == "quarantine":
+            self._quarantine(filename)
+
+    def _quarantine(self, filename: str) -> None:
+        """Save a bad page's original member, as far as it can be read."""
+        try:
+            with open(self.input_path, "rb") as source:
+                info, data = read_raw_member(source, self._infos[filename])
+        except (OSError, zipfile.BadZipFile):
+            return
+        if info.compress_type == zipfile.ZIP_DEFLATED:
+            try:
+                data = zlib.decompressobj(-zlib.MAX_WBITS).decompress(data)
+            except zlib.error:
+                pass  # Keep the compressed payload
+        # Member names come from the archive; never let them leave the directory
+        parts = filename.replace("\\", "/").split("/")
+        parts = [part for part in parts if part not in ("", ".", "..")]
+        if not parts:
+            return
+        path = os.path.join(self.quarantine_path, *parts)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+
+    def _journaled(self, filename: str) -> bytes | None:
+        if self._spool is None:
+            return None
+        return self._spool.get(filename, self._fingerprints[filename])
+
+    def _open_writer(self) -> RecordWriter:
+        if self._writer is None:
+            os.makedirs(os.path.dirname(self.output_path) or ".", exist_ok=True)
+            self._writer = RecordWriter(self.partial_path)
+        return self._writer
+
+    def write(self, filename: str, data: bytes) -> str:
+        """Write an encoded page or passthrough member to the output archive.
+
+        The record is prepared on a writer thread and appended in order;
+        finish() waits for every queued record.
+
+        Args:
+            filename: Source entry name
+            data: Encoded page bytes (ignored for passthrough members)
+
+        Returns:
+            Name of the entry in the output archive
+        """
+        writer = self._open_writer()
+        if filename in self._passthrough:
+            if self._source is None:
+                self._source = open(self.input_path, "rb")
+            writer.add_raw(*read_raw_member(self._source, self._passthrough[filename]))
+            self._manifest_pages[filename] = {
+                "source": self._fingerprints[filename],
+                "output": filename,
+                "encoded": self._fingerprints[filename],
+            }
+            return filename
+        new_filename = self._output_names[filename]
+        if filename in self._reuse:
+            self.reused += 1
+        elif filename in self._from_spool:
+            self.resumed += 1
+        elif self._spool is not None:
+            self._spool.append(filename, self._fingerprints[filename], data)
+        entry = {"source": self._fingerprints[filename], "output": new_filename, "encoded": ""}
+        self._manifest_pages[filename] = entry
+
+        def record_written(zinfo: zipfile.ZipInfo) -> None:
+            entry["encoded"] = member_fingerprint(zinfo)
+
+        writer.add(new_filename, data, self.storage, record_written)
+        return new_filename
+
+    def finish(self) -> None:
+        """Write the manifest and move the output archive into place."""
+        if self.up_to_date:
+            # Nothing was encoded; an optimized input only needs copying over
+            same_file = os.path.abspath(self.output_path) == os.path.abspath(self.input_path)
+            if self._input_is_output and not same_file:
+                os.makedirs(os.path.dirname(self.output_path) or ".", exist_ok=True)
+                shutil.copyfile(self.input_path, self.output_path)
+            return
+        writer = self._open_writer()
+        writer.drain()
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "settings": self.settings,
+            "storage": self.storage,
+            "pages": self._manifest_pages,
+        }
+        manifest_data = json.dumps(manifest, indent=1).encode("utf-8")
+        writer.writestr(MANIFEST_NAME, manifest_data, self.storage)
+        writer.close()
+        self._writer = None
+        self._close_source()
+        os.replace(self.partial_path, self.output_path)
+        if self._spool is not None:
+            self._spool.discard()
+
+    def _close_source(self) -> None:
+        if self._source is not None:
+            self._source.close()
+            self._source = None
+
+    def abort(self) -> None:
+        """Discard the partial output archive, keeping the journal if any."""
+        if self._writer is not None:
+            self._writer.abort()
+            self._writer = None
+        self._close_source()
+        if self._spool is not None:
+            self._spool.close()
+        if os.path.exists(self.partial_path):
+            os.remove(self.partial_path)
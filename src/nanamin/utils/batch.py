@@ -0,0 +1,279 @@
+import os
+import time
+from collections.abc import Callable, Container, Generator, Sequence
+from contextlib import closing
+from dataclasses import dataclass, replace
+from typing import NamedTuple
+
+from nanamin.utils.archive import ArchiveJob
+from nanamin.utils.cancellation import CancellationToken, CompressionCancelledError
+from nanamin.utils.compressor import CBZCompressor
+from nanamin.utils.formats import get_format
+from nanamin.utils.pipeline import PageData, stream_pages
+
+
+class PageRef(NamedTuple):
+    """A page within one archive of a batch."""
+
+    archive: int
+    source: str
+    filename: str
+
+    def __str__(self) -> str:
+        return f"{os.path.basename(self.source)}:{self.filename}"
+
+
+@dataclass
+class BatchProgress:
+    """Progress of a batch after a page has been written.
+
+    Only encoded pages count; members copied as-is (ComicInfo.xml, pages
+    already in a modern format) are written without a progress update.
+    """
+
+    archive_index: int  # Zero-based index of the archive the page belongs to
+    archive_path: str
+    archive_total: int  # Pages in this archive
+    archive_done: int  # Pages of this archive written so far
+    batch_total: int  # Pages in the whole batch
+    batch_done: int  # Pages of the whole batch written so far
+    filename: str
+    speed: float  # Batch throughput in images/second
+
+
+class BatchCompressor:
+    """Compress many CBZ files on one shared worker pool.
+
+    Pages from all archives flow through a single bounded window in
+    archive order, so the next archive starts encoding while the tail of
+    the previous one is still in flight and no cores sit idle between
+    volumes. JPEG output is identical to calling process_cbz per archive,
+    WebP output to calling compress_file.
+    """
+
+    def __init__(self, compressor: CBZCompressor, output_format: str = "jpeg") -> None:
+        """Initialize batch compressor.
+
+        Args:
+            compressor: Compressor whose settings (quality, workers, window,
+                backend, cache, incremental) apply to the whole batch
+            output_format: Registered output format name
+
+        Raises:
+            ValueError: If the output format is unknown or unavailable
+        """
+        get_format(output_format)
+        self.compressor = compressor
+        self.output_format = output_format
+
+    def process_batch(
+        self,
+        jobs: Sequence[tuple[str, str]],
+        progress_callback: Callable[[BatchProgress], None] | None = None,
+        archive_callback: Callable[[int, ArchiveJob], None] | None = None,
+        cancel_token: CancellationToken | None = None,
+        error_callback: Callable[[int, Exception], None] | None = None,
+    ) -> None:
+        """Compress a batch of CBZ files.
+
+        An archive that cannot be read, has a page that fails to encode
+        (unless bad pages are skipped) or cannot be written is aborted on
+        its own; the rest of the batch goes on.
+
+        Args:
+            jobs: (input path, output path) pairs, processed in order
+            progress_callback: Optional callback invoked after every
+                encoded page, and once more at the end if bad pages left
+                out after the last one changed the totals; skipped pages
+                leave the totals
+            archive_callback: Optional callback invoked with the archive
+                index and its job once an archive is fully written or
+                found to be up to date
+            cancel_token: Optional token to pause or cancel the batch;
+                archives finished before a cancel are kept
+            error_callback: Optional callback invoked with the archive
+                index and the error once an archive has failed
+
+        Raises:
+            CompressionCancelledError: If the batch was cancelled
+            RuntimeError: If the worker pool broke, or if an archive failed
+                and no error_callback was given (raised once the rest of
+                the batch is done)
+        """
+        compressor = self.compressor
+        archive_jobs: dict[int, ArchiveJob] = {}
+        errors: dict[int, Exception] = {}
+        batch_total = 0
+        batch_done = 0
+        archive_done = 0
+        current = -1
+        last_update: BatchProgress | None = None
+        recorder = compressor.stage_recorder()
+
+        def fail(index: int, where: str, error: Exception) -> None:
+            """Abort one archive and report why."""
+            nonlocal batch_total
+            if index in errors:
+                return
+            wrapped = RuntimeError(f"Error processing {where}: {error!s}")
+            wrapped.__cause__ = error
+            errors[index] = wrapped
+            job = archive_jobs.get(index)
+            if job is not None:
+                job.abort()
+                # Its unwritten pages no longer count towards the batch
+                written = archive_done if index == current else 0
+                batch_total -= len(job.pages) - len(job.failures) - written
+            if error_callback:
+                error_callback(index, wrapped)
+
+        def page_failed(ref: PageRef, error: Exception) -> None:
+            nonlocal batch_total
+            job = archive_jobs[ref.archive]
+            if ref.archive in errors:
+                return
+            if not job.skips_bad_pages:
+                fail(ref.archive, str(ref), error)
+                return
+            try:
+                job.page_failed(ref.filename, error)
+            except OSError as e:
+                fail(ref.archive, str(ref), e)
+                return
+            # Left out pages are never written, so they leave the totals
+            batch_total -= 1
+
+        def advance_to(index: int) -> None:
+            """Finish every archive before ``index``."""
+            nonlocal current, archive_done
+            while current < index:
+                job = archive_jobs.get(current)
+                if job is not None and current not in errors:
+                    try:
+                        job.finish()
+                    except Exception as e:
+                        fail(current, os.path.basename(job.input_path), e)
+                    else:
+                        if archive_callback:
+                            archive_callback(current, job)
+                current += 1
+                archive_done = 0
+
+        for index, (input_path, output_path) in enumerate(jobs):
+            try:
+                archive_jobs[index] = compressor.create_job(
+                    input_path, output_path, self.output_format
+                )
+            except Exception as e:
+                fail(index, os.path.basename(input_path), e)
+        batch_total = sum(len(job.pages) for job in archive_jobs.values() if not job.up_to_date)
+        start_time = time.time()
+
+        try:
+            with compressor.open_executor() as executor:
+                results = stream_pages(
+                    executor,
+                    self._iter_pages(archive_jobs, errors, fail, page_failed),
+                    compressor.page_encoder(self.output_format),
+                    compressor.max_in_flight,
+                    compressor.max_in_flight_bytes,
+                    compressor.cache,
+                    compressor.page_settings(self.output_format),
+                    compressor.max_reorder,
+                    recorder,
+                    cancel_token,
+                    page_failed,
+                )
+                for ref, data in results:
+                    if cancel_token is not None and cancel_token.cancelled:
+                        # Pages encoded before the cancel must not finish more archives
+                        raise CompressionCancelledError("Compression cancelled")
+                    if ref.archive in errors:
+                        continue  # Pages still in flight when their archive failed
+                    advance_to(ref.archive)
+                    job = archive_jobs[ref.archive]
+                    try:
+                        new_filename = compressor.write_page(job, ref.filename, data, recorder, ref)
+                    except Exception as e:
+                        fail(ref.archive, str(ref), e)
+                        continue
+                    if job.is_passthrough(ref.filename):
+                        continue
+                    archive_done += 1
+                    batch_done += 1
+                    last_update = BatchProgress(
+                        archive_index=ref.archive,
+                        archive_path=job.input_path,
+                        archive_total=len(job.pages) - len(job.failures),
+                        archive_done=archive_done,
+                        batch_total=batch_total,
+                        batch_done=batch_done,
+                        filename=new_filename,
+                        speed=batch_done / max(time.time() - start_time, 1e-6),
+                    )
+                    if progress_callback:
+                        progress_callback(last_update)
+                if cancel_token is not None and cancel_token.cancelled:
+                    raise CompressionCancelledError("Compression cancelled")
+                # Finish the last archive and any trailing empty or skipped ones
+                advance_to(len(jobs))
+            if progress_callback and last_update and last_update.batch_total != batch_total:
+                # Pages left out after the last written one still end the batch at 100%
+                job = archive_jobs[last_update.archive_index]
+                progress_callback(
+                    replace(
+                        last_update,
+                        archive_total=len(job.pages) - len(job.failures),
+                        batch_total=batch_total,
+                    )
+                )
+        except BaseException as e:
+            for index, job in archive_jobs.items():
+                if index >= max(current, 0) and index not in errors:
+                    job.abort()
+            if isinstance(e, Exception) and not isinstance(e, CompressionCancelledError):
+                raise RuntimeError(f"Error processing batch: {e!s}") from e
+            raise
+
+        if errors and error_callback is None:
+            first = next(iter(errors.values()))
+            more = f" ({len(errors) - 1} more archive(s) failed)" if len(errors) > 1 else ""
+            raise RuntimeError(f"Error processing batch: {first!s}{more}") from first
+
+    def _iter_pages(
+        self,
+        archive_jobs: dict[int, ArchiveJob],
+        errors: Container[int],
+        fail: Callable[[int, str, Exception], None],
+        page_failed: Callable[[PageRef, Exception], None],
+    ) -> Generator[tuple[PageRef, PageData], None, None]:
+        """Read the pages of every archive in batch order.
+
+        Args:
+            archive_jobs: Planned jobs by batch index; up-to-date archives
+                are not read
+            errors: Indices of failed archives; reading one stops
+            fail: Called with the index, archive name and error when an
+                archive cannot be read
+            page_failed: Called with the page and error when a page cannot
+                be read but the archive skips bad pages
+
+        Yields:
+            (page reference, page bytes) pairs
+        """
+        for index, job in archive_jobs.items():
+            if job.up_to_date or index in errors:
+                continue
+            archive_ref = PageRef(index, job.input_path, "")
+
+            def on_failed(filename: str, error: Exception, ref: PageRef = archive_ref) -> None:
+                page_failed(ref._replace(filename=filename), error)
+
+            with closing(job.iter_pages(on_failed)) as pages:
+                try:
+                    for filename, data in pages:
+                        if index in errors:
+                            break
+                        yield PageRef(index, job.input_path, filename), data
+                except Exception as e:
+                    fail(index, os.path.basename(job.input_path), e)
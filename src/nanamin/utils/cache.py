@@ -0,0 +1,137 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections.abc import Hashable
+from pathlib import Path
+
+# Constants
+DEFAULT_CACHE_DIR = os.path.join(str(Path.home()), ".nanamin", "cache")
+DEFAULT_CACHE_SIZE = 1024 * 1024 * 1024  # 1 GB
+EVICTION_TARGET = 0.9  # Evict down to this share of the size limit
+# Part of every key; bump it whenever a change to page processing changes
+# the encoded bytes, so entries written by older code are never served
+CACHE_VERSION = 1
+
+
+class PageCache:
+    """Content-addressed on-disk cache of encoded pages.
+
+    Entries are keyed by the hash of the source image bytes plus the
+    encoder settings and CACHE_VERSION, so identical pages shared across
+    releases (credits, covers, chapter bumpers) are only encoded once. The cache is bounded by
+    total size and evicts the least recently used entries first; a hit
+    refreshes the entry's modification time.
+    """
+
+    def __init__(
+        self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_CACHE_SIZE
+    ) -> None:
+        """Initialize page cache.
+
+        Args:
+            cache_dir: Directory holding cache entries
+            max_bytes: Maximum total size of all entries in bytes
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._size = sum(size for _, _, size in self._entries())
+
+    @staticmethod
+    def make_key(data: bytes | memoryview, settings: tuple[Hashable, ...]) -> str:
+        """Build the cache key for a source page.
+
+        Args:
+            data: Source image bytes, or a view of them
+            settings: Encoder settings that affect the output
+
+        Returns:
+            Hex digest identifying the encoded page
+        """
+        digest = hashlib.sha256(repr((CACHE_VERSION, settings)).encode("utf-8"))
+        digest.update(data)
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def _entries(self) -> list[tuple[float, str, int]]:
+        """List cache entries as (mtime, path, size) tuples."""
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for file in files:
+                path = os.path.join(root, file)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, path, stat.st_size))
+        return entries
+
+    def get(self, key: str) -> bytes | None:
+        """Get an encoded page from the cache.
+
+        Args:
+            key: Cache key from make_key
+
+        Returns:
+            The cached encoded bytes, or None on a miss
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """Store an encoded page, evicting old entries if over the limit.
+
+        Args:
+            key: Cache key from make_key
+            data: Encoded page bytes
+        """
+        if len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first so readers never see partial entries
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+        with self._lock:
+            self._size += len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Remove least recently used entries until under the target size."""
+        entries = sorted(self._entries())
+        self._size = sum(size for _, _, size in entries)
+        target = self.max_bytes * EVICTION_TARGET
+        for _, path, size in entries:
+            if self._size <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self._size -= size
@@ -0,0 +1,60 @@
+import threading
+
+# Constants
+POLL_INTERVAL = 0.1  # Seconds between cancellation checks while waiting
+
+
+class CompressionCancelledError(Exception):
+    """Raised inside a compression run once its token has been cancelled."""
+
+
+class CancellationToken:
+    """Cooperative cancel and pause switch for a compression run.
+
+    Any thread may call cancel(), pause() and resume(); the pipeline checks
+    the token between pages and while waiting on the pool. Cancelling drops
+    every queued page, lets pages already encoding finish and aborts the
+    partial output. Pausing stops new pages from being read and submitted
+    while the pages in flight drain, so paused runs hold no workers.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an uncancelled, running token."""
+        self._cancelled = threading.Event()
+        self._running = threading.Event()
+        self._running.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether cancel() has been called."""
+        return self._cancelled.is_set()
+
+    @property
+    def paused(self) -> bool:
+        """Whether the run is paused (and not cancelled)."""
+        return not self._running.is_set()
+
+    def cancel(self) -> None:
+        """Cancel the run, waking it up if it is paused."""
+        self._cancelled.set()
+        self._running.set()
+
+    def pause(self) -> None:
+        """Stop submitting new pages until resume() is called."""
+        if not self.cancelled:
+            self._running.clear()
+
+    def resume(self) -> None:
+        """Continue a paused run."""
+        self._running.set()
+
+    def check(self) -> None:
+        """Block while paused, then raise if the run was cancelled.
+
+        Raises:
+            CompressionCancelledError: If the token was cancelled
+        """
+        while not self._running.wait(POLL_INTERVAL):
+            pass
+        if self._cancelled.is_set():
+            raise CompressionCancelledError("Compression cancelled")
@@ -0,0 +1,770 @@
+import multiprocessing
+import os
+import time
+import zipfile
+from collections.abc import Callable, Generator, Hashable
+from concurrent.futures import Executor
+from contextlib import AbstractContextManager, nullcontext
+from functools import partial
+from typing import TYPE_CHECKING, Literal, cast, overload
+
+from nanamin.utils.archive import (
+    BAD_PAGE_POLICIES,
+    IMAGE_EXTENSIONS,
+    STORAGE_POLICIES,
+    ArchiveJob,
+    open_page,
+)
+from nanamin.utils.cache import PageCache
+from nanamin.utils.cancellation import CancellationToken, CompressionCancelledError
+from nanamin.utils.executors import DEFAULT_BACKEND, EXECUTOR_BACKENDS, create_executor
+from nanamin.utils.formats import get_format
+from nanamin.utils.metrics import PageMetrics, StageRecorder, TimedPage, worker_id
+from nanamin.utils.pipeline import (
+    DEFAULT_MAX_IN_FLIGHT_BYTES,
+    PageData,
+    default_max_in_flight,
+    stream_pages,
+)
+from nanamin.utils.quality import QualityTarget, search_quality
+from nanamin.utils.validation import ValidationReport, validate_archive
+
+if TYPE_CHECKING:
+    from PIL.Image import Image as PILImage
+
+# Constants
+GRAYSCALE_SAMPLE_SIZE = 512  # Longest side of the image sampled for chroma
+GRAYSCALE_TOLERANCE = 6  # Max chroma deviation from neutral still treated as gray
+NEUTRAL_CHROMA = 128
+DOWNSCALE_FILTER = 3  # PIL.Image.Resampling.BICUBIC, without importing Pillow
+DOWNSCALE_REDUCING_GAP = 3.0  # Cheap integer reduction first, then BICUBIC for the rest
+RESIZABLE_MODES = ("RGB", "RGBA", "L", "LA")
+MIN_QUALITY = 1
+MAX_QUALITY = 100
+
+
+def encoder_settings(
+    output_format: str,
+    quality: int,
+    target: QualityTarget | None = None,
+    detect_grayscale: bool = False,
+    effort: int | None = None,
+    max_dimension: int | None = None,
+    target_dpi: int | None = None,
+) -> tuple[Hashable, ...]:
+    """Get the settings that determine the bytes of an encoded page.
+
+    Used as part of page cache keys, so anything that changes the encoder
+    output (including the Pillow version) must be included.
+
+    Args:
+        output_format: Registered output format name
+        quality: Compression quality (1-100)
+        target: Optional adaptive quality goal
+        detect_grayscale: Whether gray pages are encoded as single-channel
+        effort: Encoder effort, or None for the format default
+        max_dimension: Longest page side pages are downscaled to, if any
+        target_dpi: Resolution pages are downscaled to, if any
+
+    Returns:
+        Tuple of encoder settings
+    """
+    engine = get_format(output_format)
+    settings = engine.settings(quality, effort)
+    if target is not None and not engine.lossless:
+        settings += (
+            "adaptive",
+            target.bytes_per_megapixel,
+            target.min_psnr,
+            target.min_quality,
+            target.max_trials,
+            target.tolerance,
+        )
+    if detect_grayscale:
+        settings += ("grayscale", GRAYSCALE_TOLERANCE)
+    if max_dimension is not None or target_dpi is not None:
+        settings += ("downscale", max_dimension, target_dpi, str(DOWNSCALE_FILTER))
+    return settings
+
+
+def _convert_to_rgb(img: "PILImage") -> "PILImage":
+    """Convert image to RGB format, flattening transparency onto white.
+
+    Args:
+        img: Input image
+
+    Returns:
+        RGB version of the image
+    """
+    if img.mode in ("RGBA", "LA"):
+        from PIL import Image
+
+        background = Image.new("RGB", img.size, (255, 255, 255))
+        background.paste(img, mask=img.split()[-1])
+        return background
+    elif img.mode != "RGB":
+        return img.convert("RGB")
+    return img
+
+
+def is_grayscale(img: "PILImage") -> bool:
+    """Check whether an RGB image carries no color information.
+
+    The image is box-downsampled first, which both bounds the cost and
+    averages away JPEG chroma noise, then the Cb and Cr band extrema are
+    compared against neutral gray.
+
+    Args:
+        img: RGB image
+
+    Returns:
+        True if every sampled pixel is gray within GRAYSCALE_TOLERANCE
+    """
+    factor = max(1, max(img.size) // GRAYSCALE_SAMPLE_SIZE)
+    sample = img.reduce(factor) if factor > 1 else img
+    _, cb, cr = sample.convert("YCbCr").split()
+    for band in (cb, cr):
+        # A single band gives one (min, max) pair
+        low, high = cast("tuple[int, int]", band.getextrema())
+        if max(NEUTRAL_CHROMA - low, high - NEUTRAL_CHROMA) > GRAYSCALE_TOLERANCE:
+            return False
+    return True
+
+
+def _convert_for_encoding(img: "PILImage", detect_grayscale: bool) -> "PILImage":
+    """Convert a decoded page to the mode it is encoded in.
+
+    Args:
+        img: Decoded source image
+        detect_grayscale: Encode gray pages as single-channel "L"
+
+    Returns:
+        An "RGB" image, or an "L" image for grayscale pages
+    """
+    if detect_grayscale and img.mode in ("L", "1"):
+        return img.convert("L") if img.mode != "L" else img
+    rgb_img = _convert_to_rgb(img)
+    if detect_grayscale and is_grayscale(rgb_img):
+        return rgb_img.convert("L")
+    return rgb_img
+
+
+def _downscale_size(
+    img: "PILImage", max_dimension: int | None, target_dpi: int | None
+) -> tuple[int, int] | None:
+    """Get the size an oversized page is downscaled to.
+
+    Args:
+        img: Opened source image, not yet decoded
+        max_dimension: Longest side allowed, if any
+        target_dpi: Resolution allowed, if any; only applies to images that
+            record their resolution
+
+    Returns:
+        The reduced size, or None if the page is small enough
+    """
+    width, height = img.size
+    scale = 1.0
+    if max_dimension is not None:
+        scale = min(scale, max_dimension / max(width, height))
+    dpi = img.info.get("dpi")
+    if target_dpi is not None and dpi and dpi[0] > 0:
+        scale = min(scale, target_dpi / float(dpi[0]))
+    if scale >= 1:
+        return None
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def _downscale(img: "PILImage", size: tuple[int, int]) -> "PILImage":
+    """Resize a decoded page down to the given size.
+
+    Args:
+        img: Decoded source image
+        size: Target size
+
+    Returns:
+        The resized image; palette and bilevel pages come back as RGB(A) or L
+    """
+    if img.size == size:
+        return img
+    if img.mode not in RESIZABLE_MODES:
+        if img.mode == "1":
+            img = img.convert("L")
+        else:
+            img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+    return img.resize(size, DOWNSCALE_FILTER, reducing_gap=DOWNSCALE_REDUCING_GAP)
+
+
+def encode_page(
+    image_data: PageData,
+    output_format: str,
+    quality: int,
+    target: QualityTarget | None = None,
+    detect_grayscale: bool = False,
+    effort: int | None = None,
+    max_dimension: int | None = None,
+    target_dpi: int | None = None,
+    timed: bool = False,
+) -> bytes:
+    """Decode a source page and encode it in the output format.
+
+    Module-level so it can be shipped to process pool workers.
+
+    Args:
+        image_data: Raw image data, as bytes or a memoryview
+        output_format: Registered output format name
+        quality: Compression quality (1-100); the upper bound when a
+            target is given
+        target: Optional adaptive quality goal searched per page
+        detect_grayscale: Encode pages without color as single-channel
+        effort: Encoder effort, or None for the format default
+        max_dimension: Downscale pages whose longest side exceeds this
+        target_dpi: Downscale pages scanned at a higher resolution than this
+        timed: Return a TimedPage carrying the stage timings
+
+    Returns:
+        Encoded image data
+    """
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        started_at = time.time()
+        start = time.perf_counter()
+        engine = get_format(output_format)
+        with open_page(image_data) as source, Image.open(source) as img:
+            size = _downscale_size(cast("PILImage", img), max_dimension, target_dpi)
+            if size is not None and img.format == "JPEG":
+                # libjpeg decodes straight to 1/2, 1/4 or 1/8 scale, never below size
+                img.draft(img.mode, size)
+            img.load()
+            decoded = time.perf_counter()
+            page = cast("PILImage", img)
+            if size is not None:
+                page = _downscale(page, size)
+            page = _convert_for_encoding(page, detect_grayscale)
+            converted = time.perf_counter()
+            if target is None or engine.lossless:
+                data = engine.save(page, quality, effort)
+            else:
+                data, _ = search_quality(
+                    page,
+                    lambda image, trial_quality: engine.save(image, trial_quality, effort),
+                    quality,
+                    target,
+                )
+        if not timed:
+            return data
+        timed_page = TimedPage(data)
+        timed_page.started_at = started_at
+        timed_page.decode_s = decoded - start
+        timed_page.convert_s = converted - decoded
+        timed_page.encode_s = time.perf_counter() - converted
+        timed_page.worker = worker_id()
+        return timed_page
+    except UnidentifiedImageError as e:
+        # Pillow names the in-memory stream, which says nothing about the page
+        raise RuntimeError("Error processing image: not a recognized image format") from e
+    except Exception as e:
+        raise RuntimeError(f"Error processing image: {e!s}") from e
+
+
+def encode_webp(image_data: bytes, quality: int) -> bytes:
+    """Encode raw image data as WebP.
+
+    Args:
+        image_data: Raw image data as bytes
+        quality: WebP quality (1-100)
+
+    Returns:
+        Encoded image data
+    """
+    return encode_page(image_data, "webp", quality)
+
+
+def encode_jpeg(image_data: bytes, quality: int) -> bytes:
+    """Encode raw image data as JPEG.
+
+    Args:
+        image_data: Raw image data as bytes
+        quality: JPEG quality (0-100)
+
+    Returns:
+        Encoded image data
+    """
+    return encode_page(image_data, "jpeg", quality)
+
+
+class CBZCompressor:
+    def __init__(
+        self,
+        quality: int,
+        max_in_flight: int | None = None,
+        max_in_flight_bytes: int = DEFAULT_MAX_IN_FLIGHT_BYTES,
+        max_reorder: int | None = None,
+        backend: str = DEFAULT_BACKEND,
+        max_workers: int | None = None,
+        cache: PageCache | None = None,
+        incremental: bool = False,
+        storage: str = "auto",
+        quality_target: QualityTarget | None = None,
+        detect_grayscale: bool = True,
+        effort: int | None = None,
+        metrics_callback: Callable[[PageMetrics], None] | None = None,
+        max_dimension: int | None = None,
+        target_dpi: int | None = None,
+        executor: Executor | None = None,
+        resume: bool = False,
+        bad_pages: str = "fail",
+    ) -> None:
+        """Initialize CBZ compressor.
+
+        Args:
+            quality: Compression quality (1-100)
+            max_in_flight: Maximum number of pages read but not yet written
+                (defaults to a few pages per worker)
+            max_in_flight_bytes: Soft cap on source bytes held by in-flight pages
+            max_reorder: Maximum number of finished pages held while waiting
+                for an earlier page, so output stays in archive order
+                (defaults to max_in_flight)
+            backend: Executor backend, one of "thread", "process" or "hybrid"
+            max_workers: Number of encode workers (defaults to one less than
+                the number of CPUs)
+            cache: Optional page cache used to skip re-encoding identical pages
+            incremental: Skip archives whose previous output is up to date and
+                reuse unchanged pages from it
+            storage: Zip storage policy per entry: "auto" stores image
+                payloads and deflates metadata, "stored", "deflated", or
+                "measured" to deflate only entries that actually shrink
+            quality_target: Optional per-page adaptive quality goal; quality
+                is then the highest quality the search may pick
+            detect_grayscale: Encode pages without color as single-channel
+            effort: Encoder speed/effort knob of the output format (higher is
+                slower and smaller), or None for the format default
+            metrics_callback: Optional hook invoked with the stage timings
+                and sizes of every written page, e.g. PipelineMetrics.record
+            max_dimension: Downscale pages whose longest side exceeds this
+                many pixels
+            target_dpi: Downscale pages whose recorded resolution exceeds
+                this DPI
+            executor: Optional long-lived executor to encode on instead of
+                creating a pool per call; the caller owns and shuts it down
+            resume: Journal encoded pages next to the output so an
+                interrupted run continues where it stopped, and skip
+                archives that are already complete; implies incremental
+            bad_pages: What to do with pages that cannot be read or
+                encoded: "fail" the archive, "skip" them, or "quarantine"
+                them next to the output (see ArchiveJob)
+
+        Raises:
+            ValueError: If the backend, storage or bad page policy is unknown,
+                or a numeric setting is out of range
+        """
+        if not MIN_QUALITY <= quality <= MAX_QUALITY:
+            raise ValueError(f"Quality must be between {MIN_QUALITY} and {MAX_QUALITY}")
+        for name, value in (
+            ("max_workers", max_workers),
+            ("max_dimension", max_dimension),
+            ("target_dpi", target_dpi),
+        ):
+            if value is not None and value < 1:
+                raise ValueError(f"{name} must be at least 1")
+        if backend not in EXECUTOR_BACKENDS:
+            raise ValueError(
+                f"Unknown executor backend: {backend} "
+                f"(expected one of {', '.join(EXECUTOR_BACKENDS)})"
+            )
+        if storage not in STORAGE_POLICIES:
+            raise ValueError(
+                f"Unknown storage policy: {storage} (expected one of {', '.join(STORAGE_POLICIES)})"
+            )
+        if bad_pages not in BAD_PAGE_POLICIES:
+            raise ValueError(
+                f"Unknown bad page policy: {bad_pages} "
+                f"(expected one of {', '.join(BAD_PAGE_POLICIES)})"
+            )
+        self.quality = quality
+        self.max_workers = max_workers or max(1, multiprocessing.cpu_count() - 1)
+        self.max_in_flight = max_in_flight or default_max_in_flight(self.max_workers)
+        self.max_in_flight_bytes = max_in_flight_bytes
+        self.max_reorder = max_reorder
+        self.backend = backend
+        self.cache = cache
+        self.incremental = incremental
+        self.storage = storage
+        self.quality_target = quality_target
+        self.detect_grayscale = detect_grayscale
+        self.effort = effort
+        self.metrics_callback = metrics_callback
+        self.max_dimension = max_dimension
+        self.target_dpi = target_dpi
+        self.executor = executor
+        self.resume = resume
+        self.bad_pages = bad_pages
+
+    def _convert_to_rgb(self, img: "PILImage") -> "PILImage":
+        """Convert image to RGB format.
+
+        Args:
+            img: Input image
+
+        Returns:
+            RGB version of the image
+        """
+        return _convert_to_rgb(img)
+
+    def validate_cbz(self, file_path: str) -> tuple[bool, str]:
+        """Validate if a file is a valid CBZ file.
+
+        Args:
+            file_path: Path to the CBZ file to validate.
+
+        Returns:
+            A tuple containing:
+            - bool: True if valid, False otherwise
+            - str: Error message if invalid, empty string if valid
+        """
+        if not os.path.exists(file_path):
+            return False, "File does not exist"
+        if not file_path.lower().endswith(".cbz"):
+            return False, "File is not a CBZ file"
+        try:
+            with zipfile.ZipFile(file_path, "r") as zf:
+                if not zf.namelist():
+                    return False, "CBZ file is empty"
+                return True, ""
+        except zipfile.BadZipFile:
+            return False, "Invalid CBZ file format"
+        except Exception as e:
+            return False, f"Error validating CBZ file: {e!s}"
+
+    def deep_validate(self, file_path: str) -> ValidationReport:
+        """Check every member's CRC and image data, on the encode workers.
+
+        Args:
+            file_path: Path to the CBZ file
+
+        Returns:
+            Report of the archive and every failed member
+        """
+        is_valid, error = self.validate_cbz(file_path)
+        if not is_valid:
+            return ValidationReport(file_path, error=error)
+        with self.open_executor() as executor:
+            return validate_archive(file_path, executor, self.max_in_flight)
+
+    def compress_image(self, image_data: bytes, rel_path: str) -> tuple[bytes, str]:
+        """Compress a single image.
+
+        Args:
+            image_data: Raw image data as bytes.
+            rel_path: Relative path within the CBZ file.
+
+        Returns:
+            A tuple containing:
+            - bytes: Compressed image data
+            - str: New filename with .webp extension
+        """
+        data = self.page_encoder("webp")(image_data)
+        return data, f"{os.path.splitext(rel_path)[0]}.webp"
+
+    def compress_file(
+        self,
+        input_file: str,
+        output_file: str,
+        cancel_token: CancellationToken | None = None,
+    ) -> Generator[tuple[int, int, str, float], None, None]:
+        """Compress a CBZ file.
+
+        Args:
+            input_file: Path to input CBZ file.
+            output_file: Path to output CBZ file.
+            cancel_token: Optional token to pause or cancel the run.
+
+        Yields:
+            A tuple containing:
+            - int: Total number of images
+            - int: Number of processed images
+            - str: Current file being processed
+            - float: Processing speed (images/second)
+        """
+        start_time = time.time()
+        for total_images, processed_images, new_filename in self._compress_archive(
+            input_file, output_file, "webp", cancel_token
+        ):
+            speed = processed_images / (time.time() - start_time)
+            yield total_images, processed_images, new_filename, speed
+
+    @overload
+    def page_encoder(
+        self, output_format: str, timed: Literal[True]
+    ) -> Callable[[PageData], TimedPage]: ...
+
+    @overload
+    def page_encoder(
+        self, output_format: str, timed: bool | None = None
+    ) -> Callable[[PageData], bytes]: ...
+
+    def page_encoder(
+        self, output_format: str, timed: bool | None = None
+    ) -> Callable[[PageData], bytes]:
+        """Get the picklable function that encodes one source page.
+
+        Args:
+            output_format: Registered output format name
+            timed: Whether pages come back as TimedPage carrying their stage
+                timings (defaults to whether a metrics callback is set)
+
+        Returns:
+            Function from source bytes to encoded bytes
+        """
+        if timed is None:
+            timed = self.metrics_callback is not None
+        return partial(
+            encode_page,
+            output_format=output_format,
+            quality=self.quality,
+            target=self.quality_target,
+            detect_grayscale=self.detect_grayscale,
+            effort=self.effort,
+            max_dimension=self.max_dimension,
+            target_dpi=self.target_dpi,
+            timed=timed,
+        )
+
+    def page_settings(self, output_format: str) -> tuple[Hashable, ...]:
+        """Get the encoder settings recorded for cache keys and manifests.
+
+        Args:
+            output_format: Registered output format name
+
+        Returns:
+            Tuple of encoder settings
+        """
+        return encoder_settings(
+            output_format,
+            self.quality,
+            self.quality_target,
+            self.detect_grayscale,
+            self.effort,
+            self.max_dimension,
+            self.target_dpi,
+        )
+
+    def open_executor(self) -> AbstractContextManager[Executor]:
+        """Get the executor to encode one archive or batch on.
+
+        Returns:
+            Context manager yielding the shared executor if one was given,
+            otherwise a new pool that is shut down on exit
+        """
+        if self.executor is not None:
+            return nullcontext(self.executor)
+        return create_executor(self.backend, self.max_workers)
+
+    def stage_recorder(self) -> StageRecorder | None:
+        """Create the recorder feeding the metrics callback, if one is set.
+
+        Returns:
+            A new stage recorder, or None when metrics are off
+        """
+        if self.metrics_callback is None:
+            return None
+        return StageRecorder(self.metrics_callback)
+
+    @staticmethod
+    def write_page(
+        job: ArchiveJob,
+        filename: str,
+        data: bytes,
+        recorder: StageRecorder | None = None,
+        key: Hashable | None = None,
+    ) -> str:
+        """Write an encoded page to its archive, recording the write time.
+
+        Args:
+            job: Archive the page belongs to
+            filename: Source page name
+            data: Encoded page bytes
+            recorder: Optional stage recorder
+            key: Page key the pipeline was given (defaults to the filename)
+
+        Returns:
+            Name of the page in the output archive
+        """
+        write_at = time.time()
+        start = time.perf_counter()
+        new_filename = job.write(filename, data)
+        if recorder is not None:
+            recorder.written(
+                filename if key is None else key,
+                new_filename,
+                write_at,
+                time.perf_counter() - start,
+            )
+        return new_filename
+
+    def create_job(
+        self, input_path: str, output_path: str, output_format: str = "jpeg"
+    ) -> ArchiveJob:
+        """Plan the compression of one archive.
+
+        Args:
+            input_path: Path to input CBZ file
+            output_path: Path to output CBZ file
+            output_format: Registered output format name
+
+        Returns:
+            The planned archive job
+        """
+        return ArchiveJob(
+            input_path,
+            output_path,
+            self.page_settings(output_format),
+            get_format(output_format).output_name,
+            self.incremental,
+            self.storage,
+            self.resume,
+            self.bad_pages,
+        )
+
+    def _compress_archive(
+        self,
+        input_path: str,
+        output_path: str,
+        output_format: str,
+        cancel_token: CancellationToken | None = None,
+    ) -> Generator[tuple[int, int, str], None, None]:
+        """Compress one archive, reading pages straight from the zip members.
+
+        A cancelled run drops its queued pages, waits for the pages already
+        encoding and removes the partial output; journaled pages are kept
+        for a resumed run.
+
+        Args:
+            input_path: Path to input CBZ file
+            output_path: Path to output CBZ file
+            output_format: Registered output format name
+            cancel_token: Optional token to pause or cancel the run
+
+        Yields:
+            (total pages, written pages, output page name) after every
+            encoded page; members copied as-is are not counted
+
+        Raises:
+            CompressionCancelledError: If the run was cancelled
+        """
+        job = self.create_job(input_path, output_path, output_format)
+        if job.up_to_date:
+            job.finish()
+            return
+        written = 0
+        recorder = self.stage_recorder()
+        try:
+            with self.open_executor() as executor:
+                results = stream_pages(
+                    executor,
+                    job.iter_pages(),
+                    self.page_encoder(output_format),
+                    self.max_in_flight,
+                    self.max_in_flight_bytes,
+                    self.cache,
+                    self.page_settings(output_format),
+                    self.max_reorder,
+                    recorder,
+                    cancel_token,
+                    job.page_failed if job.skips_bad_pages else None,
+                )
+                for filename, data in results:
+                    new_filename = self.write_page(job, filename, data, recorder)
+                    if not job.is_passthrough(filename):
+                        written += 1
+                        # Bad pages left out so far no longer count
+                        yield len(job.pages) - len(job.failures), written, new_filename
+                if cancel_token is not None and cancel_token.cancelled:
+                    # The last pages may have been encoded after the cancel
+                    raise CompressionCancelledError("Compression cancelled")
+            job.finish()
+        except BaseException:
+            job.abort()
+            raise
+
+    def get_file_size(self, file_path: str) -> float:
+        """Get file size in megabytes.
+
+        Args:
+            file_path: Path to the file.
+
+        Returns:
+            File size in megabytes.
+        """
+        return os.path.getsize(file_path) / (1024 * 1024)
+
+    def calculate_savings(self, original_size: float, compressed_size: float) -> float:
+        """Calculate space savings percentage.
+
+        Args:
+            original_size: Original size in megabytes.
+            compressed_size: Compressed size in megabytes.
+
+        Returns:
+            Space savings percentage.
+        """
+        if original_size == 0:
+            return 0
+        return ((original_size - compressed_size) / original_size) * 100
+
+    def process_image(self, image_data: bytes, quality: int) -> bytes:
+        """Process a single image with the given quality.
+
+        Args:
+            image_data: Raw image data as bytes
+            quality: JPEG quality (0-100)
+
+        Returns:
+            Processed image data as bytes
+        """
+        return encode_jpeg(image_data, quality)
+
+    def process_cbz(
+        self,
+        input_path: str,
+        output_path: str,
+        progress_callback: Callable[[int, int, str], None] | None = None,
+        cancel_token: CancellationToken | None = None,
+    ) -> None:
+        """Process a CBZ file with the given quality.
+
+        Args:
+            input_path: Path to input CBZ file
+            output_path: Path to output CBZ file
+            progress_callback: Optional callback function for progress updates
+            cancel_token: Optional token to pause or cancel the run
+
+        Raises:
+            CompressionCancelledError: If the run was cancelled
+            RuntimeError: If the archive could not be processed
+        """
+        try:
+            for total_files, i, filename in self._compress_archive(
+                input_path, output_path, "jpeg", cancel_token
+            ):
+                if progress_callback:
+                    progress_callback(total_files, i, filename)
+        except CompressionCancelledError:
+            raise
+        except Exception as e:
+            raise RuntimeError(f"Error processing CBZ file: {e!s}") from e
+
+    def get_image_files(self, cbz_path: str) -> Generator[str, None, None]:
+        """Get a list of image files in the CBZ archive.
+
+        Args:
+            cbz_path: Path to the CBZ file
+
+        Yields:
+            Filenames of image files in the archive
+        """
+        with zipfile.ZipFile(cbz_path, "r") as zf:
+            for filename in zf.namelist():
+                if filename.lower().endswith(IMAGE_EXTENSIONS):
+                    yield filename
@@ -0,0 +1,93 @@
+import multiprocessing
+from collections.abc import Callable
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any
+
+# Constants
+EXECUTOR_BACKENDS = ("thread", "process", "hybrid")
+DEFAULT_BACKEND = "thread"
+HYBRID_PROCESS_THRESHOLD = 512 * 1024  # Pages at least this large go to processes
+HYBRID_THREAD_SHARE = 4  # One in this many hybrid workers is a thread
+
+
+class HybridExecutor(Executor):
+    """Executor that routes large pages to processes and small ones to threads.
+
+    Shipping a page to another process costs a pickle round trip, which is
+    not worth it for small pages that encode in a few milliseconds. Large
+    pages spend most of their time in GIL-bound Pillow code and scale much
+    better across processes. The worker budget is split between the two
+    pools, so the executor never runs more workers than it was given
+    (except that a budget of one still gets one worker of each kind).
+    """
+
+    def __init__(self, max_workers: int, threshold: int = HYBRID_PROCESS_THRESHOLD) -> None:
+        """Initialize hybrid executor.
+
+        Args:
+            max_workers: Total number of workers across both pools
+            threshold: Minimum payload size in bytes routed to the process pool
+        """
+        self.threshold = threshold
+        threads = max(1, max_workers // HYBRID_THREAD_SHARE)
+        self._processes = _create_process_pool(max(1, max_workers - threads))
+        self._threads = ThreadPoolExecutor(max_workers=threads)
+
+    def submit(self, fn: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Future[Any]:
+        """Submit a task, routing it by the size of its first bytes argument."""
+        payload = args[0] if args else None
+        if isinstance(payload, bytes | bytearray | memoryview) and len(payload) >= self.threshold:
+            return self._processes.submit(fn, *args, **kwargs)
+        return self._threads.submit(fn, *args, **kwargs)
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        """Shut down both pools."""
+        self._threads.shutdown(wait=wait, cancel_futures=cancel_futures)
+        self._processes.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+
+class _SpawnedProcessPool(ProcessPoolExecutor):
+    """Process pool that copies memoryview arguments into bytes.
+
+    Pages read zero-copy from a mapped archive arrive as memoryviews, which
+    cannot be pickled; a worker process needs its own copy anyway.
+    """
+
+    def submit(self, fn: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Future[Any]:
+        args = tuple(bytes(arg) if isinstance(arg, memoryview) else arg for arg in args)
+        return super().submit(fn, *args, **kwargs)
+
+
+def _create_process_pool(max_workers: int) -> ProcessPoolExecutor:
+    """Create a process pool that is safe to start from GUI threads.
+
+    Forking a process that runs Qt threads can deadlock, so workers are
+    always spawned.
+    """
+    return _SpawnedProcessPool(
+        max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+    )
+
+
+def create_executor(backend: str, max_workers: int) -> Executor:
+    """Create an executor for the given backend.
+
+    Args:
+        backend: One of EXECUTOR_BACKENDS
+        max_workers: Number of workers
+
+    Returns:
+        A new executor; the caller is responsible for shutting it down
+
+    Raises:
+        ValueError: If the backend is unknown
+    """
+    if backend == "thread":
+        return ThreadPoolExecutor(max_workers=max_workers)
+    if backend == "process":
+        return _create_process_pool(max_workers)
+    if backend == "hybrid":
+        return HybridExecutor(max_workers)
+    raise ValueError(
+        f"Unknown executor backend: {backend} (expected one of {', '.join(EXECUTOR_BACKENDS)})"
+    )
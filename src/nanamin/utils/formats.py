@@ -0,0 +1,247 @@
+import importlib
+import io
+import os
+from collections.abc import Hashable
+from typing import TYPE_CHECKING, Any
+
+import PIL
+
+if TYPE_CHECKING:
+    from PIL.Image import Image as PILImage
+
+# Constants
+WEBP_METHOD = 6  # Highest compression
+
+
+class FormatEngine:
+    """An output page codec and its speed/effort knob.
+
+    Subclasses describe how Pillow saves the format and how the generic
+    ``effort`` setting maps onto the codec's own speed parameter. Higher
+    effort always means slower encoding and smaller output.
+    """
+
+    name = ""
+    pil_format = ""
+    extensions: tuple[str, ...] = ()  # First one is used when renaming pages
+    min_effort = 0
+    max_effort = 0
+    default_effort = 0
+    lossless = False  # Lossless engines ignore quality
+    plugin: str | None = None  # Optional Pillow plugin module providing the codec
+    _available: bool | None = None  # Cached result of available(), per process
+
+    def available(self) -> bool:
+        """Check whether the installed Pillow can encode this format.
+
+        The plugin is imported and Pillow's codecs are loaded on the first
+        call only.
+
+        Returns:
+            True if the format can be encoded
+        """
+        if self._available is None:
+            if self.plugin is not None:
+                try:
+                    importlib.import_module(self.plugin)
+                except ImportError:
+                    pass
+            self._available = self.pil_format in _registered_save_formats()
+        return self._available
+
+    def clamp_effort(self, effort: int | None) -> int:
+        """Resolve an effort setting for this format.
+
+        Args:
+            effort: Requested effort, or None for the format default
+
+        Returns:
+            Effort within this format's range
+        """
+        if effort is None:
+            return self.default_effort
+        return max(self.min_effort, min(self.max_effort, effort))
+
+    def save_options(self, quality: int, effort: int) -> dict[str, Any]:
+        """Get the Pillow save options for a quality and effort."""
+        return {"quality": quality}
+
+    def save(self, img: "PILImage", quality: int, effort: int | None = None) -> bytes:
+        """Encode an image.
+
+        Args:
+            img: Image in "RGB" or "L" mode
+            quality: Compression quality (1-100)
+            effort: Encoder effort, or None for the format default
+
+        Returns:
+            Encoded image data
+        """
+        if self.plugin is not None:
+            # Process pool workers need the plugin registered in their own interpreter
+            self.available()
+        output = io.BytesIO()
+        img.save(
+            output,
+            format=self.pil_format,
+            **self.save_options(quality, self.clamp_effort(effort)),
+        )
+        return output.getvalue()
+
+    def settings(self, quality: int, effort: int | None = None) -> tuple[Hashable, ...]:
+        """Get the settings that determine this engine's output bytes.
+
+        Args:
+            quality: Compression quality (1-100)
+            effort: Encoder effort, or None for the format default
+
+        Returns:
+            Tuple of encoder settings
+        """
+        return (
+            self.name,
+            None if self.lossless else quality,
+            self.clamp_effort(effort),
+            PIL.__version__,
+        )
+
+    def output_name(self, filename: str) -> str:
+        """Get the name of an encoded page inside the output archive.
+
+        Pages that already carry one of this format's extensions keep their
+        name; others get the format's main extension.
+
+        Args:
+            filename: Source page name
+
+        Returns:
+            Output page name
+        """
+        root, extension = os.path.splitext(filename)
+        if extension.lower() in self.extensions:
+            return filename
+        return root + self.extensions[0]
+
+
+class JpegEngine(FormatEngine):
+    """Baseline JPEG; effort 1 adds Huffman optimization, 2 progressive."""
+
+    name = "jpeg"
+    pil_format = "JPEG"
+    extensions = (".jpg", ".jpeg")
+    max_effort = 2
+    default_effort = 1
+
+    def save_options(self, quality: int, effort: int) -> dict[str, Any]:
+        return {"quality": quality, "optimize": effort >= 1, "progressive": effort >= 2}
+
+
+class WebpEngine(FormatEngine):
+    """Lossy WebP; effort is libwebp's method (0 fastest, 6 smallest)."""
+
+    name = "webp"
+    pil_format = "WEBP"
+    extensions = (".webp",)
+    max_effort = 6
+    default_effort = WEBP_METHOD
+
+    def save_options(self, quality: int, effort: int) -> dict[str, Any]:
+        return {"quality": quality, "method": effort, "lossless": False}
+
+
+class AvifEngine(FormatEngine):
+    """AVIF; effort maps onto the encoder speed (effort 10 is speed 0)."""
+
+    name = "avif"
+    pil_format = "AVIF"
+    extensions = (".avif",)
+    max_effort = 10
+    default_effort = 4
+    plugin = "pillow_avif"  # Only needed before Pillow 11.2
+
+    def save_options(self, quality: int, effort: int) -> dict[str, Any]:
+        return {"quality": quality, "speed": self.max_effort - effort}
+
+
+class JxlEngine(FormatEngine):
+    """JPEG XL via pillow-jxl-plugin; effort is libjxl's effort (1-9)."""
+
+    name = "jxl"
+    pil_format = "JXL"
+    extensions = (".jxl",)
+    min_effort = 1
+    max_effort = 9
+    default_effort = 7
+    plugin = "pillow_jxl"
+
+    def save_options(self, quality: int, effort: int) -> dict[str, Any]:
+        return {"quality": quality, "effort": effort}
+
+
+class PngEngine(FormatEngine):
+    """Lossless PNG; effort is the zlib compression level."""
+
+    name = "png"
+    pil_format = "PNG"
+    extensions = (".png",)
+    max_effort = 9
+    default_effort = 6
+    lossless = True
+
+    def save_options(self, quality: int, effort: int) -> dict[str, Any]:
+        return {"compress_level": effort, "optimize": effort == self.max_effort}
+
+
+FORMAT_ENGINES: dict[str, FormatEngine] = {}
+
+
+def register_format(engine: FormatEngine) -> None:
+    """Register an output format engine under its name.
+
+    Args:
+        engine: Engine to register; replaces any engine of the same name
+    """
+    FORMAT_ENGINES[engine.name] = engine
+
+
+def get_format(name: str) -> FormatEngine:
+    """Look up a registered output format engine.
+
+    Args:
+        name: Format name
+
+    Returns:
+        The engine
+
+    Raises:
+        ValueError: If the format is unknown or cannot be encoded here
+    """
+    engine = FORMAT_ENGINES.get(name)
+    if engine is None:
+        raise ValueError(
+            f"Unknown output format: {name} (expected one of {', '.join(FORMAT_ENGINES)})"
+        )
+    if not engine.available():
+        raise ValueError(f"Output format {name} is not supported by the installed Pillow")
+    return engine
+
+
+def available_formats() -> list[str]:
+    """List the registered formats that can be encoded here.
+
+    Returns:
+        Format names
+    """
+    return [name for name, engine in FORMAT_ENGINES.items() if engine.available()]
+
+
+def _registered_save_formats() -> set[str]:
+    # Loading every Pillow plugin is slow, so it waits until a format is needed
+    from PIL import Image
+
+    Image.init()
+    return set(Image.SAVE)
+
+
+for _engine in (JpegEngine(), WebpEngine(), AvifEngine(), JxlEngine(), PngEngine()):
+    register_format(_engine)
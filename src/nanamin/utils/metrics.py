@@ -0,0 +1,230 @@
+import json
+import os
+import threading
+import time
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass
+from typing import Any
+
+# Constants
+STAGES = ("read", "queue_wait", "decode", "convert", "encode", "write")
+WORKER_STAGES = ("decode", "convert", "encode")
+
+
+def worker_id() -> tuple[int, int]:
+    """Get the (process id, thread id) of the calling thread."""
+    return os.getpid(), threading.get_ident()
+
+
+class TimedPage(bytes):
+    """Encoded page bytes carrying the timings measured by the worker.
+
+    Being a bytes subclass, it travels back from process pool workers and
+    through the pipeline like any other encoded page.
+    """
+
+    started_at: float = 0.0  # Epoch time the worker picked the page up
+    decode_s: float = 0.0
+    convert_s: float = 0.0
+    encode_s: float = 0.0
+    worker: tuple[int, int] = (0, 0)
+
+
+@dataclass
+class PageMetrics:
+    """Timings and sizes of one page on its way through the pipeline.
+
+    Durations are in seconds; ``*_at`` fields are epoch timestamps of the
+    stage starts. Pages that never reached the encoder (cache hits, pages
+    copied or reused as they are) have ``reused`` set and no worker stages.
+    """
+
+    page: str
+    source_bytes: int
+    output_bytes: int = 0
+    output_name: str = ""
+    reused: bool = False
+    read_at: float = 0.0
+    submitted_at: float = 0.0
+    started_at: float = 0.0
+    write_at: float = 0.0
+    read: float = 0.0
+    queue_wait: float = 0.0
+    decode: float = 0.0
+    convert: float = 0.0
+    encode: float = 0.0
+    write: float = 0.0
+    pipeline: tuple[int, int] = (0, 0)  # (pid, thread id) reading and writing the archive
+    worker: tuple[int, int] = (0, 0)  # (pid, thread id) that encoded the page
+
+
+class StageRecorder:
+    """Assemble per-page metrics as pages move through the pipeline.
+
+    The pipeline reports reads, submissions and results; the archive writer
+    reports writes, which completes a page and hands it to the callback.
+    """
+
+    def __init__(self, callback: Callable[[PageMetrics], None]) -> None:
+        """Initialize stage recorder.
+
+        Args:
+            callback: Invoked with the metrics of every written page
+        """
+        self.callback = callback
+        self._pending: dict[Hashable, PageMetrics] = {}
+
+    def read(self, key: Hashable, size: int, started_at: float, seconds: float) -> None:
+        """Record that a source page was read."""
+        self._pending[key] = PageMetrics(
+            page=str(key),
+            source_bytes=size,
+            read_at=started_at,
+            read=seconds,
+            pipeline=worker_id(),
+        )
+
+    def submitted(self, key: Hashable, reused: bool) -> None:
+        """Record that a page entered the encode window."""
+        metrics = self._pending[key]
+        metrics.submitted_at = time.time()
+        metrics.reused = reused
+
+    def encoded(self, key: Hashable, data: bytes) -> None:
+        """Record the result of a page, with worker timings if available."""
+        metrics = self._pending[key]
+        metrics.output_bytes = len(data)
+        if isinstance(data, TimedPage):
+            metrics.started_at = data.started_at
+            metrics.queue_wait = max(0.0, data.started_at - metrics.submitted_at)
+            metrics.decode = data.decode_s
+            metrics.convert = data.convert_s
+            metrics.encode = data.encode_s
+            metrics.worker = data.worker
+
+    def dropped(self, key: Hashable) -> None:
+        """Forget a page that failed and will not be written."""
+        self._pending.pop(key, None)
+
+    def written(self, key: Hashable, output_name: str, started_at: float, seconds: float) -> None:
+        """Record that a page was written and report its metrics."""
+        metrics = self._pending.pop(key)
+        metrics.output_name = output_name
+        metrics.write_at = started_at
+        metrics.write = seconds
+        self.callback(metrics)
+
+
+class PipelineMetrics:
+    """Collect page metrics and summarize where the time went.
+
+    Pass ``record`` as a compressor's metrics callback. It is thread-safe,
+    so one instance can collect from several concurrent compressors.
+    """
+
+    def __init__(self, max_workers: int) -> None:
+        """Initialize pipeline metrics.
+
+        Args:
+            max_workers: Total encode workers, used for pool utilization
+        """
+        self.max_workers = max_workers
+        self.pages: list[PageMetrics] = []
+        self._lock = threading.Lock()
+
+    def record(self, metrics: PageMetrics) -> None:
+        """Add the metrics of one written page."""
+        with self._lock:
+            self.pages.append(metrics)
+
+    def summary(self) -> dict[str, Any]:
+        """Summarize the recorded pages.
+
+        ``pool_utilization`` is the share of worker time spent decoding,
+        converting and encoding; ``pipeline_busy`` is the share of wall time
+        spent reading and writing archives. A high pool utilization means the
+        run is encoder-bound, a high pipeline share that it is I/O-bound.
+
+        Returns:
+            Machine-readable summary
+        """
+        with self._lock:
+            pages = list(self.pages)
+        if not pages:
+            return {"pages": 0}
+        start = min(page.read_at for page in pages)
+        end = max(page.write_at + page.write for page in pages)
+        wall = max(end - start, 1e-9)
+        stage_seconds = {stage: sum(getattr(page, stage) for page in pages) for stage in STAGES}
+        worker_busy = sum(stage_seconds[stage] for stage in WORKER_STAGES)
+        pipeline_busy = stage_seconds["read"] + stage_seconds["write"]
+        pipelines = len({page.pipeline for page in pages})
+        encoded = [page for page in pages if not page.reused]
+        return {
+            "pages": len(pages),
+            "encoded_pages": len(encoded),
+            "wall_seconds": round(wall, 4),
+            "stage_seconds": {stage: round(value, 4) for stage, value in stage_seconds.items()},
+            "source_bytes": sum(page.source_bytes for page in pages),
+            "output_bytes": sum(page.output_bytes for page in pages),
+            "max_output_bytes": max(page.output_bytes for page in pages),
+            "pool_utilization": round(min(1.0, worker_busy / (wall * self.max_workers)), 4),
+            "pipeline_busy": round(min(1.0, pipeline_busy / (wall * pipelines)), 4),
+            "pages_per_second": round(len(pages) / wall, 3),
+        }
+
+    def write_trace(self, path: str) -> None:
+        """Write the recorded pages as a Chrome trace.
+
+        The file opens in chrome://tracing or Perfetto, with one row per
+        pipeline thread and encode worker.
+
+        Args:
+            path: Trace file to write
+        """
+        with self._lock:
+            pages = list(self.pages)
+        events: list[dict[str, Any]] = []
+        for page in pages:
+            args = {
+                "page": page.page,
+                "source_bytes": page.source_bytes,
+                "output_bytes": page.output_bytes,
+            }
+            spans = [("read", page.pipeline, page.read_at, page.read)]
+            spans.append(("write", page.pipeline, page.write_at, page.write))
+            if not page.reused:
+                at = page.started_at
+                for stage in WORKER_STAGES:
+                    spans.append((stage, page.worker, at, getattr(page, stage)))
+                    at += getattr(page, stage)
+                # Waiting pages overlap each other, so each gets its own async track
+                for phase, timestamp in (("b", page.submitted_at), ("e", page.started_at)):
+                    events.append(
+                        {
+                            "name": "queue_wait",
+                            "cat": "queue",
+                            "ph": phase,
+                            "id": page.page,
+                            "ts": timestamp * 1_000_000,
+                            "pid": page.pipeline[0],
+                            "tid": page.pipeline[1],
+                            "args": args,
+                        }
+                    )
+            for name, (pid, tid), at, seconds in spans:
+                events.append(
+                    {
+                        "name": name,
+                        "cat": "page",
+                        "ph": "X",
+                        "ts": at * 1_000_000,
+                        "dur": seconds * 1_000_000,
+                        "pid": pid,
+                        "tid": tid,
+                        "args": args,
+                    }
+                )
+
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
@@ -0,0 +1,189 @@
+import time
+from collections import deque
+from collections.abc import Callable, Generator, Hashable, Iterable
+from concurrent.futures import FIRST_COMPLETED, BrokenExecutor, Executor, Future, wait
+from typing import TypeVar
+
+from nanamin.utils.cache import PageCache
+from nanamin.utils.cancellation import POLL_INTERVAL, CancellationToken
+from nanamin.utils.metrics import StageRecorder
+
+# Constants
+DEFAULT_MAX_IN_FLIGHT_BYTES = 256 * 1024 * 1024  # 256 MB of source page data
+PAGES_PER_WORKER = 4  # Enough queued work to keep every worker busy
+
+K = TypeVar("K", bound=Hashable)
+
+# Source pages may be zero-copy views into a memory-mapped archive
+PageData = bytes | memoryview
+
+
+class Encoded(bytes):
+    """Page bytes that are already encoded and bypass the encoder."""
+
+
+def default_max_in_flight(max_workers: int) -> int:
+    """Get the default page window for a pool size.
+
+    Args:
+        max_workers: Number of pool workers.
+
+    Returns:
+        Maximum number of pages to keep in flight.
+    """
+    return max(2, max_workers * PAGES_PER_WORKER)
+
+
+def stream_pages(
+    executor: Executor,
+    pages: Iterable[tuple[K, PageData]],
+    encode: Callable[[PageData], bytes],
+    max_pages: int,
+    max_bytes: int = DEFAULT_MAX_IN_FLIGHT_BYTES,
+    cache: PageCache | None = None,
+    cache_settings: tuple[Hashable, ...] = (),
+    max_reorder: int | None = None,
+    recorder: StageRecorder | None = None,
+    cancel_token: CancellationToken | None = None,
+    on_error: Callable[[K, Exception], None] | None = None,
+) -> Generator[tuple[K, bytes], None, None]:
+    """Encode pages through a bounded in-flight window.
+
+    Pages are pulled lazily from ``pages``, so the source archive is only
+    read as fast as encoded results are consumed. Pages given as
+    ``Encoded`` bytes are passed through without encoding.
+
+    Results are emitted strictly in input order through a reorder buffer:
+    as soon as the oldest page is done, it and every finished page after it
+    are yielded. A slow page at the head does not stall the pool, since
+    pages that finish out of order are held in the buffer and new pages keep
+    being submitted, until ``max_reorder`` results are held. Reading pauses
+    while ``max_pages`` pages are encoding, the buffer is full, or the
+    window holds ``max_bytes`` of source data.
+
+    Args:
+        executor: Executor that runs the encode function.
+        pages: Iterable of (key, source bytes) pairs, in output order.
+            Source bytes may be memoryviews into a mapped archive.
+        encode: Function that turns source bytes into encoded bytes.
+        max_pages: Maximum number of pages queued or encoding at once.
+        max_bytes: Soft cap on the source bytes held by the window.
+        cache: Optional page cache; hits skip the encoder entirely.
+        cache_settings: Encoder settings that are part of the cache key.
+        max_reorder: Maximum number of finished results held while waiting
+            for an earlier page (defaults to ``max_pages``).
+        recorder: Optional stage recorder told about every read, submitted
+            and finished page; the consumer reports the writes.
+        cancel_token: Optional token checked before every read and while
+            waiting on the pool. Pausing stops new submissions; cancelling
+            drops the queued pages and raises ``CompressionCancelledError``.
+        on_error: Optional handler for pages whose encode failed; such
+            pages are passed to it and left out instead of raising. A
+            broken pool still raises.
+
+    Yields:
+        (key, encoded bytes) pairs in the same order as ``pages``.
+
+    Raises:
+        CompressionCancelledError: If ``cancel_token`` is cancelled
+    """
+    max_held = max_reorder or max_pages
+    window: deque[tuple[K, int, str | None, Future[bytes]]] = deque()
+    in_flight_bytes = 0
+
+    def drain_oldest() -> tuple[K, bytes] | None:
+        nonlocal in_flight_bytes
+        key, size, cache_key, future = window.popleft()
+        in_flight_bytes -= size
+        try:
+            result = future.result()
+        except Exception as e:
+            # A broken pool fails every page, so that is not the page's fault
+            if on_error is None or isinstance(e, BrokenExecutor):
+                raise RuntimeError(f"Error processing {key}: {e!s}") from e
+            if recorder is not None:
+                recorder.dropped(key)
+            on_error(key, e)
+            return None
+        if cache is not None and cache_key is not None:
+            cache.put(cache_key, result)
+        if recorder is not None:
+            recorder.encoded(key, result)
+        return key, result
+
+    def ready_prefix() -> Generator[tuple[K, bytes], None, None]:
+        while window and window[0][3].done():
+            if (item := drain_oldest()) is not None:
+                yield item
+
+    def wait_any(futures: list[Future[bytes]]) -> None:
+        if cancel_token is None:
+            wait(futures, return_when=FIRST_COMPLETED)
+            return
+        # Wake up regularly so a cancel is noticed within the poll interval
+        cancel_token.check()
+        while not wait(futures, timeout=POLL_INTERVAL, return_when=FIRST_COMPLETED).done:
+            cancel_token.check()
+
+    source = iter(pages)
+    try:
+        while True:
+            if cancel_token is not None:
+                cancel_token.check()
+            read_at = time.time()
+            read_start = time.perf_counter()
+            try:
+                key, data = next(source)
+            except StopIteration:
+                break
+            if recorder is not None:
+                recorder.read(key, len(data), read_at, time.perf_counter() - read_start)
+            cache_key: str | None = None
+            cached: bytes | None = None
+            if isinstance(data, Encoded):
+                cached = bytes(data)
+            elif cache is not None:
+                cache_key = cache.make_key(data, cache_settings)
+                cached = cache.get(cache_key)
+            # Ready pages hold no source bytes but still keep their place in line
+            size = 0 if cached is not None else len(data)
+
+            yield from ready_prefix()
+            while window:
+                pending = [future for _, _, _, future in window if not future.done()]
+                held = len(window) - len(pending)
+                if (
+                    len(pending) < max_pages
+                    and held < max_held
+                    and in_flight_bytes + size <= max_bytes
+                ):
+                    break
+                # A full buffer can only drain from the head; otherwise any
+                # finished page frees a worker slot
+                waiting = [window[0][3]] if held >= max_held else pending
+                wait_any(waiting)
+                yield from ready_prefix()
+
+            future: Future[bytes]
+            if cached is not None:
+                future = Future()
+                future.set_result(cached)
+                cache_key = None
+            else:
+                future = executor.submit(encode, data)
+            if recorder is not None:
+                recorder.submitted(key, cached is not None)
+            window.append((key, size, cache_key, future))
+            in_flight_bytes += size
+            del data
+            yield from ready_prefix()
+
+        while window:
+            wait_any([window[0][3]])
+            if (item := drain_oldest()) is not None:
+                yield item
+    finally:
+        # Drop queued pages if the consumer stopped early, a page failed or
+        # the run was cancelled; pages already encoding finish on their own
+        for _, _, _, future in window:
+            future.cancel()
@@ -0,0 +1,138 @@
+import math
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from nanamin.utils.batch import BatchProgress
+
+# Constants
+DEFAULT_FRAME_RATE = 10.0  # Progress snapshots per second at most
+SMOOTHING_SECONDS = 5.0  # Time constant of the throughput average
+
+
+@dataclass
+class ProgressSnapshot:
+    """Progress of a whole batch as of one display frame."""
+
+    batch_total: int  # Pages in the whole batch
+    batch_done: int  # Pages of the whole batch written so far
+    archive_index: int  # Zero-based index of the archive being written
+    archive_total: int  # Pages in that archive
+    archive_done: int  # Pages of that archive written so far
+    filename: str  # Last page written
+    elapsed: float  # Seconds since the batch started
+    pages_per_second: float  # Smoothed batch throughput
+    eta_seconds: float | None  # Predicted seconds left, None until measured
+
+    @property
+    def fraction(self) -> float:
+        """Share of the batch done, from 0 to 1."""
+        return self.batch_done / self.batch_total if self.batch_total else 1.0
+
+
+class ProgressAggregator:
+    """Coalesce per-page progress into snapshots at a fixed frame rate.
+
+    Pass ``update`` as a batch progress callback. However many pages are
+    written per second, and across however many archives, ``emit`` is
+    called at most ``frame_rate`` times per second with the latest state,
+    so a UI thread only redraws once per frame. Throughput is pages over
+    seconds, both exponentially decayed with a SMOOTHING_SECONDS time
+    constant: it starts as the plain average since the first page (pool
+    start-up is not part of the speed) and becomes an average over
+    roughly the last SMOOTHING_SECONDS, so the ETA follows changes in
+    speed (a volume of color pages, a paused run) without jumping on
+    every page or trusting the first few. Call ``flush`` when the batch
+    ends to emit the final state. Feed it from a single thread.
+    """
+
+    def __init__(
+        self,
+        emit: Callable[[ProgressSnapshot], None],
+        frame_rate: float = DEFAULT_FRAME_RATE,
+        smoothing: float = SMOOTHING_SECONDS,
+    ) -> None:
+        """Initialize progress aggregator.
+
+        Args:
+            emit: Invoked with each snapshot, e.g. a Qt signal's emit
+            frame_rate: Maximum number of snapshots per second
+            smoothing: Time constant of the throughput average in seconds
+
+        Raises:
+            ValueError: If frame_rate or smoothing is not positive
+        """
+        if frame_rate <= 0 or smoothing <= 0:
+            raise ValueError("frame_rate and smoothing must be positive")
+        self.emit = emit
+        self.interval = 1.0 / frame_rate
+        self.smoothing = smoothing
+        self.started = time.monotonic()
+        self._latest: BatchProgress | None = None
+        self._emitted_at = 0.0  # Monotonic time of the last snapshot
+        self._emitted_done = 0  # Pages done at the last snapshot
+        self._measured_at: float | None = None  # Monotonic time of the last rate sample
+        self._measured_done = 0  # Pages done at the last rate sample
+        self._decayed_pages = 0.0
+        self._decayed_seconds = 0.0
+        self._rate: float | None = None
+
+    def update(self, progress: "BatchProgress") -> None:
+        """Record a written page, emitting a snapshot if a frame is due.
+
+        Args:
+            progress: Batch progress after the page
+        """
+        self._latest = progress
+        now = time.monotonic()
+        if now - self._emitted_at >= self.interval:
+            self._emit(now)
+
+    def flush(self) -> None:
+        """Emit the latest state if it has not been emitted yet."""
+        if self._latest is not None and self._latest.batch_done != self._emitted_done:
+            self._emit(time.monotonic())
+
+    def _emit(self, now: float) -> None:
+        progress = self._latest
+        if progress is None:
+            return
+        self._sample_rate(now, progress.batch_done)
+        self._emitted_at = now
+        self._emitted_done = progress.batch_done
+        remaining = progress.batch_total - progress.batch_done
+        eta = remaining / self._rate if self._rate else None
+        self.emit(
+            ProgressSnapshot(
+                batch_total=progress.batch_total,
+                batch_done=progress.batch_done,
+                archive_index=progress.archive_index,
+                archive_total=progress.archive_total,
+                archive_done=progress.archive_done,
+                filename=progress.filename,
+                elapsed=now - self.started,
+                pages_per_second=self._rate or 0.0,
+                eta_seconds=eta,
+            )
+        )
+
+    def _sample_rate(self, now: float, done: int) -> None:
+        """Fold the throughput since the last sample into the average."""
+        if self._measured_at is None:
+            # The first page only starts the clock
+            self._measured_at = now
+            self._measured_done = done
+            return
+        elapsed = now - self._measured_at
+        if elapsed <= 0:
+            return
+        # Each sample weighs as much as the time it spans, so a burst of pages
+        # right after the start cannot dominate, and the frame rate does not matter
+        decay = math.exp(-elapsed / self.smoothing)
+        self._decayed_pages = self._decayed_pages * decay + (done - self._measured_done)
+        self._decayed_seconds = self._decayed_seconds * decay + elapsed
+        self._rate = self._decayed_pages / self._decayed_seconds
+        self._measured_at = now
+        self._measured_done = done
@@ -0,0 +1,128 @@
+import io
+import math
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from PIL.Image import Image as PILImage
+
+# Constants
+DEFAULT_MIN_QUALITY = 30
+DEFAULT_MAX_TRIALS = 5  # Encodes per page, including the first probe
+DEFAULT_TOLERANCE = 2  # Stop once the quality bracket is this narrow
+MAX_PSNR = 100.0  # Reported for identical images
+
+
+@dataclass(frozen=True)
+class QualityTarget:
+    """Per-page adaptive quality goal.
+
+    Exactly one of ``bytes_per_megapixel`` and ``min_psnr`` must be set.
+    With a size budget, the highest quality whose output fits is chosen.
+    With a similarity floor, the lowest quality whose luma PSNR against the
+    source reaches it is chosen. The compressor's quality is the upper bound.
+    """
+
+    bytes_per_megapixel: int | None = None
+    min_psnr: float | None = None
+    min_quality: int = DEFAULT_MIN_QUALITY
+    max_trials: int = DEFAULT_MAX_TRIALS
+    tolerance: int = DEFAULT_TOLERANCE
+
+    def __post_init__(self) -> None:
+        if (self.bytes_per_megapixel is None) == (self.min_psnr is None):
+            raise ValueError("Set exactly one of bytes_per_megapixel and min_psnr")
+        if self.max_trials < 1:
+            raise ValueError("max_trials must be at least 1")
+
+
+def psnr(reference: "PILImage", candidate: "PILImage") -> float:
+    """Compute the peak signal-to-noise ratio between two luma images.
+
+    Args:
+        reference: Source image in "L" mode
+        candidate: Decoded trial encode in "L" mode, same size
+
+    Returns:
+        PSNR in dB (MAX_PSNR for identical images)
+    """
+    from PIL import ImageChops
+
+    histogram = ImageChops.difference(reference, candidate).histogram()
+    squared_error = sum(count * value * value for value, count in enumerate(histogram))
+    mse = squared_error / (reference.width * reference.height)
+    if mse == 0:
+        return MAX_PSNR
+    return 10 * math.log10(255 * 255 / mse)
+
+
+def search_quality(
+    img: "PILImage",
+    save: Callable[["PILImage", int], bytes],
+    max_quality: int,
+    target: QualityTarget,
+) -> tuple[bytes, int]:
+    """Bisect the encoder quality for one page.
+
+    The decoded source image is reused for every trial. The first trial
+    probes the end of the range most likely to satisfy the target (the
+    maximum quality for a size budget, the minimum for a similarity floor)
+    and returns immediately if it does, so easy pages cost one encode.
+
+    Args:
+        img: Decoded source image, already converted for the encoder
+        save: Encodes an image at a given quality
+        max_quality: Highest quality to consider
+        target: Quality goal
+
+    Returns:
+        A tuple of the chosen encoded bytes and its quality
+    """
+    low = min(target.min_quality, max_quality)
+    high = max_quality
+    min_psnr = target.min_psnr
+    budget = (target.bytes_per_megapixel or 0) * img.width * img.height / 1_000_000
+    reference = img.convert("L") if min_psnr is not None else img
+
+    def satisfies(data: bytes) -> bool:
+        if min_psnr is None:
+            return len(data) <= budget
+        from PIL import Image
+
+        with Image.open(io.BytesIO(data)) as decoded:
+            return psnr(reference, decoded.convert("L")) >= min_psnr
+
+    # Size budgets want the highest fitting quality, similarity floors the lowest
+    prefer_high = min_psnr is None
+    probe = high if prefer_high else low
+    data = save(img, probe)
+    if satisfies(data):
+        return data, probe
+
+    # Best passing result so far; falls back to the safe end of the range
+    best: tuple[bytes, int] | None = None
+    if prefer_high:
+        high -= 1
+    else:
+        low += 1
+    trials = 1
+    while low <= high and high - low >= target.tolerance and trials < target.max_trials:
+        quality = (low + high) // 2
+        data = save(img, quality)
+        trials += 1
+        if satisfies(data):
+            best = (data, quality)
+            if prefer_high:
+                low = quality + 1
+            else:
+                high = quality - 1
+        elif prefer_high:
+            high = quality - 1
+        else:
+            low = quality + 1
+
+    if best is not None:
+        return best
+    fallback = low if prefer_high else max_quality
+    return save(img, fallback), fallback
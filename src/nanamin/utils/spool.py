@@ -0,0 +1,135 @@
+import json
+import os
+import struct
+import zlib
+from typing import Any, BinaryIO
+
+# Constants
+SPOOL_SUFFIX = ".spool"
+SPOOL_MAGIC = b"NANAMIN-SPOOL\n"
+SPOOL_VERSION = 1
+RECORD_HEADER = struct.Struct("<II")  # Metadata length, payload length
+RECORD_TRAILER = struct.Struct("<I")  # CRC32 of metadata and payload
+
+
+class PageSpool:
+    """Append-only journal of the pages encoded for one output archive.
+
+    Every encoded page is appended as a checksummed record next to the
+    output, so an interrupted run can pick up where it stopped: on restart
+    the journal is scanned, a torn last record is dropped, and pages whose
+    source fingerprint still matches are taken from the journal instead of
+    being encoded again. The journal is bound to the encoder settings and
+    discarded when they change. Records are flushed but not fsynced, so
+    they survive a crashed or killed process but not necessarily a power
+    loss.
+    """
+
+    def __init__(self, path: str, settings: Any) -> None:
+        """Open a journal, keeping the records of an earlier run if it matches.
+
+        Args:
+            path: Journal file
+            settings: JSON-serializable encoder settings the pages were made with
+        """
+        self.path = path
+        self._header = json.dumps({"version": SPOOL_VERSION, "settings": settings}).encode()
+        # Source page name -> (fingerprint, payload offset, payload length)
+        self._records: dict[str, tuple[str, int, int]] = {}
+        self._file: BinaryIO | None = None
+        self._end = 0
+        self._load()
+
+    def _load(self) -> None:
+        """Index the valid records of an existing journal."""
+        try:
+            f = open(self.path, "rb")
+        except OSError:
+            return
+        with f:
+            if f.readline() != SPOOL_MAGIC or f.readline().rstrip(b"\n") != self._header:
+                return
+            self._end = f.tell()
+            while True:
+                header = f.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    break
+                meta_length, length = RECORD_HEADER.unpack(header)
+                meta = f.read(meta_length)
+                offset = f.tell()
+                data = f.read(length)
+                trailer = f.read(RECORD_TRAILER.size)
+                if len(data) < length or len(trailer) < RECORD_TRAILER.size:
+                    break
+                (crc,) = RECORD_TRAILER.unpack(trailer)
+                if zlib.crc32(data, zlib.crc32(meta)) != crc:
+                    break
+                try:
+                    source, fingerprint = json.loads(meta)
+                except ValueError:
+                    break
+                self._records[source] = (fingerprint, offset, length)
+                self._end = f.tell()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def get(self, source: str, fingerprint: str) -> bytes | None:
+        """Get a journaled page if its source is unchanged.
+
+        Args:
+            source: Source page name
+            fingerprint: Current fingerprint of the source page
+
+        Returns:
+            The encoded page, or None if it is not journaled or out of date
+        """
+        record = self._records.get(source)
+        if record is None or record[0] != fingerprint:
+            return None
+        _, offset, length = record
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            data = f.read(length)
+        return data if len(data) == length else None
+
+    def append(self, source: str, fingerprint: str, data: bytes) -> None:
+        """Journal an encoded page.
+
+        Args:
+            source: Source page name
+            fingerprint: Fingerprint of the source page
+            data: Encoded page
+        """
+        if self._file is None:
+            if self._end:
+                # Continue the earlier run's journal, cutting off a torn record
+                self._file = open(self.path, "r+b")
+                self._file.truncate(self._end)
+                self._file.seek(self._end)
+            else:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self._file = open(self.path, "wb")
+                self._file.write(SPOOL_MAGIC + self._header + b"\n")
+        meta = json.dumps([source, fingerprint]).encode("utf-8")
+        self._file.write(RECORD_HEADER.pack(len(meta), len(data)) + meta)
+        offset = self._file.tell()
+        self._file.write(data)
+        self._file.write(RECORD_TRAILER.pack(zlib.crc32(data, zlib.crc32(meta))))
+        self._file.flush()
+        self._records[source] = (fingerprint, offset, len(data))
+        self._end = self._file.tell()
+
+    def close(self) -> None:
+        """Close the journal, keeping it for a later run."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def discard(self) -> None:
+        """Close and delete the journal once the output is complete."""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self._records.clear()
+        self._end = 0
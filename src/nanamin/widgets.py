@@ -0,0 +1,112 @@
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QPaintEvent, QResizeEvent
+from PyQt6.QtWidgets import QGroupBox, QProgressBar, QPushButton, QToolButton, QWidget
+
+
+class ModernProgressBar(QProgressBar):
+    def __init__(self, parent: QWidget | None = None) -> None:
+        super().__init__(parent)
+        self.setTextVisible(True)
+        self.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.setMinimumHeight(25)
+        self.setStyleSheet(
+            """
+            QProgressBar {
+                border: 2px solid #4C566A;
+                border-radius: 5px;
+                text-align: center;
+                background-color: #2E3440;
+                color: #ECEFF4;
+            }
+            QProgressBar::chunk {
+                background-color: #88C0D0;
+                border-radius: 3px;
+            }
+        """
+        )
+
+
+class ModernButton(QPushButton):
+    def __init__(self, text: str, parent: QWidget | None = None) -> None:
+        super().__init__(text, parent)
+        self.setStyleSheet(
+            """
+            QPushButton {
+                background-color: #5E81AC;
+                color: #ECEFF4;
+                border: none;
+                border-radius: 5px;
+                padding: 8px 16px;
+                font-weight: bold;
+            }
+            QPushButton:hover {
+                background-color: #81A1C1;
+            }
+            QPushButton:pressed {
+                background-color: #4C566A;
+            }
+            QPushButton:disabled {
+                background-color: #3B4252;
+                color: #4C566A;
+            }
+        """
+        )
+        self.setMinimumHeight(35)
+
+
+class ModernGroupBox(QGroupBox):
+    def __init__(self, title: str, parent: QWidget | None = None) -> None:
+        super().__init__(title, parent)
+        self.setStyleSheet(
+            """
+            QGroupBox {
+                font-weight: bold;
+                border: 2px solid #4C566A;
+                border-radius: 5px;
+                margin-top: 10px;
+                padding-top: 10px;
+                color: #ECEFF4;
+            }
+            QGroupBox::title {
+                subcontrol-origin: margin;
+                left: 10px;
+                padding: 0 5px;
+                color: #88C0D0;
+            }
+        """
+        )
+
+
+class ModernInfoIcon(QToolButton):
+    def __init__(self, parent: QWidget | None = None) -> None:
+        super().__init__(parent)
+        self.setFixedSize(24, 24)
+        self.setStyleSheet(
+            """
+            QToolButton {
+                border: none;
+                padding: 4px;
+                background: transparent;
+                color: #88C0D0;
+                font-size: 16px;
+                font-weight: bold;
+            }
+            QToolButton:hover {
+                background-color: #4C566A;
+                border-radius: 4px;
+            }
+        """
+        )
+        self.setToolTip("Click for help and keyboard shortcuts")
+        self.setText("?")
+
+    def paintEvent(self, event: QPaintEvent | None) -> None:
+        """Handle paint event for the help icon."""
+        super().paintEvent(event)
+
+    def resizeEvent(self, event: QResizeEvent | None) -> None:
+        """Handle window resize to keep help button in top-right corner."""
+        super().resizeEvent(event)
+        # Find the help button and update its position with padding
+        for child in self.findChildren(ModernInfoIcon):
+            child.move(self.width() - 40, 15)
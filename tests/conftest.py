@@ -0,0 +1,73 @@
+import io
+import zipfile
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+import pytest
+from PIL import Image
+
+from nanamin.utils.archive import ArchiveJob
+from nanamin.utils.batch import BatchCompressor
+from nanamin.utils.compressor import CBZCompressor
+
+MakeCbz = Callable[..., Path]
+
+
+def image_bytes(
+    size: tuple[int, int] = (64, 96),
+    color: tuple[int, int, int] | int = (200, 40, 40),
+    image_format: str = "PNG",
+    mode: str = "RGB",
+    **options: object,
+) -> bytes:
+    """Encode a flat test image."""
+    buffer = io.BytesIO()
+    Image.new(mode, size, color).save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+def compress(
+    input_path: Path, output_path: Path, output_format: str = "jpeg", **options: Any
+) -> ArchiveJob:
+    """Compress one archive and return its finished job.
+
+    ``options`` go to CBZCompressor; incremental runs are on by default.
+    """
+    options = {"quality": 85, "backend": "thread", "max_workers": 2, "incremental": True, **options}
+    finished: list[ArchiveJob] = []
+    BatchCompressor(CBZCompressor(**options), output_format).process_batch(
+        [(str(input_path), str(output_path))],
+        archive_callback=lambda index, job: finished.append(job),
+    )
+    return finished[0]
+
+
+def truncated(data: bytes) -> bytes:
+    """Cut an image in half, so it opens but cannot be decoded."""
+    return data[: len(data) // 2]
+
+
+@pytest.fixture
+def make_cbz(tmp_path: Path) -> MakeCbz:
+    """Write test archives into the test's temporary directory.
+
+    Members default to three PNG pages; pass a dict of name -> bytes for
+    anything else. ``compression`` applies to every member.
+    """
+
+    def make(
+        name: str = "book.cbz",
+        members: dict[str, bytes] | None = None,
+        compression: int = zipfile.ZIP_DEFLATED,
+    ) -> Path:
+        if members is None:
+            members = {f"{index:02d}.png": image_bytes() for index in range(3)}
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with zipfile.ZipFile(path, "w", compression) as zf:
+            for member, data in members.items():
+                zf.writestr(member, data)
+        return path
+
+    return make
@@ -0,0 +1,116 @@
+import io
+import os
+from pathlib import Path
+
+import pytest
+from conftest import MakeCbz, compress, image_bytes, truncated
+from PIL import Image
+
+from nanamin.utils.analyzer import (
+    DEFAULT_MIN_SAVINGS,
+    DEFAULT_SAMPLE_PAGES,
+    ArchiveAnalyzer,
+    ArchiveEstimate,
+    _sample_indices,
+)
+from nanamin.utils.compressor import CBZCompressor
+
+
+def noisy_page(seed: int, size: tuple[int, int] = (128, 192)) -> bytes:
+    """A PNG page of noise, which JPEG shrinks a lot."""
+    buffer = io.BytesIO()
+    Image.effect_noise(size, 20 + seed).convert("RGB").save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def analyze(
+    path: Path,
+    tmp_path: Path,
+    sample_pages: int = DEFAULT_SAMPLE_PAGES,
+    min_savings: float = DEFAULT_MIN_SAVINGS,
+    bad_pages: str = "fail",
+) -> ArchiveEstimate:
+    """Analyze one archive for JPEG output on a small thread pool."""
+    compressor = CBZCompressor(85, backend="thread", max_workers=2, bad_pages=bad_pages)
+    analyzer = ArchiveAnalyzer(compressor, "jpeg", sample_pages, min_savings)
+    [estimate] = analyzer.analyze([(str(path), str(tmp_path / "out.cbz"))])
+    return estimate
+
+
+@pytest.mark.parametrize(
+    ("sizes", "samples", "picks"),
+    [
+        ([5, 5], 3, [0, 1]),
+        ([10] * 9, 3, [1, 4, 7]),
+        # The large cover holds most of the bytes, so most picks land on it
+        ([60, 8, 8, 8, 8, 8], 3, [0, 0, 3]),
+        ([1, 1, 1, 1, 96], 4, [4, 4, 4, 4]),
+    ],
+)
+def test_sample_indices_follow_the_page_bytes(
+    sizes: list[int], samples: int, picks: list[int]
+) -> None:
+    assert _sample_indices(sizes, samples) == picks
+
+
+def test_fully_sampled_archive_predicts_exactly(make_cbz: MakeCbz, tmp_path: Path) -> None:
+    pages = {f"{index:02d}.png": noisy_page(index) for index in range(3)}
+    book = make_cbz(members=pages)
+    estimate = analyze(book, tmp_path, sample_pages=3)
+    assert estimate.selected
+    assert (estimate.pages, estimate.sampled_pages, estimate.savings_error) == (3, 3, 0.0)
+    assert estimate.formats == {"PNG": 3}
+    assert estimate.modes == {"RGB": 3}
+    compress(book, tmp_path / "actual.cbz", incremental=False)
+    actual = os.path.getsize(tmp_path / "actual.cbz")
+    # Only the manifest and record headers are not predicted
+    assert estimate.estimated_bytes == pytest.approx(actual, rel=0.1)
+
+
+def test_sampled_archive_reports_an_error_bound(make_cbz: MakeCbz, tmp_path: Path) -> None:
+    pages = {f"{index:02d}.png": noisy_page(index) for index in range(8)}
+    pages["08.png"] = image_bytes((128, 192))
+    estimate = analyze(make_cbz(members=pages), tmp_path, sample_pages=4)
+    assert estimate.sampled_pages <= 4
+    assert estimate.savings_error is not None and estimate.savings_error > 0
+    single = analyze(make_cbz(members=pages), tmp_path, sample_pages=1)
+    assert single.savings_error is None
+
+
+def test_small_savings_are_not_selected(make_cbz: MakeCbz, tmp_path: Path) -> None:
+    book = make_cbz(members={"00.png": noisy_page(0)})
+    estimate = analyze(book, tmp_path, min_savings=99.9)
+    assert not estimate.selected
+    assert estimate.reason.startswith("Predicted savings")
+
+
+def test_work_list_puts_selected_archives_first(make_cbz: MakeCbz, tmp_path: Path) -> None:
+    small = make_cbz("small.cbz", {"00.png": noisy_page(0, (64, 64))})
+    junk = tmp_path / "junk.cbz"
+    junk.write_bytes(b"not a zip")
+    large = make_cbz("large.cbz", {"00.png": noisy_page(1, (256, 384))})
+    compressor = CBZCompressor(85, backend="thread", max_workers=2)
+    ranked = ArchiveAnalyzer(compressor, "jpeg").analyze(
+        [(str(path), str(tmp_path / "out" / path.name)) for path in (small, junk, large)]
+    )
+    assert [estimate.input_path for estimate in ranked][-1] == str(junk)
+    assert ranked[-1].reason
+    assert all(estimate.selected for estimate in ranked[:2])
+
+
+@pytest.mark.parametrize(("bad_pages", "selected"), [("fail", False), ("skip", True)])
+def test_bad_pages_follow_the_policy(
+    make_cbz: MakeCbz, tmp_path: Path, bad_pages: str, selected: bool
+) -> None:
+    pages = {"00.png": noisy_page(0), "01.png": truncated(noisy_page(1)), "02.png": noisy_page(2)}
+    estimate = analyze(make_cbz(members=pages), tmp_path, bad_pages=bad_pages)
+    assert estimate.selected is selected
+    if selected:
+        assert (estimate.pages, estimate.bad_pages) == (2, 1)
+    else:
+        assert estimate.reason.startswith("Error analyzing CBZ file")
+
+
+def test_sample_pages_must_be_positive() -> None:
+    with pytest.raises(ValueError):
+        ArchiveAnalyzer(CBZCompressor(85), "jpeg", sample_pages=0)
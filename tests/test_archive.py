@@ -0,0 +1,211 @@
+import os
+import struct
+import zipfile
+import zlib
+from pathlib import Path
+
+import pytest
+
+from nanamin.utils.archive import (
+    MEASURE_SAMPLE_SIZE,
+    RecordWriter,
+    build_record,
+    choose_compression,
+    copy_raw_member,
+    write_raw_record,
+)
+from nanamin.utils.compressor import CBZCompressor
+
+# Constants
+ZIP64_EXTRA_ID = 0x0001
+TIMESTAMP_EXTRA = struct.pack("<HHBL", 0x5455, 5, 1, 1_700_000_000)
+# Random bytes do not deflate, like real image payloads
+PAGES = {f"{number:02d}.png": os.urandom(64 * (number + 1)) for number in range(6)}
+METADATA = b"<ComicInfo/>" * 50
+
+
+def extra_ids(extra: bytes) -> list[int]:
+    """List the header ids of a zip extra field."""
+    ids = []
+    while len(extra) >= 4:
+        header_id, size = struct.unpack("<HH", extra[:4])
+        ids.append(header_id)
+        extra = extra[4 + size :]
+    return ids
+
+
+def make_archive(path: Path, members: dict[str, bytes], extra: bytes = b"") -> None:
+    """Write a plain archive with zipfile itself, every member carrying ``extra``."""
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in members.items():
+            info = zipfile.ZipInfo(name, (2024, 1, 1, 0, 0, 0))
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.extra = extra
+            zf.writestr(info, data)
+
+
+def local_extra(path: Path, info: zipfile.ZipInfo) -> bytes:
+    """Read the extra field of a member's local header."""
+    with open(path, "rb") as f:
+        f.seek(info.header_offset)
+        header = f.read(30)
+        name_length, extra_length = struct.unpack("<HH", header[26:30])
+        f.seek(name_length, os.SEEK_CUR)
+        return f.read(extra_length)
+
+
+@pytest.mark.parametrize(
+    ("policy", "metadata_type", "page_type"),
+    [
+        ("auto", zipfile.ZIP_DEFLATED, zipfile.ZIP_STORED),
+        ("stored", zipfile.ZIP_STORED, zipfile.ZIP_STORED),
+        ("deflated", zipfile.ZIP_DEFLATED, zipfile.ZIP_DEFLATED),
+        ("measured", zipfile.ZIP_DEFLATED, zipfile.ZIP_STORED),
+    ],
+)
+def test_raw_records_round_trip(
+    tmp_path: Path, policy: str, metadata_type: int, page_type: int
+) -> None:
+    members = {"ComicInfo.xml": METADATA, **PAGES}
+    path = tmp_path / "out.cbz"
+    with zipfile.ZipFile(path, "w") as zf:
+        for name, data in members.items():
+            write_raw_record(zf, *build_record(name, data, policy))
+
+    with zipfile.ZipFile(path) as zf:
+        assert zf.testzip() is None
+        assert zf.namelist() == list(members)
+        for info in zf.infolist():
+            expected = metadata_type if info.filename == "ComicInfo.xml" else page_type
+            assert info.compress_type == expected
+            assert info.CRC == zlib.crc32(members[info.filename])
+            assert info.file_size == len(members[info.filename])
+            assert zf.read(info) == members[info.filename]
+
+
+@pytest.mark.parametrize(
+    ("policy", "filename", "data", "expected"),
+    [
+        ("auto", "01.jpg", METADATA, zipfile.ZIP_STORED),
+        ("auto", "01.WEBP", METADATA, zipfile.ZIP_STORED),
+        ("auto", "ComicInfo.xml", PAGES["00.png"], zipfile.ZIP_DEFLATED),
+        ("stored", "ComicInfo.xml", METADATA, zipfile.ZIP_STORED),
+        ("deflated", "01.jpg", PAGES["00.png"], zipfile.ZIP_DEFLATED),
+        ("measured", "01.jpg", METADATA, zipfile.ZIP_DEFLATED),
+        ("measured", "ComicInfo.xml", PAGES["05.png"], zipfile.ZIP_STORED),
+        ("measured", "empty.txt", b"", zipfile.ZIP_STORED),
+    ],
+)
+def test_choose_compression(policy: str, filename: str, data: bytes, expected: int) -> None:
+    assert choose_compression(filename, data, policy) == expected
+
+
+def test_measured_policy_only_samples_the_head() -> None:
+    data = os.urandom(MEASURE_SAMPLE_SIZE) + bytes(MEASURE_SAMPLE_SIZE * 4)
+    assert choose_compression("01.png", data, "measured") == zipfile.ZIP_STORED
+
+
+def test_unknown_storage_policy_is_rejected() -> None:
+    with pytest.raises(ValueError, match="Unknown storage policy: store"):
+        choose_compression("01.png", b"page", "store")
+    with pytest.raises(ValueError, match="Unknown storage policy"):
+        build_record("01.png", b"page", "deflate")
+    with pytest.raises(ValueError, match="Unknown storage policy"):
+        CBZCompressor(85, storage="none")
+
+
+def test_raw_record_rejects_closed_archive(tmp_path: Path) -> None:
+    zf = zipfile.ZipFile(tmp_path / "out.cbz", "w")
+    zf.close()
+    with pytest.raises(ValueError):
+        write_raw_record(zf, *build_record("01.png", b"page"))
+
+
+def test_raw_records_use_zip64_past_the_limits(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # Lower zipfile's limits so the zip64 paths run without gigabytes of data
+    monkeypatch.setattr(zipfile, "ZIP64_LIMIT", 1024)
+    monkeypatch.setattr(zipfile, "ZIP_FILECOUNT_LIMIT", 4)
+    members = {name: data * 8 for name, data in PAGES.items()}
+    path = tmp_path / "out.cbz"
+    with zipfile.ZipFile(path, "w") as zf:
+        for name, data in members.items():
+            write_raw_record(zf, *build_record(name, data, "stored"))
+
+    with zipfile.ZipFile(path) as zf:
+        assert zf.testzip() is None
+        assert {name: zf.read(name) for name in zf.namelist()} == members
+        assert all(info.compress_type == zipfile.ZIP_STORED for info in zf.infolist())
+        large = [info for info in zf.infolist() if info.file_size > 1024]
+        assert large
+        for info in large:
+            # The local header carries the zip64 sizes, not just the directory
+            assert ZIP64_EXTRA_ID in extra_ids(local_extra(path, info))
+
+
+def test_copy_raw_member_keeps_the_record(tmp_path: Path) -> None:
+    source_path = tmp_path / "in.cbz"
+    make_archive(source_path, PAGES, TIMESTAMP_EXTRA)
+    path = tmp_path / "out.cbz"
+    with open(source_path, "rb") as source, zipfile.ZipFile(source_path) as zin:
+        with zipfile.ZipFile(path, "w") as zf:
+            for info in zin.infolist():
+                copy_raw_member(source, info, zf)
+        originals = {info.filename: info for info in zin.infolist()}
+
+    with zipfile.ZipFile(path) as zf:
+        assert zf.testzip() is None
+        for info in zf.infolist():
+            original = originals[info.filename]
+            assert (info.CRC, info.compress_size, info.compress_type) == (
+                original.CRC,
+                original.compress_size,
+                original.compress_type,
+            )
+            assert info.extra == TIMESTAMP_EXTRA
+            assert local_extra(path, info) == TIMESTAMP_EXTRA
+            assert zf.read(info) == PAGES[info.filename]
+
+
+def test_copy_raw_member_writes_zip64_records_afresh(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(zipfile, "ZIP64_LIMIT", 1024)
+    members = {name: data * 8 for name, data in PAGES.items()}
+    source_path = tmp_path / "in.cbz"
+    make_archive(source_path, members, TIMESTAMP_EXTRA)
+    path = tmp_path / "out.cbz"
+    with open(source_path, "rb") as source, zipfile.ZipFile(source_path) as zin:
+        assert any(ZIP64_EXTRA_ID in extra_ids(info.extra) for info in zin.infolist())
+        with zipfile.ZipFile(path, "w") as zf:
+            for info in zin.infolist():
+                copy_raw_member(source, info, zf)
+
+    with zipfile.ZipFile(path) as zf:
+        assert zf.testzip() is None
+        for info in zf.infolist():
+            ids = extra_ids(local_extra(path, info))
+            assert ids.count(0x5455) == 1
+            # One zip64 record for the sizes of this copy, never the stale one
+            assert ids.count(ZIP64_EXTRA_ID) == (1 if info.file_size > 1024 else 0)
+            assert zf.read(info) == members[info.filename]
+
+
+def test_record_writer_appends_in_order(tmp_path: Path) -> None:
+    path = tmp_path / "out.cbz"
+    written: list[str] = []
+    writer = RecordWriter(str(path), max_workers=4, max_pending=2)
+    for index, (name, data) in enumerate(PAGES.items()):
+        if index % 2:
+            writer.add_raw(*build_record(name, data), lambda info: written.append(info.filename))
+        else:
+            writer.add(name, data, on_written=lambda info: written.append(info.filename))
+        assert len(writer._pending) <= writer.max_pending
+    writer.writestr("ComicInfo.xml", b"<ComicInfo/>")
+    writer.close()
+
+    assert written == list(PAGES)
+    with zipfile.ZipFile(path) as zf:
+        assert zf.testzip() is None
+        assert zf.namelist() == [*PAGES, "ComicInfo.xml"]
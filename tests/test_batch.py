@@ -0,0 +1,125 @@
+import zipfile
+from pathlib import Path
+
+import pytest
+from conftest import MakeCbz, image_bytes, truncated
+
+from nanamin.utils.batch import BatchCompressor, BatchProgress
+from nanamin.utils.cancellation import CancellationToken, CompressionCancelledError
+from nanamin.utils.compressor import CBZCompressor
+
+
+@pytest.fixture
+def batch() -> BatchCompressor:
+    """A JPEG batch compressor on a small thread pool."""
+    return BatchCompressor(CBZCompressor(85, backend="thread", max_workers=2), "jpeg")
+
+
+@pytest.fixture
+def jobs(make_cbz: MakeCbz, tmp_path: Path) -> list[tuple[str, str]]:
+    """A healthy archive, one that is not a zip, one with a bad page, a healthy one."""
+    junk = tmp_path / "junk.cbz"
+    junk.write_bytes(b"not a zip")
+    bad_pages = {"00.png": image_bytes(), "01.png": truncated(image_bytes((400, 400)))}
+    inputs = [
+        make_cbz("first.cbz"),
+        junk,
+        make_cbz("bad.cbz", bad_pages),
+        make_cbz("last.cbz"),
+    ]
+    return [(str(path), str(tmp_path / "out" / path.name)) for path in inputs]
+
+
+def test_failed_archives_do_not_stop_the_batch(
+    batch: BatchCompressor, jobs: list[tuple[str, str]]
+) -> None:
+    errors: dict[int, Exception] = {}
+    finished: list[int] = []
+    updates: list[BatchProgress] = []
+    batch.process_batch(
+        jobs,
+        updates.append,
+        archive_callback=lambda index, job: finished.append(index),
+        error_callback=errors.__setitem__,
+    )
+
+    assert finished == [0, 3]
+    assert sorted(errors) == [1, 2]
+    assert all(isinstance(error, RuntimeError) for error in errors.values())
+    for _, output_path in (jobs[0], jobs[3]):
+        with zipfile.ZipFile(output_path) as zf:
+            assert zf.testzip() is None
+            assert [name for name in zf.namelist() if name.endswith(".jpg")] == [
+                "00.jpg",
+                "01.jpg",
+                "02.jpg",
+            ]
+    for _, output_path in (jobs[1], jobs[2]):
+        assert not Path(output_path).exists()
+        assert not Path(output_path + ".part").exists()
+    # Unwritten pages of failed archives leave the total, so progress ends at
+    # 100%; bad.cbz wrote its first page before the second one failed
+    assert updates[-1].batch_done == updates[-1].batch_total == 7
+
+
+def test_failures_raise_after_the_batch_without_a_callback(
+    batch: BatchCompressor, jobs: list[tuple[str, str]]
+) -> None:
+    with pytest.raises(RuntimeError, match=r"junk\.cbz.*\(1 more archive\(s\) failed\)"):
+        batch.process_batch(jobs)
+    assert Path(jobs[0][1]).exists()
+    assert Path(jobs[3][1]).exists()
+
+
+def test_cancel_keeps_finished_archives(
+    batch: BatchCompressor, make_cbz: MakeCbz, tmp_path: Path
+) -> None:
+    jobs = [
+        (str(make_cbz(f"{index}.cbz")), str(tmp_path / "out" / f"{index}.cbz"))
+        for index in range(3)
+    ]
+    token = CancellationToken()
+
+    def cancel_in_second(index: int, job: object) -> None:
+        if index == 0:
+            token.cancel()
+
+    with pytest.raises(CompressionCancelledError):
+        batch.process_batch(jobs, archive_callback=cancel_in_second, cancel_token=token)
+    assert Path(jobs[0][1]).exists()
+    # Pages of later archives already encoded when the token fired are dropped
+    assert not any(Path(output).exists() for _, output in jobs[1:])
+    assert not list((tmp_path / "out").glob("*.part"))
+
+
+def test_skipped_pages_leave_the_totals(make_cbz: MakeCbz, tmp_path: Path) -> None:
+    members = {
+        "00.png": image_bytes(),
+        "01.png": b"not an image",
+        "02.png": image_bytes(),
+        "03.png": truncated(image_bytes((400, 400))),
+    }
+    book = make_cbz(members=members)
+    compressor = CBZCompressor(85, backend="thread", max_workers=2, bad_pages="skip")
+    updates: list[BatchProgress] = []
+    BatchCompressor(compressor, "jpeg").process_batch(
+        [(str(book), str(tmp_path / "out.cbz"))], updates.append
+    )
+
+    # The last page is left out after the last write, which still ends at 100%
+    final = updates[-1]
+    assert (final.batch_done, final.batch_total) == (2, 2)
+    assert (final.archive_done, final.archive_total) == (2, 2)
+    with zipfile.ZipFile(tmp_path / "out.cbz") as zf:
+        assert [name for name in zf.namelist() if name.endswith(".jpg")] == ["00.jpg", "02.jpg"]
+
+
+def test_bad_page_errors_name_the_member(make_cbz: MakeCbz, tmp_path: Path) -> None:
+    book = make_cbz(members={"00.png": image_bytes(), "01.png": b"not an image"})
+    errors: dict[int, Exception] = {}
+    batch = BatchCompressor(CBZCompressor(85, backend="thread", max_workers=2), "jpeg")
+    batch.process_batch([(str(book), str(tmp_path / "out.cbz"))], error_callback=errors.__setitem__)
+    message = str(errors[0])
+    assert "book.cbz:01.png" in message
+    assert "not a recognized image format" in message
+    assert " at 0x" not in message
@@ -0,0 +1,83 @@
+import os
+import threading
+from pathlib import Path
+
+import pytest
+
+from nanamin.utils import cache as cache_module
+from nanamin.utils.cache import PageCache
+
+# Constants
+ENTRY_SIZE = 100
+SETTINGS = ("jpeg", 85, 0, "12.0")
+
+
+def age(page_cache: PageCache, key: str, mtime: float) -> None:
+    """Set the last use of an entry."""
+    os.utime(page_cache._path(key), (mtime, mtime))
+
+
+def test_round_trip_and_counters(tmp_path: Path) -> None:
+    page_cache = PageCache(str(tmp_path))
+    key = page_cache.make_key(b"source", SETTINGS)
+    assert page_cache.get(key) is None
+    page_cache.put(key, b"encoded")
+    assert page_cache.get(key) == b"encoded"
+    assert (page_cache.hits, page_cache.misses) == (1, 1)
+
+
+def test_key_covers_source_settings_and_version(monkeypatch: pytest.MonkeyPatch) -> None:
+    key = PageCache.make_key(b"source", SETTINGS)
+    assert PageCache.make_key(memoryview(b"source"), SETTINGS) == key
+    assert PageCache.make_key(b"other", SETTINGS) != key
+    assert PageCache.make_key(b"source", ("jpeg", 80, 0, "12.0")) != key
+    monkeypatch.setattr(cache_module, "CACHE_VERSION", cache_module.CACHE_VERSION + 1)
+    assert PageCache.make_key(b"source", SETTINGS) != key
+
+
+def test_eviction_removes_least_recently_used(tmp_path: Path) -> None:
+    page_cache = PageCache(str(tmp_path), max_bytes=ENTRY_SIZE * 3)
+    keys = [page_cache.make_key(bytes([index]), SETTINGS) for index in range(4)]
+    for index, key in enumerate(keys[:3]):
+        page_cache.put(key, b"x" * ENTRY_SIZE)
+        age(page_cache, key, 1000 + index)
+    # A hit makes the oldest entry the most recently used
+    assert page_cache.get(keys[0]) is not None
+    page_cache.put(keys[3], b"x" * ENTRY_SIZE)
+
+    kept = [key for key in keys if os.path.exists(page_cache._path(key))]
+    # Down to 90% of the limit: the two least recently used entries go
+    assert kept == [keys[0], keys[3]]
+    assert page_cache._size == ENTRY_SIZE * 2
+
+
+def test_oversized_entries_are_not_stored(tmp_path: Path) -> None:
+    page_cache = PageCache(str(tmp_path), max_bytes=ENTRY_SIZE)
+    key = page_cache.make_key(b"source", SETTINGS)
+    page_cache.put(key, b"x" * (ENTRY_SIZE + 1))
+    assert page_cache.get(key) is None
+
+
+def test_size_is_restored_from_disk(tmp_path: Path) -> None:
+    page_cache = PageCache(str(tmp_path))
+    page_cache.put(page_cache.make_key(b"source", SETTINGS), b"x" * ENTRY_SIZE)
+    assert PageCache(str(tmp_path))._size == ENTRY_SIZE
+
+
+def test_counters_are_exact_across_threads(tmp_path: Path) -> None:
+    page_cache = PageCache(str(tmp_path))
+    hit = page_cache.make_key(b"hit", SETTINGS)
+    miss = page_cache.make_key(b"miss", SETTINGS)
+    page_cache.put(hit, b"encoded")
+
+    def lookups() -> None:
+        for _ in range(200):
+            page_cache.get(hit)
+            page_cache.get(miss)
+
+    threads = [threading.Thread(target=lookups) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert (page_cache.hits, page_cache.misses) == (1600, 1600)
@@ -0,0 +1,99 @@
+import json
+import zipfile
+from pathlib import Path
+
+import pytest
+from conftest import MakeCbz
+
+from nanamin import cli
+from nanamin.utils import formats
+
+
+def run_main(capsys: pytest.CaptureFixture[str], *argv: str) -> tuple[int, dict]:
+    """Run the command and parse the JSON summary it prints."""
+    code = cli.main([*argv, "--workers", "2"])
+    return code, json.loads(capsys.readouterr().out)
+
+
+def test_help_does_not_load_pillow_plugins(
+    monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    def fail() -> set[str]:
+        raise AssertionError("Pillow plugins loaded")
+
+    monkeypatch.setattr(formats, "_registered_save_formats", fail)
+    with pytest.raises(SystemExit) as exit_info:
+        cli.parse_args(["--help"])
+    assert exit_info.value.code == 0
+    assert "--format" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize(
+    ("option", "message"),
+    [
+        (["--quality", "0"], "--quality must be between"),
+        (["--jobs", "0"], "--jobs must be at least 1"),
+        (["--target-kb-per-mp", "0"], "--target-kb-per-mp must be at least 1"),
+        (["--min-psnr", "-1"], "--min-psnr must be positive"),
+        (["--format", "gif"], "invalid choice"),
+    ],
+)
+def test_bad_settings_are_usage_errors(
+    option: list[str], message: str, capsys: pytest.CaptureFixture[str]
+) -> None:
+    with pytest.raises(SystemExit) as exit_info:
+        cli.parse_args(["in.cbz", "-o", "out", *option])
+    assert exit_info.value.code == 2
+    assert message in capsys.readouterr().err
+
+
+def test_unencodable_format_is_a_usage_error(
+    monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    monkeypatch.setattr(formats.FORMAT_ENGINES["webp"], "_available", False)
+    with pytest.raises(SystemExit):
+        cli.parse_args(["in.cbz", "-o", "out", "--format", "webp"])
+    assert "not supported by the installed Pillow" in capsys.readouterr().err
+
+
+def test_directories_compress_into_the_output_tree(
+    make_cbz: MakeCbz, tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    make_cbz("in/one.cbz")
+    make_cbz("in/nested/two.cbz")
+    out = tmp_path / "out"
+    code, summary = run_main(capsys, str(tmp_path / "in"), "-o", str(out), "-r")
+    assert code == 0
+    assert summary["totals"]["ok"] == 2
+    for name in ("one.cbz", "nested/two.cbz"):
+        with zipfile.ZipFile(out / name) as zf:
+            assert zf.testzip() is None
+            assert [name for name in zf.namelist() if name.endswith(".jpg")] == [
+                "00.jpg",
+                "01.jpg",
+                "02.jpg",
+            ]
+
+
+def test_colliding_outputs_are_skipped(
+    make_cbz: MakeCbz, tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    first = make_cbz("a/book.cbz")
+    second = make_cbz("b/book.cbz")
+    code, summary = run_main(capsys, str(first), str(second), "-o", str(tmp_path / "out"))
+    statuses = {entry["input"]: entry["status"] for entry in summary["archives"]}
+    assert statuses == {str(first): "ok", str(second): "skipped"}
+    assert code == 1
+
+
+def test_invalid_archives_fail_the_run(
+    make_cbz: MakeCbz, tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    good = make_cbz()
+    junk = tmp_path / "junk.cbz"
+    junk.write_bytes(b"not a zip")
+    code, summary = run_main(capsys, str(good), str(junk), "-o", str(tmp_path / "out"))
+    assert code == 1
+    assert summary["totals"]["ok"] == 1
+    assert summary["totals"]["invalid"] == 1
+    assert not (tmp_path / "out" / "junk.cbz").exists()
@@ -0,0 +1,101 @@
+import io
+
+import pytest
+from conftest import image_bytes
+from PIL import Image, ImageDraw
+
+from nanamin.utils.compressor import encode_page, encoder_settings, is_grayscale
+
+
+def decode(data: bytes) -> Image.Image:
+    """Open an encoded page and load it."""
+    img = Image.open(io.BytesIO(data))
+    img.load()
+    return img
+
+
+def spot(size: tuple[int, int], color: tuple[int, int, int]) -> Image.Image:
+    """A white page with one small square of color."""
+    img = Image.new("RGB", size, (255, 255, 255))
+    ImageDraw.Draw(img).rectangle((10, 10, 50, 50), fill=color)
+    return img
+
+
+@pytest.mark.parametrize(
+    ("img", "expected"),
+    [
+        (Image.new("RGB", (64, 64), (90, 90, 90)), True),
+        (Image.new("RGB", (64, 64), (128, 131, 127)), True),
+        (Image.new("RGB", (64, 64), (200, 40, 40)), False),
+        (spot((64, 64), (30, 30, 30)), True),
+        (spot((64, 64), (255, 0, 0)), False),
+        # A small spot of color survives the downsampling of a large page
+        (spot((2048, 2048), (255, 0, 0)), False),
+    ],
+)
+def test_is_grayscale(img: Image.Image, expected: bool) -> None:
+    assert is_grayscale(img) is expected
+
+
+def test_jpeg_noise_stays_gray() -> None:
+    page = decode(image_bytes((256, 256), (120, 120, 120), "JPEG", quality=30))
+    assert page.mode == "RGB"
+    assert is_grayscale(page)
+
+
+@pytest.mark.parametrize(
+    ("source", "detect", "mode"),
+    [
+        (image_bytes(color=(90, 90, 90)), True, "L"),
+        (image_bytes(color=(90, 90, 90)), False, "RGB"),
+        (image_bytes(color=(200, 40, 40)), True, "RGB"),
+        (image_bytes(mode="1", color=1), True, "L"),
+        (image_bytes(mode="LA", color=(90, 128)), True, "L"),
+        (image_bytes(mode="RGBA", color=(200, 40, 40, 128)), True, "RGB"),
+    ],
+)
+def test_gray_pages_are_encoded_single_channel(source: bytes, detect: bool, mode: str) -> None:
+    assert decode(encode_page(source, "jpeg", 85, detect_grayscale=detect)).mode == mode
+
+
+@pytest.mark.parametrize(
+    ("source", "options", "size"),
+    [
+        # Longest side capped, aspect ratio kept
+        (image_bytes((400, 1000)), {"max_dimension": 500}, (200, 500)),
+        (image_bytes((1000, 400)), {"max_dimension": 500}, (500, 200)),
+        (image_bytes((400, 1000)), {"max_dimension": 1000}, (400, 1000)),
+        # 600 DPI scans brought down to 300 DPI
+        (image_bytes((600, 900), dpi=(600, 600)), {"target_dpi": 300}, (300, 450)),
+        (image_bytes((600, 900)), {"target_dpi": 300}, (600, 900)),
+        (image_bytes((600, 900), dpi=(200, 200)), {"target_dpi": 300}, (600, 900)),
+        # The tighter of the two limits wins
+        (
+            image_bytes((600, 900), dpi=(600, 600)),
+            {"max_dimension": 300, "target_dpi": 300},
+            (200, 300),
+        ),
+        # JPEG sources decode at a reduced scale first
+        (image_bytes((1600, 2400), image_format="JPEG"), {"max_dimension": 300}, (200, 300)),
+        # Palette and bilevel pages are resized in a resizable mode
+        (image_bytes((400, 1000), mode="P", color=3), {"max_dimension": 500}, (200, 500)),
+        (image_bytes((400, 1000), mode="1", color=1), {"max_dimension": 500}, (200, 500)),
+    ],
+)
+def test_oversized_pages_are_downscaled(
+    source: bytes, options: dict[str, int], size: tuple[int, int]
+) -> None:
+    assert decode(encode_page(source, "jpeg", 85, **options)).size == size
+
+
+def test_downscaling_is_part_of_the_settings() -> None:
+    plain = encoder_settings("jpeg", 85)
+    assert encoder_settings("jpeg", 85, max_dimension=2000) != plain
+    assert encoder_settings("jpeg", 85, target_dpi=300) != plain
+    assert encoder_settings("jpeg", 85, max_dimension=2000) != encoder_settings(
+        "jpeg", 85, max_dimension=1600
+    )
+
+
+def test_grayscale_detection_is_part_of_the_settings() -> None:
+    assert encoder_settings("jpeg", 85, detect_grayscale=True) != encoder_settings("jpeg", 85)
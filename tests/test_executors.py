@@ -0,0 +1,88 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any
+
+import pytest
+
+from nanamin.utils.executors import (
+    EXECUTOR_BACKENDS,
+    HybridExecutor,
+    create_executor,
+)
+
+
+class RecordingPool:
+    """Stand-in pool that remembers which payloads it was given."""
+
+    def __init__(self) -> None:
+        self.payloads: list[Any] = []
+
+    def submit(self, fn: Any, *args: Any, **kwargs: Any) -> Future[Any]:
+        self.payloads.append(args[0] if args else None)
+        future: Future[Any] = Future()
+        future.set_result(fn(*args, **kwargs))
+        return future
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        pass
+
+
+@pytest.fixture
+def hybrid() -> tuple[HybridExecutor, RecordingPool, RecordingPool]:
+    """A hybrid executor whose pools record their submissions."""
+    executor = HybridExecutor(2, threshold=100)
+    executor.shutdown()
+    processes, threads = RecordingPool(), RecordingPool()
+    executor._processes = processes
+    executor._threads = threads
+    return executor, processes, threads
+
+
+def test_hybrid_routes_by_payload_size(
+    hybrid: tuple[HybridExecutor, RecordingPool, RecordingPool],
+) -> None:
+    executor, processes, threads = hybrid
+    small, large = b"x" * 99, b"x" * 100
+    view = memoryview(b"y" * 500)
+    assert executor.submit(len, small).result() == 99
+    assert executor.submit(len, large).result() == 100
+    assert executor.submit(len, view).result() == 500
+    # Anything that is not a payload stays on the threads
+    assert executor.submit(sum, [1, 2]).result() == 3
+    assert processes.payloads == [large, view]
+    assert threads.payloads == [small, [1, 2]]
+
+
+@pytest.mark.parametrize(("workers", "threads", "processes"), [(1, 1, 1), (4, 1, 3), (8, 2, 6)])
+def test_hybrid_splits_the_worker_budget(workers: int, threads: int, processes: int) -> None:
+    executor = HybridExecutor(workers)
+    try:
+        assert executor._threads._max_workers == threads
+        assert executor._processes._max_workers == processes
+    finally:
+        executor.shutdown()
+
+
+@pytest.mark.parametrize("backend", EXECUTOR_BACKENDS)
+def test_backends_encode_memoryviews(backend: str) -> None:
+    executor = create_executor(backend, 2)
+    try:
+        # Pages read from a mapped archive arrive as memoryviews
+        payload = memoryview(b"z" * (1024 * 1024))
+        assert executor.submit(len, payload).result() == len(payload)
+        assert list(executor.map(len, [b"a", b"bc"])) == [1, 2]
+    finally:
+        executor.shutdown()
+
+
+def test_unknown_backend_is_rejected() -> None:
+    with pytest.raises(ValueError, match="Unknown executor backend"):
+        create_executor("gpu", 2)
+
+
+def test_thread_backend_is_a_thread_pool() -> None:
+    executor = create_executor("thread", 3)
+    try:
+        assert isinstance(executor, ThreadPoolExecutor)
+        assert executor._max_workers == 3
+    finally:
+        executor.shutdown()
@@ -0,0 +1,158 @@
+import struct
+import zipfile
+from pathlib import Path
+
+import pytest
+from conftest import MakeCbz, compress, image_bytes
+
+from nanamin.utils.archive import MANIFEST_NAME, ArchiveReader
+
+# Constants
+METADATA = b"<ComicInfo><Title>Test</Title></ComicInfo>" * 20
+
+
+def corrupt_member(path: Path, name: str) -> None:
+    """Flip one byte in the middle of a STORED member's payload."""
+    with zipfile.ZipFile(path) as zf:
+        info = zf.getinfo(name)
+    data = bytearray(path.read_bytes())
+    name_length, extra_length = struct.unpack_from("<HH", data, info.header_offset + 26)
+    data[info.header_offset + 30 + name_length + extra_length + info.compress_size // 2] ^= 0xFF
+    path.write_bytes(bytes(data))
+
+
+@pytest.fixture
+def corrupted(make_cbz: MakeCbz) -> Path:
+    """A STORED archive whose second JPEG page has a flipped byte."""
+    pages = {f"{index:02d}.jpg": image_bytes(image_format="JPEG") for index in range(3)}
+    path = make_cbz(members=pages, compression=zipfile.ZIP_STORED)
+    corrupt_member(path, "01.jpg")
+    return path
+
+
+def test_reader_checks_stored_members(corrupted: Path) -> None:
+    with zipfile.ZipFile(corrupted) as zf:
+        reader = ArchiveReader(str(corrupted), zf)
+        try:
+            assert bytes(reader.read(zf.getinfo("00.jpg"))) == zf.read("00.jpg")
+            with pytest.raises(zipfile.BadZipFile, match=r"Bad CRC-32 for file '01\.jpg'"):
+                reader.read(zf.getinfo("01.jpg"))
+        finally:
+            reader.close()
+
+
+def test_corrupted_stored_page_fails_the_archive(corrupted: Path, tmp_path: Path) -> None:
+    output = tmp_path / "out.cbz"
+    with pytest.raises(RuntimeError, match=r"Bad CRC-32 for file '01\.jpg'"):
+        compress(corrupted, output, incremental=False)
+    assert not output.exists()
+
+
+def test_corrupted_stored_page_can_be_skipped(corrupted: Path, tmp_path: Path) -> None:
+    output = tmp_path / "out.cbz"
+    job = compress(corrupted, output, incremental=False, bad_pages="skip")
+    assert [failure.member for failure in job.failures] == ["01.jpg"]
+    with zipfile.ZipFile(output) as zf:
+        assert zf.namelist() == ["00.jpg", "02.jpg", MANIFEST_NAME]
+
+
+def test_bad_pages_are_quarantined(make_cbz: MakeCbz, tmp_path: Path) -> None:
+    members = {
+        "00.jpg": image_bytes(image_format="JPEG"),
+        "01.jpg": image_bytes(image_format="JPEG"),
+        "sub/../../02.png": b"not an image",
+    }
+    source = make_cbz(members=members, compression=zipfile.ZIP_STORED)
+    corrupt_member(source, "01.jpg")
+    output = tmp_path / "out.cbz"
+    job = compress(source, output, incremental=False, bad_pages="quarantine")
+
+    assert {failure.member for failure in job.failures} == {"01.jpg", "sub/../../02.png"}
+    quarantine = Path(job.quarantine_path)
+    # Members are saved as stored in the input; their names never leave the directory
+    saved = sorted(path.relative_to(quarantine).as_posix() for path in quarantine.rglob("*.*"))
+    assert saved == ["01.jpg", "sub/02.png"]
+    assert (quarantine / "sub" / "02.png").read_bytes() == b"not an image"
+    # The damaged page is kept as it is in the input, flipped byte included
+    damaged = (quarantine / "01.jpg").read_bytes()
+    assert sum(a != b for a, b in zip(damaged, members["01.jpg"], strict=True)) == 1
+    with zipfile.ZipFile(output) as zf:
+        assert zf.namelist() == ["00.jpg", MANIFEST_NAME]
+
+
+def test_passthrough_members_are_copied_in_place(make_cbz: MakeCbz, tmp_path: Path) -> None:
+    members = {
+        "ComicInfo.xml": METADATA,
+        "chapter/": b"",
+        "chapter/00.png": image_bytes(),
+        "chapter/cover.webp": image_bytes(image_format="WEBP"),
+        "chapter/01.png": image_bytes(),
+    }
+    source = make_cbz(members=members)
+    output = tmp_path / "out.cbz"
+    job = compress(source, output, incremental=False)
+    assert job.pages == ["chapter/00.png", "chapter/01.png"]
+    assert all(
+        job.is_passthrough(name) for name in ("ComicInfo.xml", "chapter/", "chapter/cover.webp")
+    )
+
+    with zipfile.ZipFile(source) as zin, zipfile.ZipFile(output) as zf:
+        assert zf.testzip() is None
+        assert zf.namelist() == [
+            "ComicInfo.xml",
+            "chapter/",
+            "chapter/00.jpg",
+            "chapter/cover.webp",
+            "chapter/01.jpg",
+            MANIFEST_NAME,
+        ]
+        for name in ("ComicInfo.xml", "chapter/", "chapter/cover.webp"):
+            copied, original = zf.getinfo(name), zin.getinfo(name)
+            assert (copied.CRC, copied.compress_type, copied.compress_size) == (
+                original.CRC,
+                original.compress_type,
+                original.compress_size,
+            )
+            assert zf.read(name) == members[name]
+        assert zf.getinfo("chapter/").is_dir()
+
+
+def test_renamed_pages_never_overwrite_other_members(make_cbz: MakeCbz, tmp_path: Path) -> None:
+    members = {
+        "01.png": image_bytes(color=(10, 10, 10)),
+        "01.jpg": image_bytes(image_format="JPEG"),
+        "02.png": image_bytes(color=(20, 20, 20)),
+        "02.JPEG": image_bytes(image_format="JPEG"),
+        "02_1.jpg": image_bytes(image_format="JPEG"),
+        "03.png": image_bytes(),
+        "03.webp": image_bytes(image_format="WEBP"),
+    }
+    output = tmp_path / "out.cbz"
+    compress(make_cbz(members=members), output, incremental=False)
+
+    with zipfile.ZipFile(output) as zf:
+        names = zf.namelist()
+        # Members that keep their names win; the renamed page takes a suffix
+        assert names == [
+            "01_1.jpg",
+            "01.jpg",
+            "02.jpg",
+            "02.JPEG",
+            "02_1.jpg",
+            "03.jpg",
+            "03.webp",
+            MANIFEST_NAME,
+        ]
+        assert len(set(names)) == len(names)
+        assert zf.read("03.webp") == members["03.webp"]
+
+
+def test_renamed_pages_never_overwrite_passthrough_members(
+    make_cbz: MakeCbz, tmp_path: Path
+) -> None:
+    members = {"01.png": image_bytes(), "01.webp": image_bytes(image_format="WEBP")}
+    output = tmp_path / "out.cbz"
+    compress(make_cbz(members=members), output, "webp", incremental=False)
+    with zipfile.ZipFile(output) as zf:
+        assert zf.namelist() == ["01_1.webp", "01.webp", MANIFEST_NAME]
+        assert zf.read("01.webp") == members["01.webp"]
@@ -0,0 +1,81 @@
+import json
+import zipfile
+from pathlib import Path
+from typing import Any
+
+import pytest
+from conftest import MakeCbz, compress, image_bytes
+
+from nanamin.utils.archive import MANIFEST_NAME
+
+
+def read_manifest(path: Path) -> dict[str, Any]:
+    """Load the manifest of an output archive."""
+    with zipfile.ZipFile(path) as zf:
+        manifest: dict[str, Any] = json.loads(zf.read(MANIFEST_NAME))
+    return manifest
+
+
+@pytest.fixture
+def book(make_cbz: MakeCbz) -> Path:
+    """Three pages and a metadata member."""
+    pages = {f"{index:02d}.png": image_bytes(color=(index * 80, 40, 40)) for index in range(3)}
+    return make_cbz(members={**pages, "ComicInfo.xml": b"<ComicInfo/>"})
+
+
+def test_manifest_records_pages_settings_and_storage(book: Path, tmp_path: Path) -> None:
+    output = tmp_path / "out.cbz"
+    compress(book, output, storage="stored")
+    manifest = read_manifest(output)
+    assert manifest["storage"] == "stored"
+    assert manifest["settings"]
+    assert manifest["pages"]["01.png"]["output"] == "01.jpg"
+    assert manifest["pages"]["ComicInfo.xml"]["output"] == "ComicInfo.xml"
+    with zipfile.ZipFile(output) as zf:
+        assert zf.namelist() == ["00.jpg", "01.jpg", "02.jpg", "ComicInfo.xml", MANIFEST_NAME]
+
+
+def test_unchanged_archive_is_up_to_date(book: Path, tmp_path: Path) -> None:
+    output = tmp_path / "out.cbz"
+    assert not compress(book, output).up_to_date
+    written = output.stat().st_mtime_ns
+    assert compress(book, output).up_to_date
+    assert output.stat().st_mtime_ns == written
+
+
+def test_optimized_input_is_up_to_date(book: Path, tmp_path: Path) -> None:
+    first = tmp_path / "first.cbz"
+    compress(book, first)
+    second = tmp_path / "second.cbz"
+    assert compress(first, second).up_to_date
+    assert second.read_bytes() == first.read_bytes()
+
+
+def test_changed_page_is_encoded_again(book: Path, make_cbz: MakeCbz, tmp_path: Path) -> None:
+    output = tmp_path / "out.cbz"
+    compress(book, output)
+    with zipfile.ZipFile(book) as zf:
+        members = {name: zf.read(name) for name in zf.namelist()}
+    members["01.png"] = image_bytes(color=(10, 200, 10))
+    make_cbz(book.name, members)
+
+    job = compress(book, output)
+    assert not job.up_to_date
+    assert job.reused == 2
+    with zipfile.ZipFile(output) as zf:
+        assert zf.testzip() is None
+
+
+@pytest.mark.parametrize(
+    "change", [{"quality": 60}, {"storage": "deflated"}, {"detect_grayscale": False}]
+)
+def test_new_settings_invalidate_the_output(
+    book: Path, tmp_path: Path, change: dict[str, Any]
+) -> None:
+    output = tmp_path / "out.cbz"
+    compress(book, output, storage="stored")
+    job = compress(book, output, **{"storage": "stored", **change})
+    assert not job.up_to_date
+    with zipfile.ZipFile(output) as zf:
+        types = {info.compress_type for info in zf.infolist() if info.filename.endswith(".jpg")}
+    assert types == {zipfile.ZIP_DEFLATED if "storage" in change else zipfile.ZIP_STORED}
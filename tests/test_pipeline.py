@@ -0,0 +1,168 @@
+import threading
+import time
+from collections.abc import Generator
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from nanamin.utils.cancellation import CancellationToken, CompressionCancelledError
+from nanamin.utils.pipeline import Encoded, PageData, stream_pages
+
+# Constants
+PAGE_COUNT = 24
+PAGE_SIZE = 100
+TIMEOUT = 5.0
+
+
+def make_pages(count: int = PAGE_COUNT) -> list[tuple[int, bytes]]:
+    """Numbered pages whose bytes start with their number."""
+    return [(index, bytes([index]) * PAGE_SIZE) for index in range(count)]
+
+
+def reverse_delay(data: PageData) -> bytes:
+    """Encode early pages slowest, so results finish out of order."""
+    time.sleep((PAGE_COUNT - data[0]) * 0.001)
+    return bytes(data[:1])
+
+
+def wait_until_stable(read: list[int]) -> None:
+    """Wait until the pipeline has stopped reading pages."""
+    seen = -1
+    while seen != len(read):
+        seen = len(read)
+        time.sleep(0.1)
+
+
+def test_results_keep_the_input_order() -> None:
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(stream_pages(executor, make_pages(), reverse_delay, max_pages=4))
+    assert results == [(index, bytes([index])) for index in range(PAGE_COUNT)]
+
+
+def test_encoded_pages_bypass_the_encoder() -> None:
+    pages = [(0, Encoded(b"kept")), (1, b"\x01" * PAGE_SIZE)]
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = list(stream_pages(executor, pages, lambda data: bytes(data[:1]), max_pages=2))
+    assert results == [(0, b"kept"), (1, b"\x01")]
+
+
+def test_encoding_is_bounded_by_max_pages() -> None:
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def encode(data: PageData) -> bytes:
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.005)
+        with lock:
+            active -= 1
+        return bytes(data[:1])
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(stream_pages(executor, make_pages(), encode, max_pages=3))
+    assert len(results) == PAGE_COUNT
+    assert peak <= 3
+
+
+def test_reading_is_bounded_by_max_bytes() -> None:
+    yielded = 0
+    window: list[int] = []
+
+    def pages() -> Generator[tuple[int, bytes], None, None]:
+        for key, data in make_pages():
+            # Pages read but not yet handed to the consumer
+            window.append(key + 1 - yielded)
+            yield key, data
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        for _ in stream_pages(
+            executor, pages(), reverse_delay, max_pages=8, max_bytes=PAGE_SIZE * 2
+        ):
+            yielded += 1
+    assert yielded == PAGE_COUNT
+    # The page just read waits outside the window until two fit again
+    assert max(window) <= 3
+
+
+def test_slow_head_page_fills_the_reorder_buffer_then_pauses() -> None:
+    release = threading.Event()
+    read: list[int] = []
+    results: list[tuple[int, bytes]] = []
+
+    def pages() -> Generator[tuple[int, bytes], None, None]:
+        for key, data in make_pages():
+            read.append(key)
+            yield key, data
+
+    def encode(data: PageData) -> bytes:
+        if data[0] == 0:
+            release.wait(TIMEOUT)
+        return bytes(data[:1])
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        consumer = threading.Thread(
+            target=lambda: results.extend(
+                stream_pages(executor, pages(), encode, max_pages=4, max_reorder=5)
+            )
+        )
+        consumer.start()
+        wait_until_stable(read)
+        # Reading stops once five finished pages wait behind the stalled head
+        # (plus the page read that waits for room); pages still encoding at
+        # the last check can overshoot that, but never past both bounds
+        assert 7 <= len(read) <= 4 + 5
+        assert not results
+        release.set()
+        consumer.join(TIMEOUT)
+
+    assert [key for key, _ in results] == list(range(PAGE_COUNT))
+
+
+def test_failed_pages_go_to_the_error_handler() -> None:
+    failed: list[int] = []
+
+    def encode(data: PageData) -> bytes:
+        if data[0] % 5 == 0:
+            raise ValueError("bad page")
+        return bytes(data[:1])
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = stream_pages(
+            executor,
+            make_pages(),
+            encode,
+            max_pages=4,
+            on_error=lambda key, error: failed.append(key),
+        )
+        keys = [key for key, _ in results]
+    assert failed == [0, 5, 10, 15, 20]
+    assert keys == [index for index in range(PAGE_COUNT) if index % 5]
+
+
+def test_failed_page_raises_without_an_error_handler() -> None:
+    def encode(data: PageData) -> bytes:
+        raise ValueError("bad page")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        with pytest.raises(RuntimeError, match="Error processing 0"):
+            list(stream_pages(executor, make_pages(), encode, max_pages=2))
+
+
+def test_cancel_stops_reading() -> None:
+    token = CancellationToken()
+    read: list[int] = []
+
+    def pages() -> Generator[tuple[int, bytes], None, None]:
+        for key, data in make_pages():
+            read.append(key)
+            if key == 3:
+                token.cancel()
+            yield key, data
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        with pytest.raises(CompressionCancelledError):
+            list(stream_pages(executor, pages(), reverse_delay, max_pages=2, cancel_token=token))
+    assert len(read) == 4
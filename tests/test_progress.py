@@ -0,0 +1,52 @@
+import types
+
+import pytest
+
+from nanamin.utils import progress
+from nanamin.utils.batch import BatchProgress
+from nanamin.utils.progress import ProgressAggregator, ProgressSnapshot
+
+
+def run(schedule: list[float], monkeypatch: pytest.MonkeyPatch) -> list[tuple[float, float]]:
+    """Feed one page per schedule step (seconds after the last) on a fake clock.
+
+    Returns:
+        (clock, displayed pages per second) of every snapshot
+    """
+    clock = [0.0]
+    monkeypatch.setattr(progress, "time", types.SimpleNamespace(monotonic=lambda: clock[0]))
+    shown: list[tuple[float, float]] = []
+
+    def emit(snapshot: ProgressSnapshot) -> None:
+        shown.append((clock[0], snapshot.pages_per_second))
+
+    aggregator = ProgressAggregator(emit)
+    for done, step in enumerate(schedule, 1):
+        clock[0] += step
+        aggregator.update(
+            BatchProgress(0, "a.cbz", len(schedule), done, len(schedule), done, "p", 0)
+        )
+    aggregator.flush()
+    return shown
+
+
+def test_rate_ignores_start_up(monkeypatch: pytest.MonkeyPatch) -> None:
+    shown = run([2.0] + [1 / 55] * 100, monkeypatch)
+    assert shown[0][1] == 0.0  # The first page only starts the clock
+    assert all(rate == pytest.approx(55, rel=0.05) for _, rate in shown[1:])
+
+
+def test_rate_recovers_from_an_initial_burst(monkeypatch: pytest.MonkeyPatch) -> None:
+    shown = run([0.5] + [0.0] * 10 + [1 / 46] * 460, monkeypatch)
+    assert next(rate for at, rate in shown if at >= 2.0) == pytest.approx(46, rel=0.15)
+
+
+def test_rate_follows_a_slowdown(monkeypatch: pytest.MonkeyPatch) -> None:
+    shown = run([1 / 55] * 550 + [1 / 20] * 300, monkeypatch)
+    assert shown[-1][1] == pytest.approx(20, rel=0.15)
+
+
+def test_frames_are_coalesced(monkeypatch: pytest.MonkeyPatch) -> None:
+    shown = run([0.001] * 1000, monkeypatch)
+    # One second of pages at 10 frames per second, plus the final flush
+    assert len(shown) <= 12
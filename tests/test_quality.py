@@ -0,0 +1,114 @@
+import io
+from typing import Any
+
+import pytest
+from PIL import Image, ImageDraw
+
+from nanamin.utils.quality import MAX_PSNR, QualityTarget, psnr, search_quality
+
+# Constants
+BYTES_PER_QUALITY = 100
+MEGAPIXEL = (1000, 1000)
+
+
+class SizedSaver:
+    """Fake encoder whose output grows linearly with quality."""
+
+    def __init__(self) -> None:
+        self.trials: list[int] = []
+
+    def __call__(self, img: Image.Image, quality: int) -> bytes:
+        self.trials.append(quality)
+        return bytes(quality * BYTES_PER_QUALITY)
+
+
+def save_jpeg(img: Image.Image, quality: int) -> bytes:
+    """Encode a real JPEG."""
+    buffer = io.BytesIO()
+    img.save(buffer, "JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def detailed_page() -> Image.Image:
+    """A luma page with edges for JPEG to smear."""
+    img = Image.linear_gradient("L").resize((256, 256))
+    draw = ImageDraw.Draw(img)
+    for offset in range(0, 256, 16):
+        draw.line((offset, 0, 255 - offset, 255), fill=255 - offset)
+    return img
+
+
+def test_page_that_fits_costs_one_encode() -> None:
+    save = SizedSaver()
+    target = QualityTarget(bytes_per_megapixel=100 * BYTES_PER_QUALITY)
+    data, quality = search_quality(Image.new("L", MEGAPIXEL), save, 85, target)
+    assert (quality, save.trials) == (85, [85])
+    assert len(data) == 85 * BYTES_PER_QUALITY
+
+
+def test_size_budget_finds_the_highest_fitting_quality() -> None:
+    save = SizedSaver()
+    target = QualityTarget(bytes_per_megapixel=61 * BYTES_PER_QUALITY, max_trials=10, tolerance=0)
+    data, quality = search_quality(Image.new("L", MEGAPIXEL), save, 90, target)
+    assert quality == 61
+    assert len(data) == 61 * BYTES_PER_QUALITY
+    assert len(save.trials) <= 10
+
+
+def test_search_stops_within_the_tolerance() -> None:
+    save = SizedSaver()
+    target = QualityTarget(bytes_per_megapixel=61 * BYTES_PER_QUALITY, max_trials=10, tolerance=4)
+    _, quality = search_quality(Image.new("L", MEGAPIXEL), save, 90, target)
+    assert 61 - 4 <= quality <= 61
+
+
+def test_search_is_bounded_by_max_trials() -> None:
+    save = SizedSaver()
+    target = QualityTarget(bytes_per_megapixel=61 * BYTES_PER_QUALITY, max_trials=3, tolerance=0)
+    _, quality = search_quality(Image.new("L", MEGAPIXEL), save, 90, target)
+    assert len(save.trials) == 3
+    assert quality <= 61
+
+
+def test_unreachable_budget_falls_back_to_the_minimum_quality() -> None:
+    save = SizedSaver()
+    target = QualityTarget(bytes_per_megapixel=1, min_quality=30, max_trials=20)
+    data, quality = search_quality(Image.new("L", MEGAPIXEL), save, 90, target)
+    assert quality == 30
+    assert len(data) == 30 * BYTES_PER_QUALITY
+
+
+@pytest.mark.parametrize("floor", [30.0, 38.0])
+def test_psnr_floor_finds_the_lowest_passing_quality(floor: float) -> None:
+    img = detailed_page()
+    target = QualityTarget(min_psnr=floor, min_quality=10, max_trials=10, tolerance=0)
+    data, quality = search_quality(img, save_jpeg, 95, target)
+    with Image.open(io.BytesIO(data)) as decoded:
+        assert psnr(img, decoded.convert("L")) >= floor
+    if quality > 10:
+        with Image.open(io.BytesIO(save_jpeg(img, quality - 1))) as decoded:
+            assert psnr(img, decoded.convert("L")) < floor
+
+
+def test_unreachable_floor_falls_back_to_the_maximum_quality() -> None:
+    target = QualityTarget(min_psnr=MAX_PSNR, max_trials=3)
+    _, quality = search_quality(detailed_page(), save_jpeg, 90, target)
+    assert quality == 90
+
+
+def test_psnr() -> None:
+    img = detailed_page()
+    assert psnr(img, img.copy()) == MAX_PSNR
+    # Every pixel off by one level: 10 * log10(255^2)
+    assert psnr(Image.new("L", (8, 8), 100), Image.new("L", (8, 8), 101)) == pytest.approx(
+        48.13, abs=0.01
+    )
+
+
+@pytest.mark.parametrize(
+    "options",
+    [{}, {"bytes_per_megapixel": 1000, "min_psnr": 40.0}, {"min_psnr": 40.0, "max_trials": 0}],
+)
+def test_target_rejects_bad_settings(options: dict[str, Any]) -> None:
+    with pytest.raises(ValueError):
+        QualityTarget(**options)
@@ -0,0 +1,128 @@
+import asyncio
+import zipfile
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+from typing import Any
+
+import pytest
+from conftest import MakeCbz
+
+from nanamin.service import CompressionService, RequestError, _read_request
+
+# Constants
+TIMEOUT = 10.0
+
+
+def run(test: Callable[[CompressionService], Awaitable[None]], start: bool = False) -> None:
+    """Run an async test against a service; unstarted services only queue jobs."""
+
+    async def main() -> None:
+        service = CompressionService(backend="thread", max_workers=2)
+        if start:
+            await service.start()
+        try:
+            await test(service)
+        finally:
+            await service.stop()
+
+    asyncio.run(main())
+
+
+async def rejected(service: CompressionService, request: dict[str, Any]) -> int:
+    """Submit a request that must fail and return its HTTP status."""
+    with pytest.raises(RequestError) as error_info:
+        await service.submit(request)
+    return error_info.value.status
+
+
+def test_jobs_writing_the_same_files_are_refused(make_cbz: MakeCbz, tmp_path: Path) -> None:
+    first, second = str(make_cbz("first.cbz")), str(make_cbz("second.cbz"))
+    # Left over from an earlier run, so it is a valid input too
+    output = str(make_cbz("out/book.cbz"))
+
+    async def test(service: CompressionService) -> None:
+        job = await service.submit({"input": first, "output": output})
+        # Same output, also spelled differently
+        assert await rejected(service, {"input": second, "output": output}) == 409
+        spelled = str(tmp_path / "out" / ".." / "out" / "book.cbz")
+        assert await rejected(service, {"input": second, "output": spelled}) == 409
+        # Writing over the input of a queued job, or reading its output
+        assert await rejected(service, {"input": second, "output": first}) == 409
+        assert await rejected(service, {"input": output, "output": str(tmp_path / "x.cbz")}) == 409
+        # Finished jobs no longer hold their files
+        service.cancel(job.id)
+        assert (await service.submit({"input": second, "output": output})).status == "queued"
+
+    run(test)
+
+
+@pytest.mark.parametrize(
+    "request_body",
+    [
+        {},
+        {"settings": {"quality": 0}},
+        {"settings": {"quality": True}},
+        {"settings": {"format": "gif"}},
+        {"settings": {"storage": "store"}},
+        {"settings": {"unknown": 1}},
+        {"priority": "high"},
+    ],
+)
+def test_invalid_requests_are_refused(
+    make_cbz: MakeCbz, tmp_path: Path, request_body: dict[str, Any]
+) -> None:
+    book = str(make_cbz())
+
+    async def test(service: CompressionService) -> None:
+        request = {"output": str(tmp_path / "out.cbz"), **request_body}
+        if request_body:
+            request["input"] = book
+        assert await rejected(service, request) == 400
+        assert await rejected(service, {"input": book, "output": book}) == 400
+        assert not service.jobs
+
+    run(test)
+
+
+def test_jobs_run_and_publish_events(make_cbz: MakeCbz, tmp_path: Path) -> None:
+    book = str(make_cbz())
+    output = tmp_path / "out.cbz"
+
+    async def test(service: CompressionService) -> None:
+        events = service.subscribe()
+        job = await service.submit({"input": book, "output": str(output)})
+        seen = []
+        while not seen or seen[-1]["status"] not in ("done", "failed"):
+            seen.append(await asyncio.wait_for(events.get(), TIMEOUT))
+        assert [event["event"] for event in seen if event["event"] != "progress"] == [
+            "queued",
+            "started",
+            "done",
+        ]
+        assert job.pages_done == job.pages_total == 3
+        assert job.compressed_bytes == output.stat().st_size
+
+    run(test, start=True)
+    with zipfile.ZipFile(output) as zf:
+        assert zf.testzip() is None
+
+
+@pytest.mark.parametrize(
+    ("headers", "status"),
+    [
+        ("Host: evil.example\r\n", 403),
+        ("Host: localhost:8765\r\nOrigin: http://evil.example\r\n", 403),
+        ("Host: localhost:8765\r\nContent-Length: -1\r\n", 400),
+        ("Host: localhost:8765\r\nContent-Length: 2\r\n\r\n[]", 400),
+    ],
+)
+def test_browser_and_malformed_requests_are_refused(headers: str, status: int) -> None:
+    async def read() -> None:
+        reader = asyncio.StreamReader()
+        reader.feed_data(f"POST /jobs HTTP/1.1\r\n{headers}\r\n".encode())
+        reader.feed_eof()
+        with pytest.raises(RequestError) as error_info:
+            await _read_request(reader)
+        assert error_info.value.status == status
+
+    asyncio.run(read())
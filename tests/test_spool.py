@@ -0,0 +1,120 @@
+import os
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from nanamin.utils.archive import ArchiveJob
+from nanamin.utils.pipeline import Encoded
+from nanamin.utils.spool import SPOOL_SUFFIX, PageSpool
+
+# Constants
+SETTINGS = ["webp", 85]
+PAGES = {f"{number:02d}.png": os.urandom(100 + number) for number in range(4)}
+
+
+@pytest.fixture
+def journal(tmp_path: Path) -> str:
+    """A journal holding every page of PAGES, closed as if the run was interrupted."""
+    path = str(tmp_path / "out.cbz.spool")
+    spool = PageSpool(path, SETTINGS)
+    for name, data in PAGES.items():
+        spool.append(name, f"fp-{name}", data)
+    spool.close()
+    return path
+
+
+def test_spool_reloads_its_records(journal: str) -> None:
+    spool = PageSpool(journal, SETTINGS)
+    assert len(spool) == len(PAGES)
+    for name, data in PAGES.items():
+        assert spool.get(name, f"fp-{name}") == data
+    # A changed source page is not taken from the journal
+    assert spool.get("00.png", "changed") is None
+
+
+def test_spool_is_bound_to_the_settings(journal: str) -> None:
+    spool = PageSpool(journal, ["webp", 90])
+    assert len(spool) == 0
+    spool.append("00.png", "fp-00.png", b"new")
+    spool.close()
+    assert len(PageSpool(journal, SETTINGS)) == 0
+    assert PageSpool(journal, ["webp", 90]).get("00.png", "fp-00.png") == b"new"
+
+
+@pytest.mark.parametrize("cut", [1, 4, 50])
+def test_spool_drops_a_torn_last_record(journal: str, cut: int) -> None:
+    with open(journal, "r+b") as f:
+        f.truncate(os.path.getsize(journal) - cut)
+
+    spool = PageSpool(journal, SETTINGS)
+    assert len(spool) == len(PAGES) - 1
+    assert spool.get("03.png", "fp-03.png") is None
+
+    # Appending continues after the last good record, over the torn bytes
+    spool.append("03.png", "fp-03.png", PAGES["03.png"])
+    spool.close()
+    spool = PageSpool(journal, SETTINGS)
+    assert len(spool) == len(PAGES)
+    assert spool.get("03.png", "fp-03.png") == PAGES["03.png"]
+
+
+def test_spool_stops_at_a_corrupt_record(journal: str) -> None:
+    with open(journal, "rb") as f:
+        content = f.read()
+    offset = content.index(PAGES["01.png"])
+    with open(journal, "r+b") as f:
+        f.seek(offset)
+        f.write(bytes([content[offset] ^ 0xFF]))
+
+    spool = PageSpool(journal, SETTINGS)
+    assert len(spool) == 1
+    assert spool.get("00.png", "fp-00.png") == PAGES["00.png"]
+
+
+def test_spool_discard_removes_the_journal(journal: str) -> None:
+    spool = PageSpool(journal, SETTINGS)
+    spool.discard()
+    assert not os.path.exists(journal)
+    assert len(spool) == 0
+
+
+def test_archive_job_resumes_from_the_journal(tmp_path: Path) -> None:
+    input_path = tmp_path / "in.cbz"
+    output_path = tmp_path / "out.cbz"
+    with zipfile.ZipFile(input_path, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("ComicInfo.xml", b"<ComicInfo/>")
+        for name, data in PAGES.items():
+            zf.writestr(name, data)
+
+    def encode(data: bytes) -> bytes:
+        return b"encoded:" + bytes(data)
+
+    # The first run is interrupted after two pages
+    job = ArchiveJob(str(input_path), str(output_path), ("webp",), lambda name: name, resume=True)
+    written = 0
+    for name, data in job.iter_pages():
+        job.write(name, data if isinstance(data, Encoded) else encode(data))
+        written += not isinstance(data, Encoded)
+        if written == 2:
+            break
+    job.abort()
+    assert not os.path.exists(job.partial_path)
+    assert os.path.exists(str(output_path) + SPOOL_SUFFIX)
+
+    job = ArchiveJob(str(input_path), str(output_path), ("webp",), lambda name: name, resume=True)
+    encoded = []
+    for name, data in job.iter_pages():
+        if not isinstance(data, Encoded):
+            encoded.append(name)
+            data = encode(data)
+        job.write(name, data)
+    job.finish()
+
+    assert job.resumed == 2
+    assert encoded == list(PAGES)[2:]
+    assert not os.path.exists(str(output_path) + SPOOL_SUFFIX)
+    with zipfile.ZipFile(output_path) as zf:
+        assert zf.testzip() is None
+        for name, data in PAGES.items():
+            assert zf.read(name) == encode(data)
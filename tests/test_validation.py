@@ -0,0 +1,96 @@
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+from conftest import MakeCbz, image_bytes, truncated
+
+from nanamin.utils.compressor import CBZCompressor
+from nanamin.utils.validation import check_member, validate_archive
+
+
+def check(filename: str, data: bytes, crc: int | None = None) -> str:
+    """Check a member as it would be stored uncompressed."""
+    expected = zlib.crc32(data) if crc is None else crc
+    return check_member(filename, zipfile.ZIP_STORED, expected, len(data), data)
+
+
+@pytest.mark.parametrize(
+    ("filename", "data"),
+    [
+        ("01.png", image_bytes()),
+        ("01.jpg", image_bytes(image_format="JPEG")),
+        ("01.webp", image_bytes(image_format="WEBP")),
+        ("ComicInfo.xml", b"<ComicInfo/>"),
+        ("notes.txt", b"not an image"),
+    ],
+)
+def test_sound_members_pass(filename: str, data: bytes) -> None:
+    assert check(filename, data) == ""
+
+
+@pytest.mark.parametrize(
+    ("filename", "data"),
+    [
+        ("01.png", truncated(image_bytes())),
+        ("01.jpg", truncated(image_bytes(size=(256, 256), image_format="JPEG"))),
+    ],
+)
+def test_damaged_images_fail(filename: str, data: bytes) -> None:
+    assert check(filename, data).startswith("Bad image: ")
+
+
+def test_unrecognized_images_name_no_stream() -> None:
+    error = check("01.png", b"not an image")
+    assert error == "Bad image: not a recognized image format"
+
+
+def test_crc_and_size_mismatches_fail() -> None:
+    data = image_bytes()
+    assert check("01.png", data, crc=zlib.crc32(data) ^ 1) == "Bad CRC-32"
+    error = check_member("01.png", zipfile.ZIP_STORED, zlib.crc32(data), len(data) + 1, data)
+    assert error.startswith("Size mismatch")
+
+
+def test_bad_deflate_streams_fail() -> None:
+    data = image_bytes()
+    error = check_member("01.png", zipfile.ZIP_DEFLATED, zlib.crc32(data), len(data), b"junk")
+    assert error.startswith("Bad compressed data")
+
+
+def test_every_failed_member_is_reported(make_cbz: MakeCbz) -> None:
+    path = make_cbz(
+        members={
+            "00.png": image_bytes(),
+            "01.png": truncated(image_bytes()),
+            "02.jpg": b"not an image",
+            "03.png": image_bytes(),
+            "ComicInfo.xml": b"<ComicInfo/>",
+        }
+    )
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        report = validate_archive(str(path), executor, max_pending=2)
+    assert not report.valid
+    assert report.members == 5
+    assert [failure.member for failure in report.failures] == ["01.png", "02.jpg"]
+    assert all(" at 0x" not in failure.error for failure in report.failures)
+
+
+def test_unreadable_archives_report_an_error(tmp_path: Path) -> None:
+    path = tmp_path / "junk.cbz"
+    path.write_bytes(b"not a zip")
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        report = validate_archive(str(path), executor, max_pending=2)
+    assert report.error.startswith("Error validating CBZ file")
+    assert not report.valid
+
+
+def test_deep_validate_reports_the_archive(make_cbz: MakeCbz, tmp_path: Path) -> None:
+    compressor = CBZCompressor(85, backend="thread", max_workers=2)
+    assert compressor.deep_validate(str(make_cbz())).valid
+    junk = tmp_path / "junk.cbz"
+    junk.write_bytes(b"not a zip")
+    report = compressor.deep_validate(str(junk))
+    assert report.error
+    assert not report.failures